@@ -5,6 +5,7 @@ This module contains the application factory function and app configuration.
 
 import os
 import logging
+import click
 from logging.handlers import RotatingFileHandler
 from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
@@ -86,6 +87,12 @@ def _init_extensions(app):
     
     # JWT Authentication
     jwt.init_app(app)
+    from app.services.token_service import register_token_blocklist
+    register_token_blocklist(app, jwt)
+
+    # Background tasks run inside this app's context
+    from app.celery_worker import init_celery
+    init_celery(app)
     
     # Import models to ensure they are registered with SQLAlchemy
     with app.app_context():
@@ -176,6 +183,20 @@ def _register_middleware(app):
     except ImportError as e:
         app.logger.warning(f"⚠️  Could not register tenant middleware: {e}")
 
+    try:
+        from app.middleware.activity_middleware import register_activity_middleware
+        register_activity_middleware(app)
+        app.logger.info("✅ Activity tracking middleware registered")
+    except ImportError as e:
+        app.logger.warning(f"⚠️  Could not register activity middleware: {e}")
+
+    try:
+        from app.middleware.rate_limit_middleware import register_rate_limit_middleware
+        register_rate_limit_middleware(app)
+        app.logger.info("✅ Rate limit middleware registered")
+    except ImportError as e:
+        app.logger.warning(f"⚠️  Could not register rate limit middleware: {e}")
+
 
 def _register_error_handlers(app):
     """Register global error handlers."""
@@ -279,6 +300,34 @@ def _register_cli_commands(app):
             db.session.rollback()
             print(f"❌ Error creating admin user: {e}")
 
+    @app.cli.command('migrate-tenants')
+    @click.option('--revision', default='head', help='Target revision (default: head).')
+    @click.option('--workers', type=int, default=None, help='Concurrent migration processes.')
+    @click.option('--directory', default=None, help='Migration scripts directory.')
+    @click.option('--schema', 'schemas', multiple=True, help='Only migrate the given tenant schema(s).')
+    def migrate_tenants(revision, workers, directory, schemas):
+        """Upgrade every tenant schema in parallel (resumable)."""
+        from app.services.tenant_migration_service import TenantMigrationService
+
+        def report(done, total, result):
+            line = f"[{done}/{total}] {result['schema']}: {result['status']} ({result['elapsed']:.1f}s)"
+            if result.get('error'):
+                line += f" - {result['error']}"
+            print(line)
+
+        service = TenantMigrationService(directory=directory, max_workers=workers)
+        summary = service.migrate_all(revision=revision, schemas=list(schemas) or None, progress=report)
+
+        print(f"✅ Upgraded: {len(summary['upgraded'])}")
+        print(f"⏭️  Up to date: {len(summary['up_to_date'])}")
+        if summary['locked']:
+            print(f"🔒 Locked by another runner: {', '.join(summary['locked'])}")
+        if summary['failed']:
+            print(f"❌ Failed: {len(summary['failed'])}")
+        print(f"⏱  {summary['elapsed_seconds']:.1f}s for {summary['total']} tenant schemas")
+        if summary['failed']:
+            raise SystemExit(1)
+
 
 def _setup_app_context(app):
     """Set up application context helpers."""
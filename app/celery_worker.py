@@ -1,32 +1,65 @@
 from celery import Celery
 from flask import Flask
 
-def create_celery_app(app=None):
+# Shared Celery instance; tasks in app/tasks.py register on it.
+# Worker and beat: celery -A app.celery_worker:celery worker --beat
+celery = Celery('app', include=['app.tasks'])
+
+_flask_app = None
+
+
+def _celery_settings(config):
+    """Maps the CELERY_* keys of a Flask config to Celery's lowercase setting names."""
+    return {
+        key[len('CELERY_'):].lower(): value
+        for key, value in config.items()
+        if key.startswith('CELERY_')
+    }
+
+
+def init_celery(app, celery_app=None):
     """
-    Create a new Celery object and tie it to the Flask app's configuration.
+    Binds a Celery object to the Flask app: loads the CELERY_* settings and
+    runs every task inside the app context.
     """
-    if app is None:
-        app = Flask(__name__)
-        app.config.from_object('app.config.Config') # Assuming your config is here
-
-    celery = Celery(
-        app.import_name,
-        broker=app.config['CELERY_BROKER_URL']
-    )
-    celery.conf.update(app.config)
+    global _flask_app
+    celery_app = celery_app or celery
+    _flask_app = app
+    celery_app.conf.update(_celery_settings(app.config))
 
-    class ContextTask(celery.Task):
+    class ContextTask(celery_app.Task):
         """
         Make celery tasks work with Flask app context
         """
         def __call__(self, *args, **kwargs):
-            with app.app_context():
+            with get_flask_app().app_context():
                 return self.run(*args, **kwargs)
 
-    celery.Task = ContextTask
-    return celery
+    celery_app.Task = ContextTask
+    return celery_app
+
+
+def get_flask_app():
+    """Flask app the tasks run in; created on first use inside a worker process."""
+    if _flask_app is None:
+        from app import create_app
+        create_app()  # binds itself through init_celery
+    return _flask_app
+
+
+def create_celery_app(app=None):
+    """
+    Create a new Celery object and tie it to the Flask app's configuration.
+    """
+    if app is None:
+        app = Flask(__name__)
+        app.config.from_object('app.config.Config') # Assuming your config is here
+
+    celery_app = Celery(app.import_name, include=['app.tasks'])
+    return init_celery(app, celery_app)
+
 
-# Example usage (if you were to run this file directly or import elsewhere)
-# from app import create_app # Assuming you have a create_app factory
-# app = create_app()
-# celery_app = create_celery_app(app)
\ No newline at end of file
+# Workers import this module directly: load the broker and beat settings up
+# front so the worker can connect before the first task creates the Flask app.
+from app.config import Config  # noqa: E402
+celery.conf.update(_celery_settings({name: getattr(Config, name) for name in dir(Config) if name.isupper()}))
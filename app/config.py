@@ -7,6 +7,8 @@ import os
 from datetime import timedelta
 from urllib.parse import quote_plus
 
+from celery.schedules import crontab
+
 
 class Config:
     """Base configuration class with common settings."""
@@ -28,6 +30,34 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key-change-in-production'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # Where revoked refresh tokens are kept: 'redis' (shared) or 'memory'
+    JWT_BLOCKLIST_STORE = os.environ.get('JWT_BLOCKLIST_STORE', 'redis')
+    # Seconds a compiled permission set is trusted before its version is re-checked
+    PERMISSION_CACHE_TTL = int(os.environ.get('PERMISSION_CACHE_TTL', 30))
+
+    # User activity (ultimo_acesso / total_requisicoes) is written behind in
+    # batches; values in the database lag by at most ACTIVITY_FLUSH_INTERVAL seconds.
+    ACTIVITY_TRACKING_ENABLED = os.environ.get('ACTIVITY_TRACKING_ENABLED', 'true').lower() == 'true'
+    ACTIVITY_FLUSH_INTERVAL = int(os.environ.get('ACTIVITY_FLUSH_INTERVAL', 10))
+    ACTIVITY_FLUSH_MAX_PENDING = int(os.environ.get('ACTIVITY_FLUSH_MAX_PENDING', 1000))
+
+    # Rate limiting: token buckets (rate = tokens/second, burst = bucket size)
+    # per tenant and per tenant+route, plus a cap on concurrent requests.
+    # 'memory' limits each worker process; 'redis' shares limits across workers.
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+    RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL')
+    RATE_LIMIT_DEFAULT_PLAN = 'basico'
+    RATE_LIMIT_PLANS = {
+        'basico': {'rate': 5, 'burst': 30, 'route_rate': 2, 'route_burst': 15, 'max_concurrent': 4},
+        'profissional': {'rate': 15, 'burst': 90, 'route_rate': 6, 'route_burst': 45, 'max_concurrent': 8},
+        'premium': {'rate': 30, 'burst': 180, 'route_rate': 12, 'route_burst': 90, 'max_concurrent': 16},
+    }
+    RATE_LIMIT_ANONYMOUS = {'rate': 1, 'burst': 10, 'route_rate': 0.5, 'route_burst': 5, 'max_concurrent': 2}
+    # Endpoint-specific route buckets, e.g. {'auth_user_login': {'rate': 0.2, 'burst': 5}}
+    RATE_LIMIT_ROUTES = {}
+    RATE_LIMIT_SLOT_TTL = 300
+    RATE_LIMIT_EXEMPT_PATHS = ['/health', '/api-info', '/docs', '/swaggerui', '/static', '/api/v1/swagger.json']
     
     # Application settings
     APP_NAME = 'Canil Management System'
@@ -40,6 +70,24 @@ class Config:
     # File upload settings
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.pdf', '.doc', '.docx'}
+    # Streaming uploads: bytes forwarded to storage per call (whole 4 MiB blocks),
+    # and the largest file accepted through a resumable upload session
+    MEDIA_UPLOAD_CHUNK_SIZE = int(os.environ.get('MEDIA_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+    MEDIA_MAX_UPLOAD_SIZE = int(os.environ.get('MEDIA_MAX_UPLOAD_SIZE', 2 * 1024 * 1024 * 1024))
+    # Where media files live: 'dropbox' or 'local' (MEDIA_LOCAL_ROOT, default
+    # <instance>/media) for development and offline installs
+    MEDIA_STORAGE_BACKEND = os.environ.get('MEDIA_STORAGE_BACKEND', 'dropbox')
+    MEDIA_LOCAL_ROOT = os.environ.get('MEDIA_LOCAL_ROOT')
+    # Downloads redirect to a temporary storage link (when the backend has one)
+    # instead of streaming through the app; ?redirect= overrides per request
+    MEDIA_DOWNLOAD_REDIRECT = os.environ.get('MEDIA_DOWNLOAD_REDIRECT', 'false').lower() == 'true'
+    # Photo variants (thumb/medium/web): originals above this size are skipped
+    MEDIA_VARIANT_MAX_SOURCE_SIZE = int(os.environ.get('MEDIA_VARIANT_MAX_SOURCE_SIZE', 50 * 1024 * 1024))
+    # Shareable links are cached on the file row and re-checked after this many seconds
+    MEDIA_SHARE_LINK_TTL = int(os.environ.get('MEDIA_SHARE_LINK_TTL', 7 * 24 * 3600))
+    # Album bulk upload and ZIP export: storage transfers running at once per request
+    MEDIA_TRANSFER_CONCURRENCY = int(os.environ.get('MEDIA_TRANSFER_CONCURRENCY', 4))
+    MEDIA_BULK_UPLOAD_MAX_FILES = int(os.environ.get('MEDIA_BULK_UPLOAD_MAX_FILES', 50))
     
     # Email configuration (if needed)
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
@@ -54,6 +102,9 @@ class Config:
     DROPBOX_APP_SECRET = os.environ.get('DROPBOX_APP_SECRET')
     DROPBOX_ACCESS_TOKEN = os.environ.get('DROPBOX_ACCESS_TOKEN')
     DROPBOX_ROOT_PATH = os.environ.get('DROPBOX_ROOT_PATH', '/Apps/CanilApp')
+    # Shared client: request timeout (seconds) and HTTP connection pool size
+    DROPBOX_TIMEOUT = float(os.environ.get('DROPBOX_TIMEOUT', 60))
+    DROPBOX_MAX_CONNECTIONS = int(os.environ.get('DROPBOX_MAX_CONNECTIONS', 8))
     
     # Redis Configuration for Cache and Celery
     REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
@@ -67,6 +118,37 @@ class Config:
     CELERY_RESULT_SERIALIZER = 'json'
     CELERY_ACCEPT_CONTENT = ['json']
     CELERY_TIMEZONE = 'UTC'
+    CELERY_BEAT_SCHEDULE = {
+        'health-due-date-sweep': {
+            'task': 'app.tasks.sweep_health_due_dates',
+            'schedule': crontab(hour=int(os.environ.get('HEALTH_REMINDER_HOUR', 9)), minute=0),
+        },
+        'breeding-calendar-refresh': {
+            'task': 'app.tasks.refresh_breeding_calendars',
+            'schedule': crontab(hour=3, minute=0),
+        },
+        'inbreeding-pending-sweep': {
+            'task': 'app.tasks.calculate_pending_inbreeding',
+            'schedule': crontab(minute=30),
+        },
+        'image-variants-pending-sweep': {
+            'task': 'app.tasks.generate_pending_image_variants',
+            'schedule': crontab(minute=45),
+        },
+        'storage-usage-reconcile': {
+            'task': 'app.tasks.reconcile_storage_usage',
+            'schedule': crontab(hour=4, minute=15),
+        },
+    }
+
+    # Vaccination / deworming reminders
+    HEALTH_REMINDER_DAYS = [7, 1, 0]  # Remind this many days before the due date
+    HEALTH_REMINDER_BATCH_SIZE = int(os.environ.get('HEALTH_REMINDER_BATCH_SIZE', 5000))
+
+    # Crossings re-queued per run of the hourly inbreeding catch-up
+    INBREEDING_SWEEP_BATCH_SIZE = int(os.environ.get('INBREEDING_SWEEP_BATCH_SIZE', 500))
+    # Photos re-queued per run of the hourly image variant catch-up
+    IMAGE_VARIANT_SWEEP_BATCH_SIZE = int(os.environ.get('IMAGE_VARIANT_SWEEP_BATCH_SIZE', 500))
     
     # Mercado Pago Configuration
     MERCADO_PAGO_ACCESS_TOKEN = os.environ.get('MERCADO_PAGO_ACCESS_TOKEN')
@@ -75,6 +157,20 @@ class Config:
     # Multi-tenant configuration
     MAIN_DOMAIN = os.environ.get('MAIN_DOMAIN', 'localhost')
     DEFAULT_TENANT_SCHEMA = 'public'
+
+    # Tenant provisioning
+    TENANT_PROVISIONING_WORKERS = int(os.environ.get('TENANT_PROVISIONING_WORKERS', 4))
+    TENANT_MIGRATION_WORKERS = int(os.environ.get('TENANT_MIGRATION_WORKERS', 4))
+    TENANT_ENTITLEMENTS_CACHE_TTL = int(os.environ.get('TENANT_ENTITLEMENTS_CACHE_TTL', 60))
+    # Plan a tenant falls back to when its subscription ends (unset: no plan at all)
+    TENANT_FALLBACK_PLAN_ID = int(os.environ['TENANT_FALLBACK_PLAN_ID']) if os.environ.get('TENANT_FALLBACK_PLAN_ID') else None
+    TENANT_DEFAULT_CONFIGURACOES = [
+        {'chave': 'idioma', 'valor': 'pt-BR', 'descricao': 'Idioma padrão do canil', 'tipo': 'string', 'categoria': 'geral'},
+        {'chave': 'fuso_horario', 'valor': 'America/Sao_Paulo', 'descricao': 'Fuso horário do canil', 'tipo': 'string', 'categoria': 'geral'},
+        {'chave': 'moeda', 'valor': 'BRL', 'descricao': 'Moeda usada em vendas e relatórios', 'tipo': 'string', 'categoria': 'financeiro'},
+        {'chave': 'gestacao_dias', 'valor': '63', 'descricao': 'Duração padrão da gestação em dias', 'tipo': 'int', 'categoria': 'reproducao'},
+        {'chave': 'notificacoes_email', 'valor': 'true', 'descricao': 'Enviar notificações por e-mail', 'tipo': 'bool', 'categoria': 'notificacoes'},
+    ]
     
     # Security settings
     WTF_CSRF_ENABLED = True
@@ -145,10 +241,13 @@ class TestingConfig(Config):
     
     # Faster password hashing for tests
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=30)
+    JWT_BLOCKLIST_STORE = 'memory'
+    RATE_LIMIT_ENABLED = False
     
     # Disable external services in tests
     CELERY_TASK_ALWAYS_EAGER = True
     CELERY_TASK_EAGER_PROPAGATES = True
+    MEDIA_STORAGE_BACKEND = 'local'
     
     @classmethod
     def init_app(cls, app):
@@ -0,0 +1,33 @@
+from flask import current_app
+from flask_jwt_extended import get_jwt_identity
+
+from app.services.activity_service import activity_buffer
+
+
+def track_user_activity(response):
+    """
+    Records the authenticated user's request in the write-behind activity buffer.
+    Only requests whose JWT was verified by the endpoint are counted.
+    """
+    try:
+        user_id = get_jwt_identity()
+    except RuntimeError:
+        # No JWT was verified for this request
+        return response
+
+    if user_id is not None:
+        try:
+            activity_buffer.record(int(user_id))
+        except Exception as e:
+            current_app.logger.error(f"Error recording user activity: {e}")
+    return response
+
+
+def register_activity_middleware(app):
+    """
+    Registers the track_user_activity function as an after_request handler.
+    """
+    if not app.config.get('ACTIVITY_TRACKING_ENABLED', True):
+        return
+    activity_buffer.init_app(app)
+    app.after_request(track_user_activity)
@@ -0,0 +1,88 @@
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import verify_jwt_in_request
+
+from app.services.rate_limit_service import create_rate_limiter, get_rate_limiter, retry_after_header
+
+
+def _is_exempt(path):
+    for exempt in current_app.config.get('RATE_LIMIT_EXEMPT_PATHS', ()):
+        if path == exempt or path.startswith(exempt.rstrip('/') + '/'):
+            return True
+    return False
+
+
+def _resolve_subject(limiter):
+    """
+    Returns the bucket subject and limits for the request: the tenant (limits
+    from its plan) for authenticated requests, the client IP otherwise.
+    """
+    from app.services.tenant_service import get_tenant_entitlements
+    from app.utils.decorators import get_jwt_tenant_id
+
+    tenant_id = None
+    try:
+        verify_jwt_in_request(optional=True)
+        tenant_id = get_jwt_tenant_id()
+    except Exception:
+        # Missing, expired or invalid tokens are rejected by the endpoint itself
+        pass
+
+    if tenant_id is not None:
+        entitlements = get_tenant_entitlements(tenant_id)
+        return f'tenant:{tenant_id}', limiter.limits_for_plan(entitlements.plano if entitlements else None)
+    return f'ip:{request.remote_addr}', limiter.anonymous_limits
+
+
+def _too_many_requests(retry_after, message):
+    response = jsonify({
+        'error': 'Too Many Requests',
+        'message': message,
+        'code': 429
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = retry_after_header(retry_after)
+    return response
+
+
+def enforce_rate_limits():
+    """
+    Spends a token from the tenant and tenant+route buckets and takes one of
+    the tenant's concurrent request slots. Answers 429 with Retry-After when
+    either is exhausted. Fails open if the limiter backend is unavailable.
+    """
+    if request.method == 'OPTIONS' or _is_exempt(request.path):
+        return None
+
+    limiter = get_rate_limiter()
+    try:
+        subject, limits = _resolve_subject(limiter)
+        decision = limiter.check(subject, request.endpoint or request.path, limits)
+        if not decision.allowed:
+            return _too_many_requests(decision.retry_after, 'Rate limit exceeded, please retry later.')
+        if not limiter.acquire_slot(subject, limits):
+            return _too_many_requests(1, 'Too many concurrent requests, please retry later.')
+        g.rate_limit_slot = subject
+    except Exception as e:
+        current_app.logger.error(f"Rate limiter unavailable, request allowed: {e}")
+    return None
+
+
+def release_concurrency_slot(exc=None):
+    subject = g.pop('rate_limit_slot', None)
+    if subject is None:
+        return
+    try:
+        get_rate_limiter().release_slot(subject)
+    except Exception as e:
+        current_app.logger.error(f"Error releasing rate limit slot for {subject}: {e}")
+
+
+def register_rate_limit_middleware(app, client=None):
+    """
+    Registers the rate limiter as before_request / teardown_request handlers.
+    """
+    if not app.config.get('RATE_LIMIT_ENABLED', True):
+        return
+    app.extensions['rate_limiter'] = create_rate_limiter(app, client=client)
+    app.before_request(enforce_rate_limits)
+    app.teardown_request(release_concurrency_slot)
@@ -5,7 +5,7 @@ Imports organizados para evitar dependências circulares
 
 # Importação ordenada para evitar problemas de dependência
 from .tenant import Tenant
-from .system import Usuario, Configuracao, LogSistema, Backup, Endereco, Canil
+from .system import Usuario, Configuracao, LogSistema, Backup, Endereco, Canil, CheckpointTarefa
 
 # Importar apenas se não causar erro de relacionamento
 try:
@@ -15,7 +15,7 @@ except ImportError:
     pass
 
 try:
-    from .breeding import Ninhada, Cruzamento, ArvoreGenealogica
+    from .breeding import Ninhada, Cruzamento, ArvoreGenealogica, RegistroCio, EventoCalendario, ResumoReprodutivo
 except ImportError:
     pass
 
@@ -41,17 +41,17 @@ except ImportError:
 
 # Media models - importar por último devido aos relacionamentos
 try:
-    from .media import Arquivo, ImagemAnimal, VideoAnimal, DocumentoAnimal, AlbumAnimal, RegistroEvolucao
+    from .media import ObjetoArmazenado, Arquivo, ImagemAnimal, VideoAnimal, DocumentoAnimal, AlbumAnimal, RegistroEvolucao, SessaoUpload, UsoArmazenamento
 except ImportError:
     pass
 
 __all__ = [
-    'Tenant', 'Usuario', 'Configuracao', 'LogSistema', 'Backup', 'Endereco', 'Canil',
+    'Tenant', 'Usuario', 'Configuracao', 'LogSistema', 'Backup', 'Endereco', 'Canil', 'CheckpointTarefa',
     'Animal', 'Matriz', 'Reprodutor', 'Filhote', 'Raca', 'Especie', 'Linhagem',
-    'Ninhada', 'Cruzamento', 'ArvoreGenealogica',
+    'Ninhada', 'Cruzamento', 'ArvoreGenealogica', 'RegistroCio', 'EventoCalendario', 'ResumoReprodutivo',
     'RegistroVeterinario', 'Vacinacao', 'Vermifugacao', 'ExameGenetico',
     'Pessoa', 'Cliente', 'Funcionario', 'Veterinario',
     'Venda', 'Adocao', 'Reserva',
     'Assinatura', 'Pagamento', 'PlanoAssinatura',
-    'Arquivo', 'ImagemAnimal', 'VideoAnimal', 'DocumentoAnimal', 'AlbumAnimal', 'RegistroEvolucao'
+    'ObjetoArmazenado', 'Arquivo', 'ImagemAnimal', 'VideoAnimal', 'DocumentoAnimal', 'AlbumAnimal', 'RegistroEvolucao', 'SessaoUpload', 'UsoArmazenamento'
 ]
@@ -3,6 +3,9 @@ from datetime import date, timedelta
 from sqlalchemy import Column, Integer, String, Date, Float, Boolean, ForeignKey, Text
 from sqlalchemy.orm import relationship
 
+# Fallback heat interval when a dam has no usable history
+INTERVALO_CIO_PADRAO_DIAS = 180
+
 # Assume these models exist for relationship and functionality
 # from app.models.breeding import Cruzamento
 # from app.models.transaction import Venda
@@ -29,6 +32,7 @@ class Animal(db.Model):
     ativo = db.Column(db.Boolean, default=True)
     tenant_id = db.Column(db.Integer, db.ForeignKey('tenants.id'), nullable=False)
     tipo_animal = db.Column(db.String(50))  # Discriminator
+    raca_id = db.Column(db.Integer, db.ForeignKey('racas.id'), nullable=True, index=True)
 
     # Relacionamentos corrigidos
     mother_id = db.Column(db.Integer, db.ForeignKey('animais.id'), nullable=True)
@@ -59,6 +63,7 @@ class Matriz(Animal):
 
     id = db.Column(db.Integer, db.ForeignKey('animais.id'), primary_key=True)
     proximo_cio = db.Column(db.Date, nullable=True)
+    intervalo_cio_dias = db.Column(db.Integer, nullable=True) # Estimated heat interval behind proximo_cio
     status_reprodutivo = db.Column(db.String(64), nullable=True) # e.g., 'Em ciclo', 'Prenha', 'Lactante', 'Descanso'
     qtd_cruzamentos = db.Column(db.Integer, default=0)
     qtd_filhotes = db.Column(db.Integer, default=0)
@@ -100,15 +105,27 @@ class Matriz(Animal):
             print(f"Erro ao programar cruzamento: {e}") # Placeholder error handling
             # raise e # Re-raise the exception
 
-    def registrar_cio(self, data_inicio, data_fim):
-        # Update status and calculate next heat based on a simplified rule (e.g., ~6 months after end date)
+    def registrar_cio(self, data_inicio, data_fim=None, observacoes=None):
+        """
+        Records a heat in the dam's history; the caller commits. proximo_cio gets
+        a provisional estimate from the last predicted interval until
+        HeatPredictionService recomputes it from the whole history.
+        """
+        from app.models.breeding import RegistroCio
+
+        registro = RegistroCio(
+            matriz_id=self.id,
+            data_inicio=data_inicio,
+            data_fim=data_fim,
+            observacoes=observacoes,
+            tenant_id=self.tenant_id,
+        )
+        db.session.add(registro)
         self.status_reprodutivo = 'Em ciclo'
-        # Simplified calculation for next heat: assume 6 months (approx 180 days)
-        self.proximo_cio = data_fim + timedelta(days=180)
+        self.proximo_cio = data_inicio + timedelta(days=self.intervalo_cio_dias or INTERVALO_CIO_PADRAO_DIAS)
         # Update general animal status if needed
         self.status = 'Ativo Reprodutivo' # Example status
-        db.session.commit()
-        print(f"Cio registrado para Matriz {self.nome}. Próximo cio previsto em {self.proximo_cio}") # Placeholder success message
+        return registro
 
 
 class Reprodutor(Animal):
@@ -176,7 +193,7 @@ class Filhote(Animal):
     preco_venda = db.Column(db.Float, nullable=True)
     data_venda = db.Column(db.Date, nullable=True)
     reservado = db.Column(db.Boolean, default=False)
-    ninhada_id = db.Column(db.Integer, db.ForeignKey('ninhadas.id'), nullable=True)
+    ninhada_id = db.Column(db.Integer, db.ForeignKey('ninhadas.id'), nullable=True, index=True)
     
     __mapper_args__ = {
         'polymorphic_identity': 'Filhote',
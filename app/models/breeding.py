@@ -1,17 +1,28 @@
 from app import db
 from datetime import date, timedelta
-from sqlalchemy import Column, Integer, String, Date, Float, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Boolean, ForeignKey, Text, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
+from datetime import datetime
 
 
 # Association table for Many-to-Many relationship between Cruzamento and Animals
 cruzamento_animal_association = db.Table('cruzamento_animal', db.Model.metadata,
     Column('cruzamento_id', Integer, ForeignKey('cruzamentos.id')),
-    Column('animal_id', Integer, ForeignKey('animais.id'))
+    Column('animal_id', Integer, ForeignKey('animais.id')),
+    # Both directions of the many-to-many are loaded in batches (selectin)
+    Index('ix_cruzamento_animal_cruzamento', 'cruzamento_id'),
+    Index('ix_cruzamento_animal_animal', 'animal_id'),
 )
 
 class Ninhada(db.Model):
     __tablename__ = 'ninhadas'
+    __table_args__ = (
+        # Keyset pagination of the tenant's litters (newest first)
+        Index('ix_ninhadas_tenant_id', 'tenant_id', 'id'),
+        # Birth history per dam (litter intervals in the reproductive rollup)
+        Index('ix_ninhadas_tenant_matriz_parto', 'tenant_id', 'matriz_id', 'data_parto'),
+    )
 
     id = Column(Integer, primary_key=True)
     numero = Column(Integer)
@@ -53,14 +64,28 @@ class Ninhada(db.Model):
         self.qtd_filhotes = qtd_vivos + qtd_mortos
 
 
+# Cruzamento.status_consanguinidade values
+CONSANGUINIDADE_PENDENTE = 'pendente'          # Queued for the background calculation
+CONSANGUINIDADE_CALCULADA = 'calculada'
+CONSANGUINIDADE_INDISPONIVEL = 'indisponivel'  # No female/male pair among the animals
+CONSANGUINIDADE_ERRO = 'erro'
+
+
 class Cruzamento(db.Model):
     __tablename__ = 'cruzamentos'
+    __table_args__ = (
+        Index('ix_cruzamentos_tenant_data', 'tenant_id', 'data_acasalamento', 'id'),
+        Index('ix_cruzamentos_status_consanguinidade', 'status_consanguinidade'),
+    )
 
     id = Column(Integer, primary_key=True)
     data_acasalamento = Column(Date, nullable=False)
     tipo = Column(String(64))
     confirmado = Column(Boolean, default=False)
     coeficiente_consanguinidade = Column(Float)
+    # Filled by app.tasks.calculate_cruzamento_inbreeding after creation or a change of animals
+    status_consanguinidade = Column(String(20), nullable=False, default=CONSANGUINIDADE_PENDENTE)
+    consanguinidade_calculada_em = Column(DateTime)
     observacoes = Column(Text)
     data_confirmacao = Column(Date, nullable=True)
     tenant_id = Column(Integer, ForeignKey('tenants.id'), nullable=False)
@@ -74,6 +99,18 @@ class Cruzamento(db.Model):
         self.confirmado = True
         self.data_confirmacao = data_confirmacao
 
+    def matriz_e_reprodutor(self):
+        """(female, male) animals of the crossing; None where the sex is missing."""
+        matriz = next((a for a in self.animais if a.sexo == 'F'), None)
+        reprodutor = next((a for a in self.animais if a.sexo == 'M'), None)
+        return matriz, reprodutor
+
+    def marcar_consanguinidade_pendente(self):
+        """Clears the stored coefficient until the background calculation runs again."""
+        self.coeficiente_consanguinidade = None
+        self.consanguinidade_calculada_em = None
+        self.status_consanguinidade = CONSANGUINIDADE_PENDENTE
+
     def calcular_previsao_parto(self, gestacao_dias: int):
         """Calculates the estimated birth date based on mating date and gestation period."""
         if self.data_acasalamento:
@@ -139,4 +176,70 @@ class ArvoreGenealogica(db.Model):
         Requires traversing the genealogical trees of both animals and identifying shared individuals.
         """
         # Placeholder for finding common ancestors
-        pass
\ No newline at end of file
+        pass
+
+
+class RegistroCio(db.Model):
+    """A recorded heat (estrus) of a Matriz; the history feeds the heat predictions."""
+    __tablename__ = 'registros_cio'
+    __table_args__ = (
+        Index('ix_registros_cio_tenant_matriz_data', 'tenant_id', 'matriz_id', 'data_inicio'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    matriz_id = Column(Integer, ForeignKey('animais.id'), nullable=False)
+    matriz = relationship('Animal', backref='registros_cio_list')
+    data_inicio = Column(Date, nullable=False)
+    data_fim = Column(Date, nullable=True)
+    observacoes = Column(Text)
+    tenant_id = Column(Integer, ForeignKey('tenants.id'), nullable=False)
+
+
+class EventoCalendario(db.Model):
+    """
+    Precomputed breeding calendar entry (predicted and ongoing heats,
+    expected births, sire availability). Rebuilt per tenant by
+    BreedingCalendarService.refresh; never edited by hand.
+    """
+    __tablename__ = 'calendario_reprodutivo'
+    __table_args__ = (
+        Index('ix_calendario_reprodutivo_tenant_data', 'tenant_id', 'data_inicio'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tipo = Column(String(32), nullable=False) # 'cio', 'cio_previsto', 'parto_previsto', 'reprodutor_disponivel'
+    data_inicio = Column(Date, nullable=False)
+    data_fim = Column(Date, nullable=True) # Open-ended when empty (e.g. sire availability)
+    animal_id = Column(Integer, ForeignKey('animais.id'), nullable=False)
+    titulo = Column(String(255))
+    referencia_id = Column(Integer) # Id of the source record (RegistroCio, Ninhada), when any
+    detalhes = Column(JSONB)
+    gerado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+    tenant_id = Column(Integer, ForeignKey('tenants.id'), nullable=False)
+
+
+class ResumoReprodutivo(db.Model):
+    """
+    Yearly reproductive rollup per dam, sire or breed. Rows hold additive
+    totals (rates and means are derived when reading) and are rebuilt per
+    tenant and year by ReproductiveSummaryService.refresh.
+    """
+    __tablename__ = 'resumos_reprodutivos'
+    __table_args__ = (
+        UniqueConstraint('tenant_id', 'dimensao', 'chave_id', 'ano', name='uq_resumos_reprodutivos_chave'),
+        Index('ix_resumos_reprodutivos_tenant_ano', 'tenant_id', 'ano', 'dimensao'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    dimensao = Column(String(16), nullable=False) # 'matriz', 'reprodutor' or 'raca'
+    chave_id = Column(Integer, nullable=False) # Animal or Raca id; 0 for litters of dams without a breed
+    ano = Column(Integer, nullable=False)
+    ninhadas = Column(Integer, nullable=False, default=0) # Litters born in the year
+    nascidos_vivos = Column(Integer, nullable=False, default=0)
+    nascidos_mortos = Column(Integer, nullable=False, default=0)
+    cruzamentos = Column(Integer, nullable=False, default=0) # Matings in the year
+    cruzamentos_produtivos = Column(Integer, nullable=False, default=0) # ...that produced a live litter
+    soma_intervalos_dias = Column(Integer, nullable=False, default=0) # Days since the dam's previous litter
+    qtd_intervalos = Column(Integer, nullable=False, default=0)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+    tenant_id = Column(Integer, ForeignKey('tenants.id'), nullable=False)
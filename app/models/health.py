@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String, Date, Float, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Date, Float, Boolean, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 
 from app import db
 
 class RegistroVeterinario(db.Model):
     __tablename__ = 'registros_veterinarios'
+    __table_args__ = (
+        # Keyset pagination of the tenant list (newest first) and per-animal history
+        Index('ix_registros_veterinarios_tenant_data', 'tenant_id', 'data_consulta', 'id'),
+        Index('ix_registros_veterinarios_animal_data', 'animal_id', 'data_consulta'),
+    )
 
     id = Column(Integer, primary_key=True)
     animal_id = Column(Integer, ForeignKey('animais.id'), nullable=False)
@@ -25,6 +30,12 @@ class RegistroVeterinario(db.Model):
 
 class Vacinacao(db.Model):
     __tablename__ = 'vacinacoes'
+    __table_args__ = (
+        Index('ix_vacinacoes_tenant_data', 'tenant_id', 'data_aplicacao', 'id'),
+        Index('ix_vacinacoes_animal_data', 'animal_id', 'data_aplicacao'),
+        # Due-date reminder sweep
+        Index('ix_vacinacoes_tenant_proxima_dose', 'tenant_id', 'proxima_dose', 'id'),
+    )
 
     id = Column(Integer, primary_key=True)
     animal_id = Column(Integer, ForeignKey('animais.id'), nullable=False)
@@ -43,6 +54,12 @@ class Vacinacao(db.Model):
 
 class Vermifugacao(db.Model):
     __tablename__ = 'vermifugacoes'
+    __table_args__ = (
+        Index('ix_vermifugacoes_tenant_data', 'tenant_id', 'data_aplicacao', 'id'),
+        Index('ix_vermifugacoes_animal_data', 'animal_id', 'data_aplicacao'),
+        # Due-date reminder sweep
+        Index('ix_vermifugacoes_tenant_proxima_aplicacao', 'tenant_id', 'proxima_aplicacao', 'id'),
+    )
 
     id = Column(Integer, primary_key=True)
     animal_id = Column(Integer, ForeignKey('animais.id'), nullable=False)
@@ -60,6 +77,9 @@ class Vermifugacao(db.Model):
 
 class ExameGenetico(db.Model):
     __tablename__ = 'exames_geneticos'
+    __table_args__ = (
+        Index('ix_exames_geneticos_animal', 'animal_id'),
+    )
 
     id = Column(Integer, primary_key=True)
     animal_id = Column(Integer, ForeignKey('animais.id'), nullable=False)
@@ -1,24 +1,62 @@
-from sqlalchemy import Column, Integer, String, Date, Float, Boolean, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Date, Float, Boolean, ForeignKey, DateTime, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB # Assuming PostgreSQL for JSONB type
 
 from app import db
 from datetime import datetime, date
 
+# ImagemAnimal.status_variantes
+VARIANTES_PENDENTE = 'pendente'          # Queued for the background generation
+VARIANTES_PRONTAS = 'prontas'
+VARIANTES_INDISPONIVEL = 'indisponivel'  # Content is not a readable image
+VARIANTES_ERRO = 'erro'
+
+
+class ObjetoArmazenado(db.Model):
+    """
+    One stored copy of a content, per tenant and content hash. Arquivos with
+    the same content point at the same object; `referencias` counts them and
+    the stored file is deleted when the last one goes.
+    """
+    __tablename__ = 'objetos_armazenados'
+    __table_args__ = (
+        UniqueConstraint('tenant_id', 'hash', name='uq_objetos_armazenados_tenant_hash'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    hash = Column(String(64), nullable=False) # Dropbox content hash (hex)
+    tamanho = Column(BigInteger, nullable=False) # Bytes
+    caminho = Column(String(512), nullable=False) # Path within the tenant's folder
+    referencias = Column(Integer, nullable=False, default=1) # Arquivos pointing at this object
+    criado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+    tenant_id = Column(Integer, ForeignKey('tenants.id'), nullable=False)
+
+
 # Base class for files
 class Arquivo(db.Model):
     __tablename__ = 'arquivos'
+    __table_args__ = (
+        Index('ix_arquivos_objeto_id', 'objeto_id'),
+        # Main photo per animal and album covers, batch-loaded for list pages
+        Index('ix_arquivos_animal_id', 'animal_id'),
+        Index('ix_arquivos_album_id', 'album_id'),
+    )
 
     id = Column(Integer, primary_key=True)
     nome = Column(String(255), nullable=False)
     nome_original = Column(String(255), nullable=False)
     caminho = Column(String(512), nullable=False) # Path to the file in Dropbox or storage
     tipo = Column(String(50), nullable=False) # Discriminator for polymorphic inheritance (e.g., 'imagem', 'video', 'documento')
+    mime_type = Column(String(127)) # Content type sent by the client
     tamanho = Column(Float) # File size in bytes or KB/MB
     data_upload = Column(DateTime, default=datetime.utcnow)
     descricao = Column(Text)
     publico = Column(Boolean, default=False)
-    hash = Column(String(64)) # File hash for integrity checks
+    hash = Column(String(64)) # Dropbox content hash (hex), computed while uploading
+    objeto_id = Column(Integer, ForeignKey('objetos_armazenados.id'), nullable=True) # Stored content (deduplicated)
+    objeto = relationship('ObjetoArmazenado')
+    url_compartilhada = Column(String(1024)) # Cached shareable link from storage
+    url_expira_em = Column(DateTime) # When the cached link is checked again
 
     # Relationships
     animal_id = Column(Integer, ForeignKey('animais.id'), nullable=True) # Files can be associated with an animal
@@ -45,12 +83,17 @@ class Arquivo(db.Model):
         pass
 
     def obter_url(self):
-        # Placeholder for generating a public or temporary URL - Logic is in MediaService
-        pass
+        # Shareable link (cached on the row), or None when the storage backend has none
+        from app.services.share_link_service import ShareLinkService
+        return ShareLinkService().resolve([self]).get(self.id)
 
 
 class ImagemAnimal(Arquivo):
     __tablename__ = 'imagens_animais'
+    __table_args__ = (
+        # Periodic sweep for images still waiting for their variants
+        Index('ix_imagens_animais_status_variantes', 'status_variantes'),
+    )
 
     id = Column(Integer, ForeignKey('arquivos.id'), primary_key=True)
     categoria = Column(String(64))
@@ -58,6 +101,10 @@ class ImagemAnimal(Arquivo):
     principal = Column(Boolean, default=False)
     observacoes = Column(Text)
     data_foto = Column(Date)
+    # Resized copies stored next to the original, generated in the background:
+    # name -> {caminho, largura, altura, tamanho, hash, mime_type}
+    variantes = Column(JSONB)
+    status_variantes = Column(String(16), nullable=False, default=VARIANTES_PENDENTE)
 
     __mapper_args__ = {
         'polymorphic_identity': 'imagem',
@@ -125,6 +172,52 @@ class DocumentoAnimal(Arquivo):
         pass
 
 
+class UsoArmazenamento(db.Model):
+    """
+    Media bytes each tenant has stored (the sum of its Arquivo.tamanho), kept
+    up to date as files are added and deleted so quota checks read one row
+    instead of summing the files table. Reconciled nightly with the files
+    (app.tasks.reconcile_storage_usage).
+    """
+    __tablename__ = 'uso_armazenamento'
+
+    tenant_id = Column(Integer, ForeignKey('tenants.id'), primary_key=True)
+    bytes_usados = Column(BigInteger, nullable=False, default=0)
+    arquivos = Column(Integer, nullable=False, default=0)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+    reconciliado_em = Column(DateTime) # Last time the reconciliation had to correct the row
+
+
+class SessaoUpload(db.Model):
+    """
+    Resumable upload in progress: chunks are forwarded to a storage upload
+    session as they arrive and the Arquivo is created when the last one
+    lands. `offset` is where the client resumes after a failure.
+    """
+    __tablename__ = 'sessoes_upload'
+
+    id = Column(Integer, primary_key=True)
+    token = Column(String(36), unique=True, nullable=False) # Public identifier of the session
+    nome_original = Column(String(255), nullable=False)
+    mime_type = Column(String(127))
+    categoria = Column(String(16)) # 'photo', 'video', 'document' or empty
+    descricao = Column(Text)
+    animal_id = Column(Integer, ForeignKey('animais.id'), nullable=True)
+    caminho = Column(String(512), nullable=False) # Destination path within the tenant's folder
+    tamanho_total = Column(BigInteger, nullable=False) # Declared size in bytes
+    offset = Column(BigInteger, nullable=False, default=0) # Bytes received so far
+    storage_session_id = Column(String(255)) # Upload session id of the storage backend
+    hashes_blocos = Column(JSONB) # SHA-256 of each completed 4 MiB block
+    arquivo_id = Column(Integer, ForeignKey('arquivos.id'), nullable=True) # Set when completed
+    criado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expira_em = Column(DateTime, nullable=False) # Dropbox drops upload sessions after 7 days
+    tenant_id = Column(Integer, ForeignKey('tenants.id'), nullable=False)
+
+    @property
+    def concluida(self) -> bool:
+        return self.arquivo_id is not None
+
+
 class AlbumAnimal(db.Model):
     __tablename__ = 'albuns_animais'
 
@@ -163,6 +256,11 @@ class AlbumAnimal(db.Model):
 
 class RegistroEvolucao(db.Model):
     __tablename__ = 'registros_evolucao'
+    __table_args__ = (
+        Index('ix_registros_evolucao_animal_data', 'animal_id', 'data_registro'),
+        # Bulk load of a tenant's measurements for growth analytics
+        Index('ix_registros_evolucao_tenant', 'tenant_id'),
+    )
 
     id = Column(Integer, primary_key=True)
     animal_id = Column(Integer, ForeignKey('animais.id'), nullable=False) # A record belongs to an animal
@@ -184,7 +282,25 @@ class RegistroEvolucao(db.Model):
         pass # Keep the field update, add session commit logic
 
     def comparar_evolucao(self):
-        # Logic for comparing this record with previous RegistroEvolucao records for the same animal.
-        # This would involve querying the database for past records filtered by animal_id and ordered by date,
-        # and then performing comparisons on weight, height, etc.
-        pass
+        """
+        Compares this record with the animal's previous one.
+        Returns the weight/height deltas and the average daily weight gain,
+        or None when there is no earlier record.
+        """
+        anterior = RegistroEvolucao.query.filter(
+            RegistroEvolucao.animal_id == self.animal_id,
+            RegistroEvolucao.data_registro < self.data_registro,
+        ).order_by(RegistroEvolucao.data_registro.desc(), RegistroEvolucao.id.desc()).first()
+        if anterior is None:
+            return None
+
+        dias = (self.data_registro - anterior.data_registro).days
+        delta_peso = self.peso - anterior.peso if self.peso is not None and anterior.peso is not None else None
+        delta_altura = self.altura - anterior.altura if self.altura is not None and anterior.altura is not None else None
+        return {
+            'registro_anterior_id': anterior.id,
+            'dias': dias,
+            'delta_peso': delta_peso,
+            'delta_altura': delta_altura,
+            'ganho_diario_peso': delta_peso / dias if delta_peso is not None and dias else None,
+        }
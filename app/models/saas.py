@@ -13,6 +13,7 @@ class PlanoAssinatura(db.Model):
     valor = Column(Float, nullable=False)
     limite_funcionarios = Column(Integer)
     limite_animais = Column(Integer)
+    limite_armazenamento_mb = Column(Integer) # Media storage, in MiB
     backup_automatico = Column(Boolean)
     suporte_premium = Column(Boolean)
     recursos = Column(Text) # Could be a JSON field later
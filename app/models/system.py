@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, String, Date, Float, Boolean, DateTime, ForeignKey, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB # Assuming PostgreSQL for JSONB type
-from datetime import datetime
+from datetime import date, datetime
 
 from app import db
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -14,8 +14,10 @@ class Usuario(db.Model):
     senha = Column(String(255), nullable=False) # Store hashed passwords
     perfil = Column(String(64), nullable=False) # e.g., 'admin', 'gerente', 'funcionario'
     ultimo_acesso = Column(DateTime)
+    total_requisicoes = Column(Integer, default=0) # Updated in batches by the activity buffer
     ativo = Column(Boolean, default=True)
     permissoes = Column(JSONB) # Using JSONB for flexible permissions structure
+    permissoes_versao = Column(Integer, nullable=False, default=1, server_default='1') # Bumped on every permission change
 
     # Relationships
     tenant_id = Column(Integer, ForeignKey('tenants.id'), nullable=False)  # Fixed: removed 'public.'
@@ -32,8 +34,24 @@ class Usuario(db.Model):
         self.senha = generate_password_hash(nova_senha)
 
     def definir_permissoes(self, permissoes: dict):
-        """Sets the user's permissions."""
+        """Sets the user's permissions and invalidates their compiled permission cache."""
+        from app.utils.decorators import invalidate_user_permissions
+
         self.permissoes = permissoes
+        self.permissoes_versao = (self.permissoes_versao or 1) + 1
+        if self.id is not None:
+            invalidate_user_permissions(self.id)
+
+class CheckpointTarefa(db.Model):
+    """Progress of a long-running background job, so an interrupted run resumes where it stopped."""
+    __tablename__ = 'checkpoints_tarefas'
+
+    id = Column(Integer, primary_key=True)
+    chave = Column(String(128), unique=True, nullable=False) # e.g. 'health-reminders:vacinacao:2024-05-01'
+    cursor = Column(JSONB) # Sort key of the last processed row
+    processados = Column(Integer, nullable=False, default=0)
+    concluida = Column(Boolean, nullable=False, default=False)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class Configuracao(db.Model):
     __tablename__ = 'configuracoes'
@@ -164,10 +182,17 @@ class Canil(db.Model):
         # TODO: Implement actual logic to aggregate financial data (sales, expenses, etc.) for this tenant.
         return {"report_type": "financial", "data": "placeholder"}
 
-    def gerar_relatorio_reprodutivo(self):
-        """Generates a reproductive report for the tenant."""
-        # TODO: Implement actual logic to aggregate reproductive data (breedings, litters, etc.) for this tenant.
-        return {"report_type": "reproductive", "data": "placeholder"}
+    def gerar_relatorio_reprodutivo(self, ano=None, dimensao='matriz'):
+        """Generates a reproductive report for the tenant from the ResumoReprodutivo rollup."""
+        from app.services.reproductive_summary_service import ReproductiveSummaryService
+
+        ano = ano or date.today().year
+        return {
+            "report_type": "reproductive",
+            "ano": ano,
+            "dimensao": dimensao,
+            "data": ReproductiveSummaryService().report(self.tenant_id, ano, dimensao),
+        }
 
     def gerar_relatorio_saude(self):
         """Generates a health report for the tenant."""
@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean, text
+from sqlalchemy import Column, Integer, String, Date, Boolean, ForeignKey, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import date
 
 from app import db
 
+# Tenant.plano after its subscription ended with no fallback plan configured:
+# no features, and every limited resource counts as exhausted
+SEM_PLANO = 'sem_plano'
+
 
 class Tenant(db.Model):
     __tablename__ = 'tenants'
@@ -17,8 +22,12 @@ class Tenant(db.Model):
     status = Column(String(20), default='ativo', nullable=False)
     limite_funcionarios = Column(Integer, default=0)
     limite_animais = Column(Integer, default=0)
+    limite_armazenamento_mb = Column(Integer, default=0)  # Media storage in MiB (0 = no limit)
     ativo = Column(Boolean, default=True)
     schema_name = Column(String(100), unique=True, nullable=False)
+    # Entitlements denormalized from the current plan (see TenantService.assign_subscription_plan)
+    plano_id = Column(Integer, ForeignKey('planos_assinatura.id'), nullable=True)
+    recursos = Column(JSONB)  # Compiled feature flags, e.g. ["backup_automatico", "relatorios"]
 
     # Relationships - these will be added by other models using backref
     # usuarios = relationship back-referenced from Usuario
@@ -36,18 +45,11 @@ class Tenant(db.Model):
         return f"<Tenant {self.nome}>"
 
     def criar_schema(self):
-        """Creates the database schema for the tenant."""
-        # This needs to be implemented using raw SQL or a schema management tool
-        # based on your specific database setup and privileges.
-        try:
-            # Use SQLAlchemy's text() for raw SQL execution
-            db.session.execute(text(f"CREATE SCHEMA IF NOT EXISTS {self.schema_name}"))
-            db.session.commit()
-            return True
-        except Exception as e:
-            db.session.rollback()
-            print(f"Error creating schema {self.schema_name}: {e}")
-            return False
+        """Creates and provisions the database schema for the tenant."""
+        # Tables and default configurations are replayed from the cached DDL
+        # snapshot by the provisioning pipeline in TenantService.
+        from app.services.tenant_service import TenantService
+        return TenantService().provision_schema(self)
 
     def suspender(self):
         """Suspend the tenant."""
@@ -63,12 +65,16 @@ class Tenant(db.Model):
 
     def verificar_limite_funcionarios(self, quantidade_atual: int) -> bool:
         """Check if the tenant is within the employee limit."""
+        if self.plano == SEM_PLANO:
+            return False
         if self.limite_funcionarios <= 0:  # No limit
             return True
         return quantidade_atual < self.limite_funcionarios
 
     def verificar_limite_animais(self, quantidade_atual: int) -> bool:
         """Check if the tenant is within the animal limit."""
+        if self.plano == SEM_PLANO:
+            return False
         if self.limite_animais <= 0:  # No limit
             return True
         return quantidade_atual < self.limite_animais
@@ -95,6 +101,9 @@ class Tenant(db.Model):
             'status': self.status,
             'limite_funcionarios': self.limite_funcionarios,
             'limite_animais': self.limite_animais,
+            'limite_armazenamento_mb': self.limite_armazenamento_mb,
             'ativo': self.ativo,
-            'schema_name': self.schema_name
+            'schema_name': self.schema_name,
+            'plano_id': self.plano_id,
+            'recursos': self.recursos or []
         }
\ No newline at end of file
@@ -9,6 +9,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError, DataError
 from sqlalchemy import or_
 from datetime import date, datetime
+from werkzeug.exceptions import HTTPException
 
 from app import db
 
@@ -56,7 +57,8 @@ animal_model = animal_ns.model('Animal', {
     'linhagem_id': fields.Integer(description='ID da linhagem'),
     'mother_id': fields.Integer(description='ID da mãe'),
     'father_id': fields.Integer(description='ID do pai'),
-    'tenant_id': fields.Integer(readOnly=True, description='ID do tenant')
+    'tenant_id': fields.Integer(readOnly=True, description='ID do tenant'),
+    'foto': fields.Raw(readOnly=True, description='Foto principal: {id, url, variantes (thumb, medium, web)}')
 })
 
 # Modelo para listagem com metadados
@@ -136,6 +138,12 @@ class AnimalList(Resource):
                 error_out=False
             )
             
+            # Foto principal (URLs das variantes) de todos os animais da página em uma consulta
+            from app.resources.media_resource import fotos_principais
+            fotos = fotos_principais(current_tenant_id, [animal.id for animal in pagination.items])
+            for animal in pagination.items:
+                animal.foto = fotos.get(animal.id)
+            
             # Resposta com metadados
             response = {
                 'items': pagination.items,
@@ -205,6 +213,7 @@ class AnimalList(Resource):
             # Remover campos que não devem ser definidos pelo usuário
             data.pop('id', None)
             data.pop('tenant_id', None)
+            data.pop('foto', None)
             
             # Definir valores padrão
             data.setdefault('status', 'Ativo')
@@ -271,6 +280,9 @@ class AnimalResource(Resource):
             if not animal:
                 animal_ns.abort(404, message=f'Animal {id} não encontrado ou não pertence ao seu tenant')
             
+            from app.resources.media_resource import fotos_principais
+            animal.foto = fotos_principais(current_tenant_id, [animal.id]).get(animal.id)
+            
             return animal, 200
             
         except SQLAlchemyError as e:
@@ -313,6 +325,7 @@ class AnimalResource(Resource):
             # Remover campos que não devem ser alterados
             data.pop('id', None)
             data.pop('tenant_id', None)
+            data.pop('foto', None)
             
             # Validações
             if 'sexo' in data and data['sexo'] not in ['M', 'F']:
@@ -503,4 +516,112 @@ class AnimalStats(Resource):
             animal_ns.abort(500, message='Erro de banco de dados')
         except Exception as e:
             current_app.logger.error(f"Erro inesperado ao obter estatísticas: {e}")
-            animal_ns.abort(500, message='Erro interno do servidor')
\ No newline at end of file
+            animal_ns.abort(500, message='Erro interno do servidor')
+
+
+# Parsers das análises de crescimento
+growth_curve_parser = reqparse.RequestParser()
+growth_curve_parser.add_argument('raca_id', type=int, help='Filtrar por raça')
+growth_curve_parser.add_argument('metrica', type=str, default='peso', choices=['peso', 'altura'], help='Medida analisada')
+
+underweight_parser = reqparse.RequestParser()
+underweight_parser.add_argument('raca_id', type=int, help='Filtrar por raça')
+underweight_parser.add_argument('percentil', type=float, default=10.0, help='Percentil da raça/idade abaixo do qual o filhote é sinalizado')
+underweight_parser.add_argument('razao_ninhada', type=float, default=0.85, help='Fração da mediana da ninhada abaixo da qual o filhote é sinalizado')
+
+
+@animal_ns.route('/growth/curves')
+class AnimalGrowthCurves(Resource):
+    @jwt_required()
+    @animal_ns.doc('get_growth_curves')
+    @animal_ns.expect(growth_curve_parser)
+    def get(self):
+        """
+        Curvas de crescimento: percentis (p10-p90) por raça e semana de idade
+        """
+        try:
+            current_tenant_id = get_current_tenant_id()
+            args = growth_curve_parser.parse_args()
+
+            from app.services.growth_service import GrowthAnalyticsService
+            curves = GrowthAnalyticsService().growth_curves(current_tenant_id, args['raca_id'], args['metrica'])
+
+            response = {'metrica': args['metrica'], 'items': curves}
+            if args['raca_id'] is not None:
+                from app.models.identity import Raca
+                raca = db.session.get(Raca, args['raca_id'])
+                if raca:
+                    response['padrao_raca'] = {'peso_medio': raca.peso_medio, 'altura_media': raca.altura_media}
+            return response, 200
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            current_app.logger.error(f"Erro ao calcular curvas de crescimento: {e}")
+            animal_ns.abort(500, message='Erro de banco de dados')
+        except Exception as e:
+            current_app.logger.error(f"Erro inesperado ao calcular curvas de crescimento: {e}")
+            animal_ns.abort(500, message='Erro interno do servidor')
+
+
+@animal_ns.route('/growth/underweight')
+class UnderweightPuppies(Resource):
+    @jwt_required()
+    @animal_ns.doc('list_underweight_puppies')
+    @animal_ns.expect(underweight_parser)
+    def get(self):
+        """
+        Filhotes abaixo do peso esperado para a raça e idade ou para a ninhada
+        """
+        try:
+            current_tenant_id = get_current_tenant_id()
+            args = underweight_parser.parse_args()
+
+            from app.services.growth_service import GrowthAnalyticsService
+            items = GrowthAnalyticsService().underweight_puppies(
+                current_tenant_id,
+                raca_id=args['raca_id'],
+                percentil=args['percentil'],
+                razao_ninhada=args['razao_ninhada'],
+            )
+            return {'items': items, '_meta': {'total': len(items)}}, 200
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            current_app.logger.error(f"Erro ao listar filhotes abaixo do peso: {e}")
+            animal_ns.abort(500, message='Erro de banco de dados')
+        except Exception as e:
+            current_app.logger.error(f"Erro inesperado ao listar filhotes abaixo do peso: {e}")
+            animal_ns.abort(500, message='Erro interno do servidor')
+
+
+@animal_ns.route('/<int:id>/growth')
+@animal_ns.param('id', 'ID do animal')
+class AnimalGrowth(Resource):
+    @jwt_required()
+    @animal_ns.doc('get_animal_growth')
+    def get(self, id):
+        """
+        Evolução do animal com percentil na raça/idade e razão para a ninhada
+        """
+        try:
+            current_tenant_id = get_current_tenant_id()
+
+            from app.models.animal import Animal
+            animal = Animal.query.filter_by(id=id, tenant_id=current_tenant_id).first()
+            if not animal:
+                animal_ns.abort(404, message=f'Animal {id} não encontrado')
+
+            from app.services.growth_service import GrowthAnalyticsService
+            items = GrowthAnalyticsService().animal_growth(current_tenant_id, animal.id, animal.raca_id)
+            return {'animal_id': animal.id, 'nome': animal.nome, 'raca_id': animal.raca_id, 'items': items}, 200
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            current_app.logger.error(f"Erro ao obter crescimento do animal {id}: {e}")
+            animal_ns.abort(500, message='Erro de banco de dados')
+        except Exception as e:
+            current_app.logger.error(f"Erro inesperado ao obter crescimento do animal {id}: {e}")
+            animal_ns.abort(500, message='Erro interno do servidor')
@@ -1,10 +1,12 @@
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, get_jwt
+from werkzeug.exceptions import HTTPException
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from app import db
 from app.models.system import Usuario
 from app.models.tenant import Tenant # Assuming Tenant model is needed to confirm tenant_id
+from app.services.token_service import revoke_token
 from sqlalchemy.exc import SQLAlchemyError
 
 
@@ -18,7 +20,8 @@ login_model = auth_ns.model('Login', {
 
 # Model for login response (including JWT token)
 auth_token_model = auth_ns.model('AuthToken', {
-    'access_token': fields.String(required=True, description='JWT Access Token')
+    'access_token': fields.String(required=True, description='JWT Access Token'),
+    'refresh_token': fields.String(description='JWT Refresh Token (send to /auth/refresh)')
 })
 
 # Model for user registration request
@@ -36,6 +39,16 @@ user_info_model = auth_ns.model('UserInfo', {
 })
 
 
+def _issue_tokens(user):
+    """Issues a new access/refresh token pair for the user."""
+    identity = str(user.id)
+    claims = {'tenant_id': user.tenant_id}
+    return {
+        'access_token': create_access_token(identity=identity, additional_claims=claims),
+        'refresh_token': create_refresh_token(identity=identity, additional_claims=claims),
+    }
+
+
 @auth_ns.route('/login')
 class UserLogin(Resource):
     @auth_ns.doc('user_login')
@@ -76,12 +89,11 @@ class UserLogin(Resource):
             if not check_password_hash(user.senha, senha):
                 auth_ns.abort(401, message='Invalid credentials') # Use generic message for security
 
-            # Authentication successful, create JWT
-            # Include user_id and tenant_id in the token payload
-            access_token = create_access_token(identity=str(user.id))
-
-            return {'access_token': access_token}, 200
+            # Authentication successful, create access and refresh tokens
+            return _issue_tokens(user), 200
 
+        except HTTPException:
+            raise
         except Exception as e:
             # Log the error for debugging
             print(f"Error during login for user {login}: {e}")
@@ -145,12 +157,12 @@ class UserRegister(Resource):
             print(f"New user registered: {login} for tenant ID {tenant_id}")
 
             # Optional: Return a JWT token upon successful registration (auto-login)
-            access_token = create_access_token(identity=str(new_user.id))
-
-            return {'access_token': access_token}, 201
+            return _issue_tokens(new_user), 201
             # Or just return a success message:
             # return {'message': 'User registered successfully.'}, 201
 
+        except HTTPException:
+            raise
         except SQLAlchemyError as e:
             db.session.rollback()
             print(f"Database error during user registration: {e}")
@@ -160,6 +172,52 @@ class UserRegister(Resource):
             print(f"An unexpected error occurred during user registration: {e}")
             auth_ns.abort(500, message='An unexpected error occurred during registration.')
 
+@auth_ns.route('/refresh')
+class TokenRefresh(Resource):
+    @auth_ns.doc('refresh_token')
+    @jwt_required(refresh=True)
+    @auth_ns.marshal_with(auth_token_model, code=200)
+    def post(self):
+        """
+        Exchange a refresh token for a new access/refresh token pair.
+        The presented refresh token is revoked (rotation), so each one can be used only once.
+        """
+        current_user_id = get_jwt_identity()
+
+        user = db.session.get(Usuario, int(current_user_id))
+        if not user or not user.ativo:
+            auth_ns.abort(401, message='User not found or inactive')
+
+        try:
+            revoked = revoke_token(get_jwt())
+        except Exception as e:
+            print(f"Error revoking refresh token for user {current_user_id}: {e}")
+            auth_ns.abort(503, message='Could not refresh the session, please log in again')
+
+        # A concurrent request already rotated this token
+        if not revoked:
+            auth_ns.abort(401, message='Token has been revoked')
+
+        return _issue_tokens(user), 200
+
+
+@auth_ns.route('/logout')
+class UserLogout(Resource):
+    @auth_ns.doc('user_logout')
+    @jwt_required(refresh=True)
+    def post(self):
+        """
+        Revoke the refresh token, ending the session on this device.
+        """
+        try:
+            revoke_token(get_jwt())
+        except Exception as e:
+            print(f"Error revoking refresh token: {e}")
+            auth_ns.abort(503, message='Could not end the session')
+
+        return {'message': 'Logged out successfully'}, 200
+
+
 @auth_ns.route('/me')
 class UserInfo(Resource):
     @auth_ns.doc('get_user_info')
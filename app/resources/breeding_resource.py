@@ -1,8 +1,11 @@
 from flask import request, current_app
-from flask_restx import Namespace, Resource, fields, reqparse, abort
+from flask_restx import Namespace, Resource, fields, reqparse, abort, inputs
+from sqlalchemy import func, insert, or_, update
+from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError, DataError
-from datetime import date, datetime # Import datetime for potential date comparisons
-from flask_jwt_extended import get_jwt_identity # Assuming tenant_id can be obtained from JWT identity
+from datetime import date, datetime, timedelta # Import datetime for potential date comparisons
+from flask_jwt_extended import verify_jwt_in_request
+from werkzeug.exceptions import HTTPException
 
 # Configure logging (basic example)
 # import logging
@@ -11,8 +14,15 @@ from flask_jwt_extended import get_jwt_identity # Assuming tenant_id can be obta
 
 
 from app import db
-from app.models.breeding import Ninhada, Cruzamento, ArvoreGenealogica
-from app.models.animal import Animal, Matriz # Assuming Matriz is needed for validation
+from app.models.breeding import Ninhada, Cruzamento, ArvoreGenealogica, RegistroCio, EventoCalendario
+from app.models.animal import Animal, Matriz, Reprodutor, Filhote # Assuming Matriz is needed for validation
+from app.utils.decorators import get_jwt_tenant_id
+from app.utils.pagination import keyset_paginate
+from app.services.breeding_calendar_service import BreedingCalendarService, schedule_calendar_refresh
+from app.services.genealogy_service import schedule_inbreeding_calculation
+from app.services.reproductive_summary_service import (
+    DIMENSOES, ReproductiveSummaryService, schedule_summary_refresh, summary_years
+)
 
 
 breeding_ns = Namespace('breeding', description='Breeding related operations (Litters, Crossings, Genealogy Trees)')
@@ -38,11 +48,14 @@ cruzamento_model = breeding_ns.model('Cruzamento', {
     'data_acasalamento': fields.Date(required=True, description='Date of mating (YYYY-MM-DD)'), # Make required in API
     'tipo': fields.String(description='Type of crossing'),
     'confirmado': fields.Boolean(description='Is the crossing confirmed?'),
-    'coeficiente_consanguinidade': fields.Float(readOnly=True, description='Calculated inbreeding coefficient'), # Should be calculated, not set directly
+    'coeficiente_consanguinidade': fields.Float(readOnly=True, description='Expected inbreeding coefficient of the offspring, computed in background'),
+    'status_consanguinidade': fields.String(readOnly=True, description='Inbreeding calculation status: pendente, calculada, indisponivel or erro'),
+    'consanguinidade_calculada_em': fields.DateTime(readOnly=True, description='When the inbreeding coefficient was computed'),
     'observacoes': fields.String(description='Additional observations'),
     'data_confirmacao': fields.Date(description='Date of confirmation (YYYY-MM-DD)'),
     # Relationships to Matriz and Reprodutor (Animals) can be handled by nested models or IDs
-    'animais_ids': fields.List(fields.Integer, required=True, min_items=2, description='IDs of the animals involved (at least two)'), # Make required and add min_items
+    'animais_ids': fields.List(fields.Integer, required=True, min_items=2, description='IDs of the animals involved (at least two)', # Make required and add min_items
+                               attribute=lambda c: [animal.id for animal in c.animais] if hasattr(c, 'animais') else c.get('animais_ids')),
 })
 
 arvore_genealogica_model = breeding_ns.model('ArvoreGenealogica', {
@@ -54,19 +67,66 @@ arvore_genealogica_model = breeding_ns.model('ArvoreGenealogica', {
 })
 
 
-# Helper to get current tenant ID (Assuming this function is reliable after middleware)
+# Helper to get current tenant ID from the authenticated user's token
 def get_current_tenant_id():
     try:
-        # This requires @jwt_required() or similar on the endpoint or a mechanism
-        # to ensure get_jwt_identity() returns a valid identity/tenant_id.
-        # In a real application, you might get this from Flask's `g` context after middleware.
-        tenant_id = get_jwt_identity() # Example: assuming JWT identity is the tenant_id
-        if tenant_id is None:
-             abort(401, "Tenant context not available. Authentication required or tenant not identified.")
-        return tenant_id
+        verify_jwt_in_request()
+        tenant_id = get_jwt_tenant_id()
     except Exception as e:
         current_app.logger.error(f"Error getting tenant context: {e}")
+        tenant_id = None
+    if tenant_id is None:
         abort(401, "Tenant context not available. Authentication required or tenant not identified.")
+    return tenant_id
+
+
+# List representations: the related animals are batch-loaded with
+# selectinload and only their base columns are marshalled, so a page costs
+# a fixed number of queries regardless of how many rows it holds.
+animal_resumo_model = breeding_ns.model('AnimalResumo', {
+    'id': fields.Integer(readOnly=True),
+    'nome': fields.String,
+    'sexo': fields.String,
+    'tipo_animal': fields.String,
+})
+
+ninhada_item_model = breeding_ns.clone('NinhadaItem', ninhada_model, {
+    'matriz_nome': fields.String(attribute='matriz.nome', readOnly=True),
+    'filhotes': fields.List(fields.Nested(animal_resumo_model), readOnly=True),
+})
+
+# Filled by the background inbreeding calculation only
+CRUZAMENTO_COMPUTED_FIELDS = ('coeficiente_consanguinidade', 'status_consanguinidade', 'consanguinidade_calculada_em')
+
+cruzamento_item_model = breeding_ns.clone('CruzamentoItem', cruzamento_model, {
+    'animais': fields.List(fields.Nested(animal_resumo_model), readOnly=True),
+})
+
+
+def _page_model(name, item_model):
+    return breeding_ns.model(name, {
+        'items': fields.List(fields.Nested(item_model)),
+        '_meta': fields.Raw(description='Pagination metadata: limit, has_next, next_cursor')
+    })
+
+
+ninhada_page_model = _page_model('NinhadaPage', ninhada_item_model)
+cruzamento_page_model = _page_model('CruzamentoPage', cruzamento_item_model)
+
+breeding_list_parser = reqparse.RequestParser()
+breeding_list_parser.add_argument('data_inicio', type=inputs.date_from_iso8601, location='args', help='From date (YYYY-MM-DD, inclusive)')
+breeding_list_parser.add_argument('data_fim', type=inputs.date_from_iso8601, location='args', help='Until date (YYYY-MM-DD, inclusive)')
+breeding_list_parser.add_argument('limit', type=int, location='args', help='Page size (default 50, max 200)')
+breeding_list_parser.add_argument('cursor', type=str, location='args', help='next_cursor from the previous page')
+
+ninhada_list_parser = breeding_list_parser.copy()
+ninhada_list_parser.add_argument('status', type=str, choices=('prevista', 'nascida'), location='args',
+                                 help='prevista (no birth recorded yet) or nascida')
+ninhada_list_parser.add_argument('matriz_id', type=int, location='args', help='Filter by mother')
+
+cruzamento_list_parser = breeding_list_parser.copy()
+cruzamento_list_parser.add_argument('confirmado', type=inputs.boolean, location='args', help='Filter by confirmation status')
+cruzamento_list_parser.add_argument('animal_id', type=int, location='args', help='Filter by an animal involved in the crossing')
 
 
 # --- Ninhada Resources ---
@@ -75,15 +135,43 @@ def get_current_tenant_id():
 class NinhadaList(Resource):
     # @jwt_required() # Add JWT protection
     @breeding_ns.doc('list_ninhadas')
-    @breeding_ns.marshal_list_with(ninhada_model)
+    @breeding_ns.expect(ninhada_list_parser)
+    @breeding_ns.marshal_with(ninhada_page_model)
     def get(self):
-        """List all litters for the current tenant"""
+        """
+        List the current tenant's litters, newest first, with keyset pagination.
+        The date range applies to the birth date, or the predicted one while
+        the litter is not born.
+        """
         try:
             current_tenant_id = get_current_tenant_id()
-            # Filter by tenant_id
-            ninhadas = Ninhada.query.filter_by(tenant_id=current_tenant_id).all()
-            return ninhadas
-
+            args = ninhada_list_parser.parse_args()
+
+            query = Ninhada.query.options(
+                selectinload(Ninhada.matriz),
+                selectinload(Ninhada.filhotes),
+            ).filter(Ninhada.tenant_id == current_tenant_id)
+
+            if args['status'] == 'prevista':
+                query = query.filter(Ninhada.data_parto.is_(None))
+            elif args['status'] == 'nascida':
+                query = query.filter(Ninhada.data_parto.isnot(None))
+            if args['matriz_id'] is not None:
+                query = query.filter(Ninhada.matriz_id == args['matriz_id'])
+            data_referencia = func.coalesce(Ninhada.data_parto, Ninhada.data_previsao_parto)
+            if args['data_inicio'] is not None:
+                query = query.filter(data_referencia >= args['data_inicio'])
+            if args['data_fim'] is not None:
+                query = query.filter(data_referencia <= args['data_fim'])
+
+            try:
+                ninhadas, meta = keyset_paginate(query, [Ninhada.id], limit=args['limit'], cursor=args['cursor'])
+            except ValueError as e:
+                abort(400, message=str(e))
+            return {'items': ninhadas, '_meta': meta}
+
+        except HTTPException:
+            raise
         except SQLAlchemyError as e:
             current_app.logger.error(f"Database error during ninhada listing: {e}")
             abort(500, message='Database error occurred.')
@@ -167,6 +255,8 @@ class NinhadaList(Resource):
 
             db.session.add(new_ninhada)
             db.session.commit()
+            schedule_calendar_refresh(current_tenant_id)
+            schedule_summary_refresh(current_tenant_id, summary_years(new_ninhada.data_parto, cruzamento.data_acasalamento))
 
             return new_ninhada, 201
 
@@ -230,6 +320,7 @@ class NinhadaResource(Resource):
             )
 
             update_data = breeding_ns.payload
+            data_parto_anterior = ninhada.data_parto
 
             # Prevent updating immutable fields if necessary
             if 'cruzamento_id' in update_data:
@@ -289,6 +380,11 @@ class NinhadaResource(Resource):
 
 
             db.session.commit()
+            schedule_calendar_refresh(current_tenant_id)
+            schedule_summary_refresh(current_tenant_id, summary_years(
+                data_parto_anterior, ninhada.data_parto,
+                ninhada.cruzamento.data_acasalamento if ninhada.cruzamento else None,
+            ))
             return ninhada
 
         except DataError as e:
@@ -322,8 +418,10 @@ class NinhadaResource(Resource):
                  description=f"Ninhada with ID {id} not found for this tenant"
             )
 
+            anos = summary_years(ninhada.data_parto, ninhada.cruzamento.data_acasalamento if ninhada.cruzamento else None)
             db.session.delete(ninhada)
             db.session.commit()
+            schedule_summary_refresh(current_tenant_id, anos)
 
             return '', 204 # 204 No Content on successful deletion
 
@@ -337,21 +435,219 @@ class NinhadaResource(Resource):
             abort(500, message='An error occurred during ninhada deletion.')
 
 
+# --- Litter birth ---
+
+PARTO_MAX_FILHOTES = 30
+
+filhote_parto_model = breeding_ns.model('FilhoteParto', {
+    'nome': fields.String(description='Name; defaults to "<dam> - filhote <order>"'),
+    'sexo': fields.String(required=True, description="'M' or 'F'"),
+    'cor': fields.String,
+    'peso_nascimento': fields.Float(description='Birth weight'),
+    'microchip': fields.String,
+    'observacoes': fields.String,
+})
+
+parto_model = breeding_ns.model('Parto', {
+    'data_parto': fields.Date(required=True, description='Date of birth (YYYY-MM-DD)'),
+    'qtd_mortos': fields.Integer(description='Stillborn puppies (default 0)'),
+    'filhotes': fields.List(fields.Nested(filhote_parto_model), required=True, description='Live puppies, in birth order'),
+})
+
+filhote_criado_model = breeding_ns.model('FilhoteCriado', {
+    'id': fields.Integer,
+    'nome': fields.String,
+    'sexo': fields.String,
+    'ordem_nascimento': fields.Integer,
+    'peso_nascimento': fields.Float,
+    'mother_id': fields.Integer,
+    'father_id': fields.Integer,
+})
+
+parto_result_model = breeding_ns.model('PartoResult', {
+    'ninhada': fields.Nested(ninhada_model),
+    'filhotes': fields.List(fields.Nested(filhote_criado_model)),
+})
+
+
+def register_litter_birth(tenant_id, ninhada_id, data):
+    """
+    Records a litter's birth and creates its live puppies as Filhote rows.
+
+    Mother and father come from the litter and its crossing. The puppies are
+    written with one batched INSERT ... RETURNING into animais plus one into
+    filhotes, and the parents' qtd_filhotes counters are incremented in SQL,
+    all in one transaction (the litter row is locked against double entry).
+    """
+    ninhada = Ninhada.query.filter_by(id=ninhada_id, tenant_id=tenant_id).with_for_update().first_or_404(
+        description=f"Ninhada with ID {ninhada_id} not found for this tenant"
+    )
+    if ninhada.data_parto is not None:
+        abort(409, message='Birth already registered for this litter.')
+
+    data_parto = data.get('data_parto')
+    if not data_parto:
+        abort(400, message='Missing or empty required field: data_parto')
+    try:
+        if not isinstance(data_parto, str):
+            raise ValueError(data_parto)
+        data_parto = date.fromisoformat(data_parto)
+    except ValueError:
+        abort(400, message='Invalid date format for data_parto. Use YYYY-MM-DD.')
+    if data_parto > date.today():
+        abort(400, message='data_parto cannot be in the future.')
+
+    filhotes = data.get('filhotes') or []
+    qtd_mortos = data.get('qtd_mortos') or 0
+    if not isinstance(filhotes, list) or len(filhotes) > PARTO_MAX_FILHOTES:
+        abort(400, message=f'filhotes must be a list of at most {PARTO_MAX_FILHOTES} puppies.')
+    if not isinstance(qtd_mortos, int) or qtd_mortos < 0:
+        abort(400, message='qtd_mortos must be a non-negative integer.')
+    for ordem, filhote in enumerate(filhotes, start=1):
+        if not isinstance(filhote, dict) or filhote.get('sexo') not in ('M', 'F'):
+            abort(400, message=f"Puppy {ordem}: sexo must be 'M' or 'F'.")
+
+    # Parents: the litter's dam, and the male of its crossing
+    matriz = Animal.query.filter_by(id=ninhada.matriz_id, tenant_id=tenant_id).first() if ninhada.matriz_id else None
+    reprodutor = ninhada.cruzamento.matriz_e_reprodutor()[1] if ninhada.cruzamento else None
+    if matriz is None and ninhada.cruzamento:
+        matriz = ninhada.cruzamento.matriz_e_reprodutor()[0]
+    if matriz is None:
+        abort(400, message='The litter has no dam; set matriz_id or the crossing first.')
+    # Breed is inherited only when both known parents share it
+    raca_id = matriz.raca_id if reprodutor is None or reprodutor.raca_id == matriz.raca_id else None
+
+    animais_rows = []
+    for ordem, filhote in enumerate(filhotes, start=1):
+        animais_rows.append({
+            'nome': filhote.get('nome') or f'{matriz.nome} - filhote {ordem}',
+            'sexo': filhote['sexo'],
+            'cor': filhote.get('cor'),
+            'peso': filhote.get('peso_nascimento'),
+            'microchip': filhote.get('microchip') or None,
+            'observacoes': filhote.get('observacoes'),
+            'data_nascimento': data_parto,
+            'origem': 'Nascido no canil',
+            'ativo': True,
+            'tipo_animal': 'Filhote',
+            'raca_id': raca_id,
+            'mother_id': matriz.id,
+            'father_id': reprodutor.id if reprodutor else None,
+            'tenant_id': tenant_id,
+        })
+
+    animais = Animal.__table__
+    criados = []
+    if animais_rows:
+        ids = db.session.execute(
+            insert(animais).returning(animais.c.id, sort_by_parameter_order=True), animais_rows
+        ).scalars().all()
+        filhotes_rows = [
+            {'id': animal_id, 'ninhada_id': ninhada.id, 'ordem_nascimento': ordem,
+             'peso_nascimento': row['peso'], 'reservado': False}
+            for ordem, (animal_id, row) in enumerate(zip(ids, animais_rows), start=1)
+        ]
+        db.session.execute(insert(Filhote.__table__), filhotes_rows)
+        criados = [
+            {**row, 'id': filhote['id'], 'ordem_nascimento': filhote['ordem_nascimento'],
+             'peso_nascimento': filhote['peso_nascimento']}
+            for row, filhote in zip(animais_rows, filhotes_rows)
+        ]
+
+    ninhada.registrar_parto(data_parto, len(animais_rows), qtd_mortos)
+    if ninhada.matriz_id is None:
+        ninhada.matriz_id = matriz.id
+
+    # Counters are incremented in SQL so concurrent births cannot lose updates
+    for model, animal in ((Matriz, matriz), (Reprodutor, reprodutor)):
+        if animal is None or not isinstance(animal, model):
+            continue
+        table = model.__table__
+        values = {'qtd_filhotes': func.coalesce(table.c.qtd_filhotes, 0) + len(animais_rows)}
+        # A litter born entirely stillborn leaves the dam with nothing to nurse
+        if model is Matriz and animais_rows:
+            values['status_reprodutivo'] = 'Lactante'
+        db.session.execute(update(table).where(table.c.id == animal.id).values(**values))
+
+    db.session.commit()
+    return {'ninhada': ninhada, 'filhotes': criados}
+
+
+@breeding_ns.route('/ninhadas/<int:id>/parto')
+@breeding_ns.param('id', 'The litter identifier')
+class NinhadaParto(Resource):
+    @breeding_ns.doc('register_ninhada_parto')
+    @breeding_ns.expect(parto_model)
+    @breeding_ns.marshal_with(parto_result_model, code=201)
+    def post(self, id):
+        """Register a litter's birth and create all its puppies in one batch"""
+        try:
+            current_tenant_id = get_current_tenant_id()
+            result = register_litter_birth(current_tenant_id, id, dict(breeding_ns.payload or {}))
+            schedule_calendar_refresh(current_tenant_id)
+            ninhada = result['ninhada']
+            schedule_summary_refresh(current_tenant_id, summary_years(
+                ninhada.data_parto, ninhada.cruzamento.data_acasalamento if ninhada.cruzamento else None
+            ))
+            return result, 201
+        except HTTPException:
+            raise
+        except IntegrityError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Integrity error during birth registration for ninhada {id}: {e}")
+            abort(409, message='A puppy violates a unique constraint (e.g. microchip already in use).')
+        except DataError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Data error during birth registration for ninhada {id}: {e}")
+            abort(400, message='Invalid data format or value.')
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Database error during birth registration for ninhada {id}: {e}")
+            abort(500, message='Database error occurred.')
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"An unexpected error occurred during birth registration for ninhada {id}: {e}")
+            abort(500, message='An error occurred during birth registration.')
+
+
 # --- Cruzamento Resources ---
 
 @breeding_ns.route('/cruzamentos')
 class CruzamentoList(Resource):
     # @jwt_required() # Add JWT protection
     @breeding_ns.doc('list_cruzamentos')
-    @breeding_ns.marshal_list_with(cruzamento_model)
+    @breeding_ns.expect(cruzamento_list_parser)
+    @breeding_ns.marshal_with(cruzamento_page_model)
     def get(self):
-        """List all crossings for the current tenant"""
+        """List the current tenant's crossings by mating date, newest first, with keyset pagination"""
         try:
             current_tenant_id = get_current_tenant_id()
-            # Filter by tenant_id
-            cruzamentos = Cruzamento.query.filter_by(tenant_id=current_tenant_id).all()
-            return cruzamentos
-
+            args = cruzamento_list_parser.parse_args()
+
+            query = Cruzamento.query.options(
+                selectinload(Cruzamento.animais),
+            ).filter(Cruzamento.tenant_id == current_tenant_id)
+
+            if args['confirmado'] is not None:
+                query = query.filter(Cruzamento.confirmado.is_(args['confirmado']))
+            if args['animal_id'] is not None:
+                query = query.filter(Cruzamento.animais.any(Animal.id == args['animal_id']))
+            if args['data_inicio'] is not None:
+                query = query.filter(Cruzamento.data_acasalamento >= args['data_inicio'])
+            if args['data_fim'] is not None:
+                query = query.filter(Cruzamento.data_acasalamento <= args['data_fim'])
+
+            try:
+                cruzamentos, meta = keyset_paginate(
+                    query, [Cruzamento.data_acasalamento, Cruzamento.id],
+                    limit=args['limit'], cursor=args['cursor']
+                )
+            except ValueError as e:
+                abort(400, message=str(e))
+            return {'items': cruzamentos, '_meta': meta}
+
+        except HTTPException:
+            raise
         except SQLAlchemyError as e:
             current_app.logger.error(f"Database error during cruzamento listing: {e}")
             abort(500, message='Database error occurred.')
@@ -423,24 +719,22 @@ class CruzamentoList(Resource):
             # Ensure tenant_id is set on the new object
             data['tenant_id'] = current_tenant_id
 
-            # Remove list of IDs from data before passing to model constructor if model expects relationship objects
-            # animal_ids_for_relationship = data.pop('animais_ids') # Keep the list if needed for manual association
-            # new_cruzamento = Cruzamento(**data)
-            # # Manually associate animals if not handled by model constructor
-            # for animal in associated_animals:
-            #      new_cruzamento.animais.append(animal)
-            # Or if model handles list of IDs directly:
-            new_cruzamento = Cruzamento(**data) # Assuming Cruzamento model handles 'animais_ids' directly or via a setter
+            # Computed fields are never taken from the payload
+            for field in CRUZAMENTO_COMPUTED_FIELDS:
+                data.pop(field, None)
 
+            # The animals are associated through the relationship, not a column
+            data.pop('animais_ids')
+            new_cruzamento = Cruzamento(**data)
+            new_cruzamento.animais = associated_animals
+            new_cruzamento.marcar_consanguinidade_pendente()
 
             db.session.add(new_cruzamento)
             db.session.commit()
-
-            # Recalculate or trigger calculation of coeficiente_consanguinidade after commit if needed
-            # Example: Trigger a Celery task to calculate consanguinity in background
-            # from app.tasks import calculate_consanguinity_task
-            # calculate_consanguinity_task.delay(new_cruzamento.id)
-
+            schedule_calendar_refresh(current_tenant_id)
+            schedule_summary_refresh(current_tenant_id, summary_years(new_cruzamento.data_acasalamento))
+            # Kept out of the request: the coefficient walks the whole pedigree
+            schedule_inbreeding_calculation(new_cruzamento.id)
 
             return new_cruzamento, 201
 
@@ -504,6 +798,7 @@ class CruzamentoResource(Resource):
             )
 
             update_data = breeding_ns.payload
+            data_acasalamento_anterior = cruzamento.data_acasalamento
 
             # Prevent updating immutable fields if necessary
             if 'tenant_id' in update_data: # Should not be able to change tenant_id
@@ -557,6 +852,8 @@ class CruzamentoResource(Resource):
 
             # Update object attributes
             animal_ids_to_update = update_data.pop('animais_ids', None) # Pop animas_ids to handle separately
+            for field in CRUZAMENTO_COMPUTED_FIELDS:
+                update_data.pop(field, None)
 
             for key, value in update_data.items():
                 if hasattr(cruzamento, key):
@@ -566,20 +863,24 @@ class CruzamentoResource(Resource):
 
 
             # Handle animals_ids update (Many-to-Many)
-            if animal_ids_to_update is not None:
+            animais_alterados = (
+                animal_ids_to_update is not None
+                and set(animal_ids_to_update) != {animal.id for animal in cruzamento.animais}
+            )
+            if animais_alterados:
                  # Clear existing associations and add new ones
                  cruzamento.animais = [] # This might trigger deletes in the association table
                  associated_animals = Animal.query.filter(Animal.id.in_(animal_ids_to_update)).all() # Re-query based on validated IDs
                  for animal in associated_animals:
                       cruzamento.animais.append(animal) # Add new associations
-
+                 cruzamento.marcar_consanguinidade_pendente()
 
             db.session.commit()
 
-            # Recalculate or trigger calculation of coeficiente_consanguinidade after commit if needed
-            # if animal_ids_to_update is not None: # Only if animals involved in crossing changed
-            #     from app.tasks import calculate_consanguinity_task
-            #     calculate_consanguinity_task.delay(cruzamento.id)
+            if animais_alterados:
+                schedule_inbreeding_calculation(cruzamento.id)
+            # Litters follow their mating, so rebuilding from the mating year covers them too
+            schedule_summary_refresh(current_tenant_id, summary_years(data_acasalamento_anterior, cruzamento.data_acasalamento))
 
 
             return cruzamento
@@ -615,8 +916,10 @@ class CruzamentoResource(Resource):
                  description=f"Cruzamento with ID {id} not found for this tenant"
             )
 
+            anos = summary_years(cruzamento.data_acasalamento)
             db.session.delete(cruzamento)
             db.session.commit()
+            schedule_summary_refresh(current_tenant_id, anos)
 
             return '', 204 # 204 No Content on successful deletion
 
@@ -690,4 +993,256 @@ class ArvoreGenealogicaResource(Resource):
             return '', 204
         except Exception as e:
             db.session.rollback()
-            abort(500, message='Database error occurred.')
\ No newline at end of file
+            abort(500, message='Database error occurred.')
+
+
+# --- Heats and breeding calendar ---
+
+registro_cio_model = breeding_ns.model('RegistroCio', {
+    'id': fields.Integer(readOnly=True),
+    'matriz_id': fields.Integer(readOnly=True),
+    'data_inicio': fields.Date(required=True, description='First day of the heat (YYYY-MM-DD)'),
+    'data_fim': fields.Date(description='Last day of the heat (YYYY-MM-DD)'),
+    'observacoes': fields.String(description='Additional observations'),
+})
+
+registro_cio_result_model = breeding_ns.model('RegistroCioResult', {
+    'registro': fields.Nested(registro_cio_model),
+    'proximo_cio': fields.Date(description='Predicted next heat of the dam'),
+    'intervalo_cio_dias': fields.Integer(description='Estimated heat interval in days'),
+})
+
+evento_calendario_model = breeding_ns.model('EventoCalendario', {
+    'tipo': fields.String(description="'cio', 'cio_previsto', 'parto_previsto' or 'reprodutor_disponivel'"),
+    'data_inicio': fields.Date,
+    'data_fim': fields.Date(description='Empty for open-ended events (sire availability)'),
+    'animal_id': fields.Integer,
+    'titulo': fields.String(description='Animal name'),
+    'referencia_id': fields.Integer(description='RegistroCio or Ninhada id, when any'),
+    'detalhes': fields.Raw,
+})
+
+calendario_model = breeding_ns.model('CalendarioReprodutivo', {
+    'items': fields.List(fields.Nested(evento_calendario_model)),
+    '_meta': fields.Raw(description='Requested range and when the calendar was generated'),
+})
+
+CALENDAR_EVENT_TYPES = ('cio', 'cio_previsto', 'parto_previsto', 'reprodutor_disponivel')
+
+calendario_parser = reqparse.RequestParser()
+calendario_parser.add_argument('data_inicio', type=inputs.date_from_iso8601, location='args', help='From date (YYYY-MM-DD, default today)')
+calendario_parser.add_argument('data_fim', type=inputs.date_from_iso8601, location='args', help='Until date (YYYY-MM-DD, default 180 days ahead)')
+calendario_parser.add_argument('tipo', type=str, action='append', choices=CALENDAR_EVENT_TYPES, location='args',
+                               help='Only include these event types')
+calendario_parser.add_argument('animal_id', type=int, action='append', location='args', help='Only include these animals')
+
+
+@breeding_ns.route('/matrizes/<int:id>/cios')
+@breeding_ns.param('id', 'The dam (Matriz) identifier')
+class MatrizCioList(Resource):
+    @breeding_ns.doc('list_cios')
+    @breeding_ns.marshal_list_with(registro_cio_model)
+    def get(self, id):
+        """Heat history of a dam, newest first"""
+        try:
+            current_tenant_id = get_current_tenant_id()
+            return RegistroCio.query.filter_by(matriz_id=id, tenant_id=current_tenant_id).order_by(
+                RegistroCio.data_inicio.desc()
+            ).all()
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            current_app.logger.error(f"Database error during heat listing for matriz {id}: {e}")
+            abort(500, message='Database error occurred.')
+
+    @breeding_ns.doc('create_cio')
+    @breeding_ns.expect(registro_cio_model)
+    @breeding_ns.marshal_with(registro_cio_result_model, code=201)
+    def post(self, id):
+        """Record a heat; predictions and the calendar of the tenant are recomputed"""
+        try:
+            current_tenant_id = get_current_tenant_id()
+            data = breeding_ns.payload or {}
+
+            dates = {}
+            for field in ('data_inicio', 'data_fim'):
+                value = data.get(field)
+                if value is None:
+                    continue
+                try:
+                    dates[field] = value if isinstance(value, date) else date.fromisoformat(value)
+                except (TypeError, ValueError):
+                    abort(400, message=f'Invalid date format for {field}. Use YYYY-MM-DD.')
+            if 'data_inicio' not in dates:
+                abort(400, message='Missing or empty required field: data_inicio')
+            if dates['data_inicio'] > date.today():
+                abort(400, message='data_inicio cannot be in the future.')
+            if dates.get('data_fim') is not None and dates['data_fim'] < dates['data_inicio']:
+                abort(400, message='data_fim cannot be before data_inicio.')
+
+            matriz = Matriz.query.filter_by(id=id, tenant_id=current_tenant_id).first()
+            if not matriz:
+                abort(404, message=f'Matriz with ID {id} not found for this tenant.')
+
+            registro = matriz.registrar_cio(dates['data_inicio'], dates.get('data_fim'), data.get('observacoes'))
+            db.session.flush()
+            BreedingCalendarService().refresh(current_tenant_id)
+            db.session.commit()
+            db.session.refresh(matriz)
+
+            return {
+                'registro': registro,
+                'proximo_cio': matriz.proximo_cio,
+                'intervalo_cio_dias': matriz.intervalo_cio_dias,
+            }, 201
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Database error during heat registration for matriz {id}: {e}")
+            abort(500, message='Database error occurred.')
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"An unexpected error occurred during heat registration for matriz {id}: {e}")
+            abort(500, message='An error occurred during heat registration.')
+
+
+@breeding_ns.route('/calendario')
+class CalendarioReprodutivo(Resource):
+    @breeding_ns.doc('get_calendario')
+    @breeding_ns.expect(calendario_parser)
+    @breeding_ns.marshal_with(calendario_model)
+    def get(self):
+        """Breeding calendar (heats, expected births, sire availability) from the precomputed table"""
+        try:
+            current_tenant_id = get_current_tenant_id()
+            args = calendario_parser.parse_args()
+            inicio = args['data_inicio'] or date.today()
+            fim = args['data_fim'] or inicio + timedelta(days=180)
+            if fim < inicio:
+                abort(400, message='data_fim cannot be before data_inicio.')
+
+            query = EventoCalendario.query.filter(
+                EventoCalendario.tenant_id == current_tenant_id,
+                EventoCalendario.data_inicio <= fim,
+                or_(EventoCalendario.data_fim.is_(None), EventoCalendario.data_fim >= inicio),
+            )
+            if args['tipo']:
+                query = query.filter(EventoCalendario.tipo.in_(args['tipo']))
+            if args['animal_id']:
+                query = query.filter(EventoCalendario.animal_id.in_(args['animal_id']))
+            eventos = query.order_by(EventoCalendario.data_inicio, EventoCalendario.tipo, EventoCalendario.animal_id).all()
+
+            gerado_em = min((e.gerado_em for e in eventos), default=None)
+            return {
+                'items': eventos,
+                '_meta': {
+                    'data_inicio': inicio.isoformat(),
+                    'data_fim': fim.isoformat(),
+                    'total': len(eventos),
+                    'gerado_em': gerado_em.isoformat() if gerado_em else None,
+                },
+            }
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            current_app.logger.error(f"Database error reading breeding calendar: {e}")
+            abort(500, message='Database error occurred.')
+        except Exception as e:
+            current_app.logger.error(f"An unexpected error occurred reading breeding calendar: {e}")
+            abort(500, message='An error occurred while reading the breeding calendar.')
+
+
+@breeding_ns.route('/calendario/recalcular')
+class CalendarioRecalcular(Resource):
+    @breeding_ns.doc('refresh_calendario')
+    def post(self):
+        """Recompute heat predictions and rebuild the tenant's breeding calendar now"""
+        try:
+            current_tenant_id = get_current_tenant_id()
+            total = BreedingCalendarService().refresh(current_tenant_id)
+            db.session.commit()
+            return {'message': 'Breeding calendar rebuilt.', 'total': total}, 200
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Database error rebuilding breeding calendar: {e}")
+            abort(500, message='Database error occurred.')
+
+
+# --- Reproductive report ---
+
+resumo_reprodutivo_model = breeding_ns.model('ResumoReprodutivo', {
+    'dimensao': fields.String(description="'matriz', 'reprodutor' or 'raca'"),
+    'chave_id': fields.Integer(description='Animal or breed id (null for dams without a breed)'),
+    'nome': fields.String(description='Animal or breed name'),
+    'ano': fields.Integer,
+    'ninhadas': fields.Integer(description='Litters born in the year'),
+    'nascidos_vivos': fields.Integer,
+    'nascidos_mortos': fields.Integer,
+    'cruzamentos': fields.Integer(description='Matings in the year'),
+    'cruzamentos_produtivos': fields.Integer(description='Matings of the year that produced a live litter'),
+    'taxa_fertilidade': fields.Float(description='Productive matings / matings, in %'),
+    'taxa_nascidos_vivos': fields.Float(description='Live births / births, in %'),
+    'media_filhotes_ninhada': fields.Float(description='Mean litter size (live and stillborn)'),
+    'intervalo_medio_ninhadas_dias': fields.Float(description="Mean days since the dam's previous litter"),
+    'atualizado_em': fields.DateTime,
+})
+
+relatorio_reprodutivo_model = breeding_ns.model('RelatorioReprodutivo', {
+    'items': fields.List(fields.Nested(resumo_reprodutivo_model)),
+    '_meta': fields.Raw(description='Requested year, dimension and row count'),
+})
+
+relatorio_parser = reqparse.RequestParser()
+relatorio_parser.add_argument('ano', type=int, location='args', help='Year (default: current year)')
+relatorio_parser.add_argument('dimensao', type=str, choices=DIMENSOES, default='matriz', location='args',
+                              help='Group by dam, sire or breed')
+relatorio_parser.add_argument('chave_id', type=int, location='args', help='Only this animal or breed')
+
+
+@breeding_ns.route('/relatorio-reprodutivo')
+class RelatorioReprodutivo(Resource):
+    @breeding_ns.doc('get_relatorio_reprodutivo')
+    @breeding_ns.expect(relatorio_parser)
+    @breeding_ns.marshal_with(relatorio_reprodutivo_model)
+    def get(self):
+        """Yearly reproductive report per dam, sire or breed, read from the rollup table"""
+        try:
+            current_tenant_id = get_current_tenant_id()
+            args = relatorio_parser.parse_args()
+            ano = args['ano'] or date.today().year
+            items = ReproductiveSummaryService().report(current_tenant_id, ano, args['dimensao'], args['chave_id'])
+            return {'items': items, '_meta': {'ano': ano, 'dimensao': args['dimensao'], 'total': len(items)}}
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            current_app.logger.error(f"Database error reading reproductive report: {e}")
+            abort(500, message='Database error occurred.')
+        except Exception as e:
+            current_app.logger.error(f"An unexpected error occurred reading reproductive report: {e}")
+            abort(500, message='An error occurred while reading the reproductive report.')
+
+
+@breeding_ns.route('/relatorio-reprodutivo/recalcular')
+class RelatorioReprodutivoRecalcular(Resource):
+    @breeding_ns.doc('refresh_relatorio_reprodutivo')
+    def post(self):
+        """Rebuild the tenant's whole reproductive rollup now (e.g. after imports)"""
+        try:
+            current_tenant_id = get_current_tenant_id()
+            total = ReproductiveSummaryService().refresh(current_tenant_id)
+            db.session.commit()
+            return {'message': 'Reproductive report rebuilt.', 'total': total}, 200
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Database error rebuilding reproductive report: {e}")
+            abort(500, message='Database error occurred.')
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"An unexpected error occurred rebuilding reproductive report: {e}")
+            abort(500, message='An error occurred while rebuilding the reproductive report.')
@@ -1,13 +1,17 @@
 from flask import request, current_app
-from flask_restx import Namespace, Resource, fields, abort
+from flask_restx import Namespace, Resource, fields, abort, inputs, reqparse
+from sqlalchemy import Date, Float, String, Text, cast, func, insert, literal, null, or_, select, tuple_, union_all
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError, DataError
 from datetime import date  # Needed for date conversion and date comparisons
-from flask_jwt_extended import get_jwt_identity # Assuming tenant_id can be obtained from JWT identity
+from flask_jwt_extended import verify_jwt_in_request
+from werkzeug.exceptions import HTTPException
 
 # Assume Animal model is imported from app.models.animal
 from app.models.animal import Animal
 from app import db
 from app.models.health import RegistroVeterinario, Vacinacao, Vermifugacao, ExameGenetico # Assuming these models are defined
+from app.utils.decorators import get_jwt_tenant_id
+from app.utils.pagination import clamp_page_size, decode_cursor, encode_cursor, keyset_paginate
 
 health_ns = Namespace('health', description='Health related operations (Veterinary Records, Vaccinations, Deworming, Genetic Exams)')
 
@@ -23,7 +27,7 @@ registro_veterinario_model = health_ns.model('RegistroVeterinario', {
     'observacoes': fields.String(description='Additional observations'),
     'status_saude': fields.String(description='Animal\'s health status after consultation'),
     'emergencia': fields.Boolean(description='Was this an emergency consultation?'),
-    # Relationships to Animal can be handled by nested models or IDs
+    'animal_nome': fields.String(readOnly=True, description='Animal name (list endpoints only)'),
 })
 
 vacinacao_model = health_ns.model('Vacinacao', {
@@ -36,7 +40,7 @@ vacinacao_model = health_ns.model('Vacinacao', {
     'laboratorio': fields.String(description='Vaccine manufacturer'),
     'reacao': fields.Boolean(description='Did the animal have a reaction?'),
     'observacoes': fields.String(description='Additional observations'),
-    # Relationships to Animal can be handled by nested models or IDs
+    'animal_nome': fields.String(readOnly=True, description='Animal name (list endpoints only)'),
 })
 
 vermifugacao_model = health_ns.model('Vermifugacao', {
@@ -47,7 +51,7 @@ vermifugacao_model = health_ns.model('Vermifugacao', {
     'dosagem': fields.Float(description='Dosage administered'),
     'proxima_aplicacao': fields.Date(description='Date for the next deworming', example='YYYY-MM-DD'),
     'observacoes': fields.String(description='Additional observations'),
-    # Relationships to Animal can be handled by nested models or IDs
+    'animal_nome': fields.String(readOnly=True, description='Animal name (list endpoints only)'),
 })
 
 exame_genetico_model = health_ns.model('ExameGenetico', {
@@ -60,30 +64,81 @@ exame_genetico_model = health_ns.model('ExameGenetico', {
     'laboratorio': fields.String(description='Laboratory that performed the exam'),
     'observacoes': fields.String(description='Additional observations'),
     'aprovado': fields.Boolean(description='Was the result considered favorable?'),
-    # Relationships to Animal can be handled by nested models or IDs
+    'animal_nome': fields.String(readOnly=True, description='Animal name (list endpoints only)'),
 })
 
 
-# Helper to get current tenant ID (replace with actual logic based on your setup)
-# This assumes get_jwt_identity returns the tenant ID, adjust if needed.
+# Helper to get current tenant ID from the authenticated user's token
 def get_current_tenant_id():
-    # In a real application, the tenant ID would be stored in the request context
-    # or derived from the authenticated user's information after the tenant middleware runs.
-    # For now, we'll use a placeholder or get it from JWT if applicable to your auth flow.
-    # tenant_id = g.current_tenant_id # Example using Flask g context
-    # tenant_id = get_jwt_identity() # If JWT identity is the tenant_id
-    # You need to ensure your JWT setup correctly includes the tenant_id as identity or claim
-    # For demonstration, assuming identity *is* the tenant_id
     try:
-        # This requires @jwt_required() on the endpoint or a similar mechanism
-        # to ensure get_jwt_identity() returns a valid identity.
-        # If your JWT identity is not the tenant_id, you'll need to fetch
-        # the user based on identity and then get their tenant_id.
-        return get_jwt_identity()
+        verify_jwt_in_request()
+        tenant_id = get_jwt_tenant_id()
     except Exception as e:
         current_app.logger.error(f"Error getting tenant context: {e}")
+        tenant_id = None
+    if tenant_id is None:
         # Use Flask-RESTx abort for consistent error responses
-        abort(401, f"Tenant context not available. Authentication required or tenant not identified.")
+        abort(401, "Tenant context not available. Authentication required or tenant not identified.")
+    return tenant_id
+
+
+def _page_model(name, item_model):
+    return health_ns.model(name, {
+        'items': fields.List(fields.Nested(item_model)),
+        '_meta': fields.Raw(description='Pagination metadata: limit, has_next, next_cursor')
+    })
+
+
+registro_veterinario_page_model = _page_model('RegistroVeterinarioPage', registro_veterinario_model)
+vacinacao_page_model = _page_model('VacinacaoPage', vacinacao_model)
+vermifugacao_page_model = _page_model('VermifugacaoPage', vermifugacao_model)
+exame_genetico_page_model = _page_model('ExameGeneticoPage', exame_genetico_model)
+
+# Query parameters shared by the health record lists
+health_list_parser = reqparse.RequestParser()
+health_list_parser.add_argument('animal_id', type=int, location='args', help='Filter by animal')
+health_list_parser.add_argument('data_inicio', type=inputs.date_from_iso8601, location='args', help='From date (YYYY-MM-DD, inclusive)')
+health_list_parser.add_argument('data_fim', type=inputs.date_from_iso8601, location='args', help='Until date (YYYY-MM-DD, inclusive)')
+health_list_parser.add_argument('limit', type=int, location='args', help='Page size (default 50, max 200)')
+health_list_parser.add_argument('cursor', type=str, location='args', help='next_cursor from the previous page')
+
+
+def list_health_records(model, date_column, sort_date=None):
+    """
+    Lists a tenant's health records newest first with keyset pagination.
+
+    The animal name is fetched in the same query (join on animais), so the
+    page costs one round trip however many animals it references.
+    `sort_date` overrides the sort expression for nullable date columns.
+    """
+    current_tenant_id = get_current_tenant_id()
+    args = health_list_parser.parse_args()
+    sort_date = sort_date if sort_date is not None else date_column
+
+    query = db.session.query(model, Animal.nome, sort_date.label('sort_date')).join(
+        Animal, model.animal_id == Animal.id
+    ).filter(model.tenant_id == current_tenant_id)
+
+    if args['animal_id'] is not None:
+        query = query.filter(model.animal_id == args['animal_id'])
+    if args['data_inicio'] is not None:
+        query = query.filter(date_column >= args['data_inicio'])
+    if args['data_fim'] is not None:
+        query = query.filter(date_column <= args['data_fim'])
+
+    try:
+        rows, meta = keyset_paginate(
+            query, [sort_date, model.id], limit=args['limit'], cursor=args['cursor'],
+            key_of=lambda row: [row.sort_date, row[0].id]
+        )
+    except ValueError as e:
+        abort(400, message=str(e))
+
+    items = []
+    for record, animal_nome, _ in rows:
+        record.animal_nome = animal_nome
+        items.append(record)
+    return {'items': items, '_meta': meta}
 
 
 # --- RegistroVeterinario Resources ---
@@ -92,13 +147,14 @@ def get_current_tenant_id():
 class RegistroVeterinarioList(Resource):
     # @jwt_required() # Add JWT protection
     @health_ns.doc('list_registros_veterinarios')
-    @health_ns.marshal_list_with(registro_veterinario_model)
+    @health_ns.expect(health_list_parser)
+    @health_ns.marshal_with(registro_veterinario_page_model)
     def get(self):
-        """List all veterinary records for the current tenant"""
+        """List veterinary records for the current tenant (newest first, cursor paginated)"""
         try:
-            current_tenant_id = get_current_tenant_id()
-            registros = RegistroVeterinario.query.filter_by(tenant_id=current_tenant_id).all()
-            return registros
+            return list_health_records(RegistroVeterinario, RegistroVeterinario.data_consulta)
+        except HTTPException:
+            raise
         except SQLAlchemyError as e:
             current_app.logger.error(f"Database error during veterinary record listing: {e}")
             abort(500, message='Database error occurred.')
@@ -298,13 +354,14 @@ class RegistroVeterinarioResource(Resource):
 class VacinacaoList(Resource):
     # @jwt_required() # Add JWT protection
     @health_ns.doc('list_vacinacoes')
-    @health_ns.marshal_list_with(vacinacao_model)
+    @health_ns.expect(health_list_parser)
+    @health_ns.marshal_with(vacinacao_page_model)
     def get(self):
-        """List all vaccinations for the current tenant"""
+        """List vaccinations for the current tenant (newest first, cursor paginated)"""
         try:
-            current_tenant_id = get_current_tenant_id()
-            vacinacoes = Vacinacao.query.filter_by(tenant_id=current_tenant_id).all()
-            return vacinacoes
+            return list_health_records(Vacinacao, Vacinacao.data_aplicacao)
+        except HTTPException:
+            raise
         except SQLAlchemyError as e:
             current_app.logger.error(f"Database error during vaccination listing: {e}")
             abort(500, message='Database error occurred.')
@@ -525,13 +582,14 @@ class VacinacaoResource(Resource):
 class VermifugacaoList(Resource):
     # @jwt_required() # Add JWT protection
     @health_ns.doc('list_vermifugacoes')
-    @health_ns.marshal_list_with(vermifugacao_model)
+    @health_ns.expect(health_list_parser)
+    @health_ns.marshal_with(vermifugacao_page_model)
     def get(self):
-        """List all deworming records for the current tenant"""
+        """List deworming records for the current tenant (newest first, cursor paginated)"""
         try:
-            current_tenant_id = get_current_tenant_id()
-            vermifugacoes = Vermifugacao.query.filter_by(tenant_id=current_tenant_id).all()
-            return vermifugacoes
+            return list_health_records(Vermifugacao, Vermifugacao.data_aplicacao)
+        except HTTPException:
+            raise
         except SQLAlchemyError as e:
             current_app.logger.error(f"Database error during deworming record listing: {e}")
             abort(500, message='Database error occurred.')
@@ -691,15 +749,24 @@ class VermifugacaoResource(Resource):
 @health_ns.route('/exames_geneticos')
 class ExameGeneticoList(Resource):
     @health_ns.doc('list_exames_geneticos')
-    @health_ns.marshal_list_with(exame_genetico_model)
+    @health_ns.expect(health_list_parser)
+    @health_ns.marshal_with(exame_genetico_page_model)
     def get(self):
-        """List all genetic exams for the current tenant"""
+        """List genetic exams for the current tenant (newest first, cursor paginated)"""
         try:
-            current_tenant_id = get_current_tenant_id()
-            exames = ExameGenetico.query.filter_by(tenant_id=current_tenant_id).all()
-            return exames
-        except Exception as e:
+            # data_coleta is optional: exams without it sort by result date, then last
+            return list_health_records(
+                ExameGenetico, ExameGenetico.data_coleta,
+                sort_date=func.coalesce(ExameGenetico.data_coleta, ExameGenetico.data_resultado, date.min)
+            )
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            current_app.logger.error(f"Database error during genetic exam listing: {e}")
             abort(500, message='Database error occurred.')
+        except Exception as e:
+            current_app.logger.error(f"An unexpected error occurred during genetic exam listing: {e}")
+            abort(500, message='An error occurred during listing genetic exams.')
 
     @health_ns.doc('create_exame_genetico')
     @health_ns.expect(exame_genetico_model)
@@ -746,4 +813,312 @@ class ExameGeneticoResource(Resource):
             return '', 204
         except Exception as e:
             db.session.rollback()
-            abort(500, message='Database error occurred.')
\ No newline at end of file
+            abort(500, message='Database error occurred.')
+
+# --- Bulk entry (whole litters) ---
+
+# Upper bound of animals per bulk request
+BULK_MAX_ANIMALS = 500
+
+_bulk_target_fields = {
+    'animal_ids': fields.List(fields.Integer, description='Animals receiving the event'),
+    'ninhada_id': fields.Integer(description='Apply to every active puppy of this litter'),
+}
+
+vacinacao_lote_model = health_ns.model('VacinacaoLote', {
+    **_bulk_target_fields,
+    **{name: field for name, field in vacinacao_model.items() if name not in ('id', 'animal_id', 'animal_nome')},
+})
+
+vermifugacao_lote_model = health_ns.model('VermifugacaoLote', {
+    **_bulk_target_fields,
+    **{name: field for name, field in vermifugacao_model.items() if name not in ('id', 'animal_id', 'animal_nome')},
+})
+
+vacinacao_lote_result_model = health_ns.model('VacinacaoLoteResult', {
+    'total': fields.Integer,
+    'items': fields.List(fields.Nested(vacinacao_model)),
+})
+
+vermifugacao_lote_result_model = health_ns.model('VermifugacaoLoteResult', {
+    'total': fields.Integer,
+    'items': fields.List(fields.Nested(vermifugacao_model)),
+})
+
+
+def _parse_event_date(data, field):
+    value = data.get(field)
+    if value is None or isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        abort(400, message=f'Invalid date format for {field}. Use YYYY-MM-DD.')
+
+
+def resolve_bulk_animals(tenant_id, animal_ids=None, ninhada_id=None):
+    """
+    Validates the target animals of a bulk request with a single query:
+    the listed ids plus the active puppies of the litter, all of this tenant.
+    Returns {animal_id: nome}; aborts when any listed animal is missing.
+    """
+    from app.models.animal import Filhote
+
+    animal_ids = set(animal_ids or [])
+    if not animal_ids and ninhada_id is None:
+        abort(400, message='Provide animal_ids or ninhada_id.')
+    if len(animal_ids) > BULK_MAX_ANIMALS:
+        abort(400, message=f'At most {BULK_MAX_ANIMALS} animals per request.')
+
+    filhotes = Filhote.__table__
+    targets = []
+    if animal_ids:
+        targets.append(Animal.id.in_(animal_ids))
+    if ninhada_id is not None:
+        targets.append((filhotes.c.ninhada_id == ninhada_id) & Animal.ativo.is_(True))
+
+    rows = db.session.query(Animal.id, Animal.nome).outerjoin(
+        filhotes, filhotes.c.id == Animal.id
+    ).filter(
+        Animal.tenant_id == tenant_id,
+        or_(*targets),
+    ).order_by(Animal.id).limit(BULK_MAX_ANIMALS + 1).all()
+
+    found = {row.id: row.nome for row in rows}
+    missing = sorted(animal_ids - found.keys())
+    if missing:
+        abort(404, message=f'Animals not found or not belonging to this tenant: {missing}')
+    if not found:
+        abort(404, message=f'Litter {ninhada_id} not found or has no active puppies.')
+    if len(found) > BULK_MAX_ANIMALS:
+        abort(400, message=f'At most {BULK_MAX_ANIMALS} animals per request.')
+    return found
+
+
+def create_bulk_health_events(model, required_fields, next_date_field):
+    """
+    Creates one `model` row per target animal from a single event payload.
+    All animals are validated with one query and all rows are inserted with
+    one batched INSERT ... RETURNING, committed as a single transaction.
+    """
+    current_tenant_id = get_current_tenant_id()
+    data = dict(health_ns.payload or {})
+
+    for field in required_fields:
+        if not data.get(field):
+            abort(400, message=f'Missing or empty required field: {field}')
+
+    data_aplicacao = _parse_event_date(data, 'data_aplicacao')
+    if data_aplicacao > date.today():
+        abort(400, message='data_aplicacao cannot be in the future.')
+    proxima = _parse_event_date(data, next_date_field)
+    if proxima is not None and proxima < data_aplicacao:
+        abort(400, message=f'{next_date_field} cannot be before data_aplicacao.')
+    if data.get('dosagem') is not None and (not isinstance(data['dosagem'], (int, float)) or data['dosagem'] < 0):
+        abort(400, message='Dosagem must be a non-negative number.')
+
+    animals = resolve_bulk_animals(current_tenant_id, data.pop('animal_ids', None), data.pop('ninhada_id', None))
+
+    columns = set(model.__table__.columns.keys()) - {'id', 'animal_id', 'tenant_id'}
+    event = {key: value for key, value in data.items() if key in columns}
+    event.update({'data_aplicacao': data_aplicacao, next_date_field: proxima, 'tenant_id': current_tenant_id})
+    rows = [{**event, 'animal_id': animal_id} for animal_id in animals]
+
+    created = db.session.execute(insert(model).returning(model.id, model.animal_id), rows).all()
+    db.session.commit()
+
+    items = [{**event, 'id': row.id, 'animal_id': row.animal_id, 'animal_nome': animals[row.animal_id]} for row in created]
+    return {'total': len(items), 'items': items}
+
+
+@health_ns.route('/vacinacoes/lote')
+class VacinacaoBulk(Resource):
+    @health_ns.doc('create_vacinacoes_lote')
+    @health_ns.expect(vacinacao_lote_model)
+    @health_ns.marshal_with(vacinacao_lote_result_model, code=201)
+    def post(self):
+        """Register the same vaccination for a list of animals or a whole litter"""
+        try:
+            return create_bulk_health_events(Vacinacao, ['tipo_vacina', 'data_aplicacao'], 'proxima_dose'), 201
+        except HTTPException:
+            raise
+        except IntegrityError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Integrity error during bulk vaccination creation: {e}")
+            abort(409, message='Resource already exists or violates unique constraint.')
+        except DataError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Data error during bulk vaccination creation: {e}")
+            abort(400, message='Invalid data format or value.')
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Database error during bulk vaccination creation: {e}")
+            abort(500, message='Database error occurred.')
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"An unexpected error occurred during bulk vaccination creation: {e}")
+            abort(500, message='An error occurred during creating vaccination records.')
+
+
+@health_ns.route('/vermifugacoes/lote')
+class VermifugacaoBulk(Resource):
+    @health_ns.doc('create_vermifugacoes_lote')
+    @health_ns.expect(vermifugacao_lote_model)
+    @health_ns.marshal_with(vermifugacao_lote_result_model, code=201)
+    def post(self):
+        """Register the same deworming for a list of animals or a whole litter"""
+        try:
+            return create_bulk_health_events(Vermifugacao, ['medicamento', 'data_aplicacao'], 'proxima_aplicacao'), 201
+        except HTTPException:
+            raise
+        except IntegrityError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Integrity error during bulk deworming creation: {e}")
+            abort(409, message='Resource already exists or violates unique constraint.')
+        except DataError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Data error during bulk deworming creation: {e}")
+            abort(400, message='Invalid data format or value.')
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Database error during bulk deworming creation: {e}")
+            abort(500, message='Database error occurred.')
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"An unexpected error occurred during bulk deworming creation: {e}")
+            abort(500, message='An error occurred during creating deworming records.')
+
+
+# --- Health Timeline ---
+
+timeline_event_model = health_ns.model('HealthTimelineEvent', {
+    'tipo': fields.String(description="Event type: 'consulta', 'vacinacao', 'vermifugacao', 'exame_genetico' or 'evolucao'"),
+    'id': fields.Integer(description='Identifier of the record in its own endpoint'),
+    'animal_id': fields.Integer,
+    'data': fields.Date(description='Event date'),
+    'titulo': fields.String(description='Reason, vaccine, medication, exam type or milestone'),
+    'detalhe': fields.String(description='Diagnosis, result or observations'),
+    'proxima_data': fields.Date(description='Next dose/application, when applicable'),
+    'peso': fields.Float(description='Weight recorded with the event, when applicable'),
+})
+
+timeline_page_model = _page_model('HealthTimelinePage', timeline_event_model)
+
+TIMELINE_EVENT_TYPES = ('consulta', 'vacinacao', 'vermifugacao', 'exame_genetico', 'evolucao')
+
+timeline_parser = reqparse.RequestParser()
+timeline_parser.add_argument('animal_id', type=int, action='append', required=True, location='args',
+                             help='Animal(s) to include (repeat the parameter for several animals)')
+timeline_parser.add_argument('tipo', type=str, action='append', choices=TIMELINE_EVENT_TYPES, location='args',
+                             help='Only include these event types')
+timeline_parser.add_argument('data_inicio', type=inputs.date_from_iso8601, location='args', help='From date (YYYY-MM-DD, inclusive)')
+timeline_parser.add_argument('data_fim', type=inputs.date_from_iso8601, location='args', help='Until date (YYYY-MM-DD, inclusive)')
+timeline_parser.add_argument('limit', type=int, location='args', help='Page size (default 50, max 200)')
+timeline_parser.add_argument('cursor', type=str, location='args', help='next_cursor from the previous page')
+
+
+def _timeline_sources():
+    """(tipo, model, date expression, titulo, detalhe, proxima_data, peso) for each event source."""
+    from app.models.media import RegistroEvolucao
+
+    return [
+        ('consulta', RegistroVeterinario, RegistroVeterinario.data_consulta, RegistroVeterinario.motivo,
+         RegistroVeterinario.diagnostico, None, RegistroVeterinario.peso),
+        ('vacinacao', Vacinacao, Vacinacao.data_aplicacao, Vacinacao.tipo_vacina,
+         Vacinacao.observacoes, Vacinacao.proxima_dose, None),
+        ('vermifugacao', Vermifugacao, Vermifugacao.data_aplicacao, Vermifugacao.medicamento,
+         Vermifugacao.observacoes, Vermifugacao.proxima_aplicacao, None),
+        ('exame_genetico', ExameGenetico, func.coalesce(ExameGenetico.data_coleta, ExameGenetico.data_resultado),
+         ExameGenetico.tipo_exame, ExameGenetico.resultado, None, None),
+        ('evolucao', RegistroEvolucao, RegistroEvolucao.data_registro,
+         func.coalesce(RegistroEvolucao.milestone, RegistroEvolucao.fase), RegistroEvolucao.observacoes,
+         None, RegistroEvolucao.peso),
+    ]
+
+
+def build_timeline_query(tenant_id, animal_ids, tipos=None, data_inicio=None, data_fim=None, after=None, limit=50):
+    """
+    Builds one UNION ALL over every health event source, newest first.
+
+    The tenant, animal, date range and keyset filters (and a LIMIT) are pushed
+    into each branch, so every branch is a short index range scan on
+    (animal_id, date) and the outer query only merges at most
+    limit rows per source. Sort key: (data, tipo, id), all descending.
+    """
+    branches = []
+    for tipo, model, data, titulo, detalhe, proxima_data, peso in _timeline_sources():
+        if tipos and tipo not in tipos:
+            continue
+        tipo_col = literal(tipo, type_=String)
+        branch = select(
+            tipo_col.label('tipo'),
+            model.id.label('id'),
+            model.animal_id.label('animal_id'),
+            data.label('data'),
+            cast(titulo, String).label('titulo'),
+            cast(detalhe, Text).label('detalhe'),
+            (proxima_data if proxima_data is not None else null()).cast(Date).label('proxima_data'),
+            (peso if peso is not None else null()).cast(Float).label('peso'),
+        ).where(
+            model.tenant_id == tenant_id,
+            model.animal_id.in_(animal_ids),
+            data.isnot(None),
+        )
+        if data_inicio is not None:
+            branch = branch.where(data >= data_inicio)
+        if data_fim is not None:
+            branch = branch.where(data <= data_fim)
+        if after is not None:
+            branch = branch.where(tuple_(data, tipo_col, model.id) < tuple_(*after))
+        branches.append(branch.order_by(data.desc(), model.id.desc()).limit(limit))
+
+    if not branches:
+        return None
+    timeline = union_all(*branches).subquery('timeline')
+    return select(timeline).order_by(
+        timeline.c.data.desc(), timeline.c.tipo.desc(), timeline.c.id.desc()
+    ).limit(limit)
+
+
+@health_ns.route('/timeline')
+class HealthTimeline(Resource):
+    @health_ns.doc('get_health_timeline')
+    @health_ns.expect(timeline_parser)
+    @health_ns.marshal_with(timeline_page_model)
+    def get(self):
+        """Merged health history (consultations, vaccinations, deworming, genetic exams, growth records) of one or more animals"""
+        try:
+            current_tenant_id = get_current_tenant_id()
+            args = timeline_parser.parse_args()
+            limit = clamp_page_size(args['limit'])
+
+            after = None
+            if args['cursor']:
+                try:
+                    after = decode_cursor(args['cursor'], [date.fromisoformat, str, int])
+                except ValueError as e:
+                    abort(400, message=str(e))
+
+            query = build_timeline_query(
+                current_tenant_id, args['animal_id'], tipos=args['tipo'],
+                data_inicio=args['data_inicio'], data_fim=args['data_fim'],
+                after=after, limit=limit + 1,
+            )
+            rows = db.session.execute(query).mappings().all() if query is not None else []
+
+            has_next = len(rows) > limit
+            items = [dict(row) for row in rows[:limit]]
+            next_cursor = None
+            if has_next:
+                last = items[-1]
+                next_cursor = encode_cursor([last['data'], last['tipo'], last['id']])
+
+            return {'items': items, '_meta': {'limit': limit, 'has_next': has_next, 'next_cursor': next_cursor}}
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            current_app.logger.error(f"Database error building health timeline: {e}")
+            abort(500, message='Database error occurred.')
+        except Exception as e:
+            current_app.logger.error(f"An unexpected error occurred building health timeline: {e}")
+            abort(500, message='An error occurred while building the health timeline.')
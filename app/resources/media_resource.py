@@ -1,14 +1,29 @@
+import unicodedata
 import uuid
-from flask import request, send_file, current_app, g # Import g for tenant_id
-from flask_restx import Namespace, Resource, fields, reqparse, abort
+from urllib.parse import quote
+from flask import Response, redirect, request, current_app, stream_with_context, url_for
+from flask_restx import Namespace, Resource, fields, inputs, reqparse, abort
+from flask_jwt_extended import verify_jwt_in_request
 from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import HTTPException
+from werkzeug.utils import secure_filename
+from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from datetime import date # Needed for date conversion if payload contains date strings
+from datetime import date, datetime, timedelta # Needed for date conversion if payload contains date strings
 
 from app import db
-from app.models.media import Arquivo, ImagemAnimal, VideoAnimal, DocumentoAnimal
+from app.models.media import Arquivo, ImagemAnimal, VideoAnimal, DocumentoAnimal, SessaoUpload, AlbumAnimal
 from app.models.animal import Animal
-from app.services.media_service import DropboxService
+from app.services.album_transfer_service import iter_zip, upload_concurrently
+from app.services.image_variant_service import IMAGE_VARIANTS, schedule_variant_generation, variant_paths
+from app.services.media_object_service import MediaObjectService
+from app.services.share_link_service import ShareLinkService
+from app.services.storage_usage_service import StorageUsageService, storage_limit
+from app.utils.pagination import keyset_paginate
+from app.services.storage_service import (
+    DROPBOX_BLOCK_SIZE, DropboxContentHasher, get_storage_backend, read_chunk, upload_chunk_size
+)
+from app.utils.decorators import get_jwt_tenant_id
 
 media_ns = Namespace('media', description='Media file operations')
 
@@ -35,6 +50,7 @@ arquivo_model = media_ns.model('Arquivo', {
     'nome_original': fields.String(required=True),
     'caminho': fields.String(required=True),
     'tipo': fields.String(required=True),
+    'mime_type': fields.String,
     'tamanho': fields.Float(required=True),
     'data_upload': fields.DateTime(required=True),
     'descricao': fields.String,
@@ -51,17 +67,131 @@ arquivo_model = media_ns.model('Arquivo', {
     'data_validade': fields.Date, # For DocumentoAnimal
     'orgao_emissor': fields.String, # For DocumentoAnimal
     'verificado': fields.Boolean, # For DocumentoAnimal
-    'url': fields.String(readOnly=True, description='Shareable link from Dropbox')
+    'album_id': fields.Integer,
+    'status_variantes': fields.String(readOnly=True, description='Photo variants: pendente, prontas, indisponivel or erro'), # For ImageAnimal
+    'variantes': fields.Raw(readOnly=True, attribute=lambda arquivo: variant_urls(arquivo),
+                            description='Download URL of each resized variant (thumb, medium, web)'),
+    'url': fields.String(readOnly=True, description='Shareable link from storage, or the download endpoint')
 })
 
-# Helper to get current tenant ID (replace with actual logic based on your setup)
-# This assumes tenant_id is stored in Flask g context after middleware runs.
+# Helper to get current tenant ID from the authenticated user's token
 def get_current_tenant_id():
-    if hasattr(g, 'current_tenant_id'):
-        return g.current_tenant_id
-    # Fallback or error handling if tenant_id is not in g
-    current_app.logger.error("Tenant context not available in Flask g.")
-    abort(500, "Internal server error: Tenant context missing.")
+    try:
+        verify_jwt_in_request()
+        tenant_id = get_jwt_tenant_id()
+    except Exception as e:
+        current_app.logger.error(f"Error getting tenant context: {e}")
+        tenant_id = None
+    if tenant_id is None:
+        abort(401, "Tenant context not available. Authentication required or tenant not identified.")
+    return tenant_id
+
+
+def destination_path_for(animal_id, original_filename):
+    """Unique path within the tenant's folder; the storage service adds the tenant prefix."""
+    folder = f"/animals/{animal_id}" if animal_id else "/general"
+    return f"{folder}/{uuid.uuid4()}_{secure_filename(original_filename) or 'arquivo'}"
+
+
+def download_url(arquivo_id, **values):
+    """API path of a file's download endpoint (extra values go to the query string)."""
+    return url_for(ArquivoDownload.endpoint, id=arquivo_id, **values)
+
+
+def variant_urls(arquivo):
+    """Variant name -> download URL, for photos whose variants are ready (else None)."""
+    variantes = getattr(arquivo, 'variantes', None)
+    if not variantes:
+        return None
+    return {nome: download_url(arquivo.id, variante=nome) for nome in variantes}
+
+
+def share_urls(arquivos):
+    """
+    Arquivo id -> shareable link, batched and cached (see ShareLinkService);
+    the download endpoint where storage has no link for the file.
+    """
+    links = ShareLinkService().resolve(arquivos)
+    return {
+        arquivo.id: links.get(arquivo.id) or download_url(arquivo.id)
+        for arquivo in arquivos
+    }
+
+
+def _first_images(tenant_id, key_column, ids):
+    """
+    First photo per key (flagged principal, else lowest ordem, else oldest)
+    as key -> {id, url, variantes}, in one query for a whole page.
+    """
+    if not ids:
+        return {}
+    imagens = ImagemAnimal.query.filter(
+        ImagemAnimal.tenant_id == tenant_id,
+        key_column.in_(ids),
+    ).distinct(key_column).order_by(
+        key_column,
+        ImagemAnimal.principal.desc().nullslast(),
+        ImagemAnimal.ordem.asc().nullslast(),
+        ImagemAnimal.id,
+    ).all()
+    urls = share_urls(imagens)
+    return {
+        getattr(imagem, key_column.key): {
+            'id': imagem.id,
+            'url': urls[imagem.id],
+            'variantes': variant_urls(imagem),
+        }
+        for imagem in imagens
+    }
+
+
+def fotos_principais(tenant_id, animal_ids):
+    """Main photo of each animal: animal id -> {id, url, variantes}."""
+    return _first_images(tenant_id, ImagemAnimal.animal_id, animal_ids)
+
+
+def _schedule_variants(arquivo):
+    if isinstance(arquivo, ImagemAnimal):
+        schedule_variant_generation(arquivo.id)
+
+
+def store_object(tenant_id, caminho, tamanho, content_hash):
+    """
+    Registers content just uploaded to `caminho` in the tenant's hash index.
+    Returns (objeto_id, caminho_objeto, caminho_duplicado): the last is the
+    now redundant copy to discard after commit when the content was known.
+    """
+    objeto_id, caminho_objeto, duplicado = MediaObjectService().attach(tenant_id, content_hash, tamanho, caminho)
+    return objeto_id, caminho_objeto, caminho if duplicado else None
+
+
+def discard_stored_copy(storage, tenant_id, caminho):
+    """Deletes a stored file nothing references any more; a failure only leaves an orphan behind."""
+    if caminho is None:
+        return
+    try:
+        storage.delete_file(tenant_id, caminho)
+    except Exception as e:
+        current_app.logger.error(f"Could not delete unreferenced file {caminho} of tenant {tenant_id}: {e}")
+
+
+def ensure_storage_quota(tenant_id, tamanho):
+    """Rejects (413) an upload of `tamanho` bytes that the plan's storage cannot take, before reading it."""
+    if tamanho and not StorageUsageService().fits(tenant_id, tamanho):
+        abort(413, message='Upload exceeds the storage limit of your plan.')
+
+
+def charge_storage(storage, tenant_id, tamanho, caminhos=(), arquivos=1):
+    """
+    Counts new files in the tenant's storage usage. When a concurrent upload
+    took the rest of the quota first, rolls back, deletes the copies just
+    uploaded to `caminhos` and answers 413.
+    """
+    if not StorageUsageService().charge(tenant_id, tamanho, arquivos):
+        db.session.rollback()
+        for caminho in caminhos:
+            discard_stored_copy(storage, tenant_id, caminho)
+        abort(413, message='Upload exceeds the storage limit of your plan.')
 
 
 @media_ns.route('/arquivos')
@@ -72,6 +202,8 @@ class ArquivoList(Resource):
         """Upload a new file"""
         try:
             current_tenant_id = get_current_tenant_id()
+            # Before the form is parsed, i.e. before the body is read
+            ensure_storage_quota(current_tenant_id, request.content_length)
 
             args = file_upload_parser.parse_args(strict=True) # Use strict=True for reqparse
             uploaded_file = args['file']
@@ -91,10 +223,8 @@ class ArquivoList(Resource):
                 # This check is also done by required=True in reqparse, but can be a safeguard
                 media_ns.abort(400, message='No file provided')
 
-            # Read file content and get metadata
-            file_content = uploaded_file.read()
+            # Metadata only: the content is streamed to storage below
             original_filename = uploaded_file.filename
-            file_size = len(file_content)
             file_type = uploaded_file.mimetype or 'application/octet-stream'
 
             # --- Start Validation ---
@@ -134,33 +264,30 @@ class ArquivoList(Resource):
 
             # --- End Validation ---
 
-            # Determine destination path in Dropbox (includes tenant_id)
-            destination_folder = f"/{current_tenant_id}"
-            if animal_id:
-                 destination_folder += f"/animals/{animal_id}"
-            else:
-                 destination_folder += "/general" # For files not linked to an animal
-
-            # Generate a unique filename to avoid conflicts
-            unique_filename = f"{uuid.uuid4()}_{original_filename}"
-            destination_path = f"{destination_folder}/{unique_filename}"
+            # Destination path within the tenant's folder (the service prepends the tenant)
+            destination_path = destination_path_for(animal_id, original_filename)
 
-            dropbox_service = DropboxService() # Instantiate the service
-
-            # Upload file to Dropbox (service includes tenant_id in path)
-            # The service method should handle prepending the tenant_id path
-            # Assuming upload_file now expects tenant_id, file_content, and relative_path
-            dropbox_metadata = dropbox_service.upload_file(file_content, destination_path) # Service adds tenant_id internally
+            # Stream the spooled upload to storage chunk by chunk; size and
+            # content hash are computed on the way
+            storage = get_storage_backend()
+            _, file_size, content_hash = storage.upload_stream(
+                current_tenant_id, uploaded_file.stream, destination_path
+            )
+            charge_storage(storage, current_tenant_id, file_size, [destination_path])
+            # Content the tenant already stored is shared instead of kept twice
+            objeto_id, caminho, duplicate_path = store_object(current_tenant_id, destination_path, file_size, content_hash)
 
 
             # Prepare data for model instantiation
             model_data = {
-                'nome': unique_filename,
+                'nome': caminho.rsplit('/', 1)[-1],
                 'nome_original': original_filename,
-                'caminho': destination_path, # Full path including tenant_id
-                'tipo': file_type,
+                'caminho': caminho, # Path within the tenant's folder
+                'objeto_id': objeto_id,
+                'mime_type': file_type,
                 'tamanho': file_size,
-                'data_upload': datetime.utcnow(), # Assuming datetime import
+                'hash': content_hash,
+                'data_upload': datetime.utcnow(),
                 'descricao': descricao,
                 'publico': False, # Default public status
                 'animal_id': animal_id,
@@ -183,6 +310,8 @@ class ArquivoList(Resource):
 
             db.session.add(new_arquivo)
             db.session.commit()
+            discard_stored_copy(storage, current_tenant_id, duplicate_path)
+            _schedule_variants(new_arquivo)
 
             # Optionally, get the shareable link immediately after saving to DB
             # This adds another Dropbox call, might be better to get on demand in GET
@@ -194,6 +323,8 @@ class ArquivoList(Resource):
 
             return new_arquivo, 201
 
+        except HTTPException:
+            raise
         except SQLAlchemyError as e:
             db.session.rollback()
             current_app.logger.error(f"Database error during file upload: {e}")
@@ -219,11 +350,12 @@ class ArquivoResource(Resource):
                 description=f"File with ID {id} not found for this tenant"
             )
 
-            dropbox_service = DropboxService()
-            # get_shareable_link service method should handle full path
-            arquivo.url = dropbox_service.get_shareable_link(arquivo.caminho)
+            # Backends without public links (local storage) serve the file through the API
+            arquivo.url = share_urls([arquivo])[arquivo.id]
             return arquivo
 
+        except HTTPException:
+            raise
         except Exception as e:
             current_app.logger.error(f"An error occurred retrieving file {id}: {e}")
             media_ns.abort(500, message=f'An error occurred retrieving the file: {e}')
@@ -252,7 +384,8 @@ class ArquivoResource(Resource):
             ]
 
             # Explicitly prevent updates to immutable fields
-            immutable_fields = ['id', 'nome', 'nome_original', 'caminho', 'tipo', 'tamanho', 'data_upload', 'hash', 'tenant_id']
+            immutable_fields = ['id', 'nome', 'nome_original', 'caminho', 'tipo', 'mime_type', 'tamanho', 'data_upload', 'hash', 'tenant_id',
+                                'variantes', 'status_variantes']
             # Add 'animal_id' to immutable if re-association is not allowed via PUT
             # immutable_fields.append('animal_id') # Uncomment if animal_id cannot be changed
 
@@ -273,6 +406,13 @@ class ArquivoResource(Resource):
                       # Allow setting animal_id to None
                       arquivo.animal_id = None
 
+            # Moving a file into (or out of, with null) one of the tenant's albums
+            if 'album_id' in update_data:
+                 new_album_id = update_data['album_id']
+                 if new_album_id is not None and not AlbumAnimal.query.filter_by(id=new_album_id, tenant_id=current_tenant_id).first():
+                     media_ns.abort(404, message=f"Album ID {new_album_id} not found for this tenant.")
+                 arquivo.album_id = new_album_id
+
             # Apply updates for allowed fields
             for field in allowed_update_fields:
                 if field in update_data:
@@ -326,6 +466,8 @@ class ArquivoResource(Resource):
             db.session.commit()
             return arquivo, 200
 
+        except HTTPException:
+            raise
         except SQLAlchemyError as e:
             db.session.rollback()
             current_app.logger.error(f"Database error during file update {id}: {e}")
@@ -346,19 +488,24 @@ class ArquivoResource(Resource):
                  description=f"File with ID {id} not found for this tenant"
             )
 
-            dropbox_service = DropboxService()
-
-            # Delete file from Dropbox first (service handles full path)
-            # Pass tenant_id to the service method if needed
-            dropbox_service.delete_file(arquivo.caminho) # Service should handle tenant_id internally
-
-
-            # If Dropbox deletion is successful, delete from database
+            # Shared content loses one reference; the stored file goes with
+            # the last one, after the database change is committed
+            objeto_id, caminho = arquivo.objeto_id, arquivo.caminho
+            StorageUsageService().release(current_tenant_id, arquivo.tamanho)
             db.session.delete(arquivo)
+            db.session.flush()
+            if objeto_id is not None:
+                caminho = MediaObjectService().release(objeto_id)
             db.session.commit()
+            if caminho is not None:
+                storage = get_storage_backend()
+                for stored_path in [caminho, *variant_paths(caminho)]:
+                    discard_stored_copy(storage, current_tenant_id, stored_path)
 
             return '', 204 # 204 No Content on successful deletion
 
+        except HTTPException:
+            raise
         except SQLAlchemyError as e:
             db.session.rollback()
             current_app.logger.error(f"Database error during file deletion {id}: {e}")
@@ -368,41 +515,751 @@ class ArquivoResource(Resource):
              current_app.logger.error(f"An unexpected error occurred during file deletion {id}: {e}")
              media_ns.abort(500, message=f'An error occurred during file deletion: {e}')
 
-# Helper endpoint for direct download if needed (optional, distinct from GET)
+download_parser = reqparse.RequestParser()
+download_parser.add_argument('redirect', type=inputs.boolean, location='args',
+                             help='Redirect to a temporary storage link when the backend has one '
+                                  '(default: MEDIA_DOWNLOAD_REDIRECT)')
+download_parser.add_argument('variante', type=str, choices=tuple(IMAGE_VARIANTS), location='args',
+                             help='Resized variant of a photo instead of the original')
+
+
+def _content_disposition(filename):
+    """Content-Disposition parameters as send_file builds them (RFC 5987 for non-ASCII names)."""
+    try:
+        filename.encode('ascii')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        return {'filename': simple, 'filename*': f"UTF-8''{quote(filename, safe='!#$&+^`|~')}"}
+    return {'filename': filename}
+
+
+def _honoured_range(etag):
+    """The request's Range, unless absent or sent with an If-Range that no longer matches."""
+    if_range = request.if_range
+    if (if_range.etag or if_range.date) and (not etag or if_range.etag != etag):
+        return None
+    return request.range
+
+
+def stream_download(storage, tenant_id, caminho, tamanho, etag, mime_type, filename, as_attachment=True):
+    """
+    Streams a stored file in chunks. The content hash is the ETag: a matching
+    If-None-Match gets 304, a single Range gets 206 with only those bytes.
+    """
+    size = int(tamanho or 0)
+    headers = {'Accept-Ranges': 'bytes'}
+    if etag:
+        headers['ETag'] = f'"{etag}"'
+        if request.if_none_match.contains_weak(etag):
+            return Response(status=304, headers=headers)
+
+    status, start, stop = 200, 0, size
+    byte_range = _honoured_range(etag)
+    if byte_range is not None:
+        bounds = byte_range.range_for_length(size)
+        if bounds is not None:
+            status, (start, stop) = 206, bounds
+            headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+        elif len(byte_range.ranges) == 1:
+            headers['Content-Range'] = f'bytes */{size}'
+            return Response(status=416, headers=headers)
+        # Several ranges: the whole file is sent instead of multipart/byteranges
+
+    chunks = storage.open_stream(tenant_id, caminho, start, None if stop == size else stop) if stop > start else iter(())
+    response = Response(chunks, status=status, mimetype=mime_type or 'application/octet-stream',
+                        headers=headers, direct_passthrough=True)
+    response.content_length = stop - start
+    response.headers.set('Content-Disposition', 'attachment' if as_attachment else 'inline',
+                         **_content_disposition(filename))
+    return response
+
+
 @media_ns.route('/arquivos/<int:id>/download')
 class ArquivoDownload(Resource):
+    @media_ns.expect(download_parser)
+    @media_ns.response(200, 'File content')
+    @media_ns.response(206, 'Requested byte range')
+    @media_ns.response(302, 'Redirect to a temporary storage link')
+    @media_ns.response(304, 'Not modified (If-None-Match)')
+    @media_ns.response(416, 'Range not satisfiable')
     def get(self, id):
-        """Download a file by ID (via Dropbox)"""
+        """
+        Download a file by ID, or one of its photo variants with ?variante=.
+        The content is streamed from storage chunk by chunk; Range, If-Range
+        and If-None-Match use the content hash as ETag.
+        """
         try:
             current_tenant_id = get_current_tenant_id()
+            args = download_parser.parse_args()
 
             # Filter by tenant_id to get the file
             arquivo = Arquivo.query.filter_by(id=id, tenant_id=current_tenant_id).first_or_404(
                  description=f"File with ID {id} not found for this tenant"
             )
+            storage = get_storage_backend()
+
+            if args['variante']:
+                variante = (getattr(arquivo, 'variantes', None) or {}).get(args['variante'])
+                if variante is None:
+                    media_ns.abort(404, message=f"Variant '{args['variante']}' is not available for file {id}.")
+                base_name = arquivo.nome_original.rsplit('.', 1)[0]
+                target = (variante['caminho'], variante['tamanho'], variante['hash'], variante['mime_type'],
+                          f"{base_name}.{args['variante']}.jpg", False)
+            else:
+                target = (arquivo.caminho, arquivo.tamanho, arquivo.hash, arquivo.mime_type,
+                          arquivo.nome_original, True)
+
+            # Optionally hand the transfer to storage so it bypasses the app server
+            use_redirect = args['redirect']
+            if use_redirect is None:
+                use_redirect = current_app.config.get('MEDIA_DOWNLOAD_REDIRECT', False)
+            if use_redirect:
+                link = storage.get_temporary_link(current_tenant_id, target[0])
+                if link:
+                    return redirect(link)
+
+            return stream_download(storage, current_tenant_id, *target)
+
+        except HTTPException:
+            raise
+        except FileNotFoundError:
+            current_app.logger.error(f"Stored content of file {id} is missing")
+            media_ns.abort(404, message='File content not found in storage.')
+        except Exception as e:
+            current_app.logger.error(f"An error occurred during download {id}: {e}")
+            media_ns.abort(500, message=f'An error occurred during download: {e}')
+
+# --- Streaming and resumable uploads ---
+
+# Categories accepted by the raw-body upload endpoints (documents need the
+# extra metadata of the multipart form)
+STREAM_CATEGORIES = {'photo': ImagemAnimal, 'video': VideoAnimal, None: Arquivo}
+UPLOAD_SESSION_TTL = timedelta(days=6) # Dropbox keeps upload sessions for 7 days
+DEFAULT_MAX_UPLOAD_SIZE = 2 * 1024 * 1024 * 1024
+
+stream_upload_parser = reqparse.RequestParser()
+stream_upload_parser.add_argument('nome', type=str, location='args', required=True, help='Original file name')
+stream_upload_parser.add_argument('animal_id', type=int, location='args', help='ID of the associated animal')
+stream_upload_parser.add_argument('categoria', type=str, choices=('photo', 'video'), location='args', help='photo or video')
+stream_upload_parser.add_argument('descricao', type=str, location='args', help='Description of the file')
+
+sessao_upload_input_model = media_ns.model('SessaoUploadInput', {
+    'nome_original': fields.String(required=True, description='Original file name'),
+    'tamanho': fields.Integer(required=True, description='Total size in bytes'),
+    'mime_type': fields.String(description='Content type (default application/octet-stream)'),
+    'categoria': fields.String(description='photo or video'),
+    'descricao': fields.String,
+    'animal_id': fields.Integer,
+    'hash': fields.String(description='Content hash of the whole file (Dropbox content_hash); '
+                                      'content already stored completes the upload at once'),
+})
 
-            dropbox_service = DropboxService()
-            # download_file service method should handle full path
-            file_content = dropbox_service.download_file(arquivo.caminho) # Service should handle tenant_id internally
-
-            # Return the file content as a response
-            # Ensure you have the correct mimetype
-            return send_file(
-                file_content,
-                mimetype=arquivo.tipo,
-                as_attachment=True,
-                download_name=arquivo.nome_original,
-                 # Use BytesIO if file_content is a bytes object
-                # If file_content is bytes, wrap it: from io import BytesIO; BytesIO(file_content)
-                # This depends on what dropbox_service.download_file returns
-                # Assuming it returns bytes, wrap it:
-                # from io import BytesIO
-                # BytesIO(file_content)
-                # If it returns a file-like object, use as is.
-                # Let's assume it returns bytes and wrap it for send_file
-                 data=file_content # Use data= for Flask 2.0+ send_file from bytes
+sessao_upload_model = media_ns.model('SessaoUpload', {
+    'token': fields.String(description='Upload session identifier'),
+    'nome_original': fields.String,
+    'tamanho_total': fields.Integer,
+    'offset': fields.Integer(description='Bytes received; the next chunk starts here'),
+    'chunk_size': fields.Integer(description='Every chunk but the last must be a multiple of this size'),
+    'concluida': fields.Boolean,
+    'arquivo_id': fields.Integer,
+    'expira_em': fields.DateTime,
+})
+
+chunk_parser = reqparse.RequestParser()
+chunk_parser.add_argument('offset', type=int, location='args', required=True, help='Position of this chunk in the file')
+
+
+def _validate_upload_target(tenant_id, animal_id, categoria):
+    if categoria not in STREAM_CATEGORIES:
+        abort(400, message="Invalid category. Must be 'photo' or 'video'.")
+    if animal_id and not Animal.query.filter_by(id=animal_id, tenant_id=tenant_id).first():
+        abort(404, message=f"Animal with ID {animal_id} not found for this tenant.")
+
+
+def _new_arquivo(tenant_id, categoria, caminho, nome_original, mime_type, tamanho, content_hash,
+                 descricao=None, animal_id=None, objeto_id=None):
+    arquivo = STREAM_CATEGORIES[categoria](
+        nome=caminho.rsplit('/', 1)[-1],
+        nome_original=nome_original,
+        caminho=caminho,
+        objeto_id=objeto_id,
+        mime_type=mime_type or 'application/octet-stream',
+        tamanho=tamanho,
+        hash=content_hash,
+        data_upload=datetime.utcnow(),
+        descricao=descricao,
+        publico=False,
+        animal_id=animal_id,
+        tenant_id=tenant_id,
+    )
+    db.session.add(arquivo)
+    return arquivo
+
+
+def _sessao_response(sessao):
+    sessao.chunk_size = upload_chunk_size()
+    return sessao
+
+
+@media_ns.route('/arquivos/stream')
+class ArquivoStreamUpload(Resource):
+    @media_ns.doc('upload_arquivo_stream', body=None)
+    @media_ns.expect(stream_upload_parser)
+    @media_ns.marshal_with(arquivo_model, code=201)
+    def post(self):
+        """
+        Upload a file sent as the raw request body (metadata in the query
+        string). The body is forwarded to storage in chunks, never held whole.
+        """
+        try:
+            current_tenant_id = get_current_tenant_id()
+            args = stream_upload_parser.parse_args()
+            _validate_upload_target(current_tenant_id, args['animal_id'], args['categoria'])
+            ensure_storage_quota(current_tenant_id, request.content_length)
+
+            storage = get_storage_backend()
+            caminho = destination_path_for(args['animal_id'], args['nome'])
+            _, tamanho, content_hash = storage.upload_stream(current_tenant_id, request.stream, caminho)
+            # Also covers bodies sent without Content-Length
+            charge_storage(storage, current_tenant_id, tamanho, [caminho])
+            objeto_id, caminho_objeto, duplicate_path = store_object(current_tenant_id, caminho, tamanho, content_hash)
+
+            arquivo = _new_arquivo(
+                current_tenant_id, args['categoria'], caminho_objeto, args['nome'], request.mimetype,
+                tamanho, content_hash, args['descricao'], args['animal_id'], objeto_id,
             )
+            db.session.commit()
+            discard_stored_copy(storage, current_tenant_id, duplicate_path)
+            _schedule_variants(arquivo)
+            return arquivo, 201
 
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Database error during streaming upload: {e}")
+            abort(500, message='Database error occurred during file upload.')
         except Exception as e:
-            current_app.logger.error(f"An error occurred during download {id}: {e}")
-            media_ns.abort(500, message=f'An error occurred during download: {e}')
\ No newline at end of file
+            db.session.rollback()
+            current_app.logger.error(f"An unexpected error occurred during streaming upload: {e}")
+            abort(500, message='An error occurred during file upload.')
+
+
+@media_ns.route('/uploads')
+class SessaoUploadList(Resource):
+    @media_ns.doc('create_upload_session')
+    @media_ns.expect(sessao_upload_input_model)
+    @media_ns.marshal_with(sessao_upload_model, code=201)
+    def post(self):
+        """
+        Start a resumable upload; send the content with PUT /media/uploads/<token>.
+        With the `hash` of content the tenant already stored, the session is
+        created completed (`concluida`, `arquivo_id`) and nothing is uploaded.
+        """
+        try:
+            current_tenant_id = get_current_tenant_id()
+            data = media_ns.payload or {}
+
+            nome_original = data.get('nome_original')
+            tamanho = data.get('tamanho')
+            if not nome_original:
+                abort(400, message='Missing or empty required field: nome_original')
+            max_size = current_app.config.get('MEDIA_MAX_UPLOAD_SIZE', DEFAULT_MAX_UPLOAD_SIZE)
+            if not isinstance(tamanho, int) or not 0 < tamanho <= max_size:
+                abort(400, message=f'tamanho must be between 1 and {max_size} bytes.')
+            _validate_upload_target(current_tenant_id, data.get('animal_id'), data.get('categoria'))
+            ensure_storage_quota(current_tenant_id, tamanho)
+
+            agora = datetime.utcnow()
+            sessao = SessaoUpload(
+                token=str(uuid.uuid4()),
+                nome_original=nome_original,
+                mime_type=data.get('mime_type') or 'application/octet-stream',
+                categoria=data.get('categoria'),
+                descricao=data.get('descricao'),
+                animal_id=data.get('animal_id'),
+                caminho=destination_path_for(data.get('animal_id'), nome_original),
+                tamanho_total=tamanho,
+                offset=0,
+                hashes_blocos=[],
+                criado_em=agora,
+                expira_em=agora + UPLOAD_SESSION_TTL,
+                tenant_id=current_tenant_id,
+            )
+            db.session.add(sessao)
+
+            # Known content: no bytes to send, the file is created right away
+            existente = MediaObjectService().reference(current_tenant_id, data['hash'], tamanho) if data.get('hash') else None
+            if existente is not None:
+                charge_storage(None, current_tenant_id, tamanho)
+                objeto_id, sessao.caminho = existente
+                arquivo = _new_arquivo(
+                    current_tenant_id, sessao.categoria, sessao.caminho, nome_original, sessao.mime_type,
+                    tamanho, data['hash'], sessao.descricao, sessao.animal_id, objeto_id,
+                )
+                db.session.flush()
+                sessao.offset = tamanho
+                sessao.arquivo_id = arquivo.id
+            db.session.commit()
+            if sessao.concluida:
+                _schedule_variants(arquivo)
+            return _sessao_response(sessao), 201
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Database error creating upload session: {e}")
+            abort(500, message='Database error occurred.')
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"An unexpected error occurred creating upload session: {e}")
+            abort(500, message='An error occurred while creating the upload session.')
+
+
+@media_ns.route('/uploads/<string:token>')
+@media_ns.param('token', 'The upload session identifier')
+class SessaoUploadResource(Resource):
+    @media_ns.doc('get_upload_session')
+    @media_ns.marshal_with(sessao_upload_model)
+    def get(self, token):
+        """Upload session status; `offset` is where an interrupted upload resumes"""
+        current_tenant_id = get_current_tenant_id()
+        sessao = SessaoUpload.query.filter_by(token=token, tenant_id=current_tenant_id).first_or_404(
+            description=f"Upload session {token} not found for this tenant"
+        )
+        return _sessao_response(sessao)
+
+    @media_ns.doc('upload_chunk', body=None)
+    @media_ns.expect(chunk_parser)
+    @media_ns.response(200, 'Chunk stored; more expected', sessao_upload_model)
+    @media_ns.response(201, 'Last chunk stored; file created', arquivo_model)
+    @media_ns.response(409, 'offset does not match the bytes received so far')
+    def put(self, token):
+        """
+        Send the next chunk as the raw request body. It is forwarded to the
+        storage upload session in pieces of at most the chunk size; the file
+        is created when the declared size is reached.
+        """
+        try:
+            current_tenant_id = get_current_tenant_id()
+            args = chunk_parser.parse_args()
+
+            # Locked so two clients cannot append to the same session at once
+            sessao = SessaoUpload.query.filter_by(token=token, tenant_id=current_tenant_id).with_for_update().first_or_404(
+                description=f"Upload session {token} not found for this tenant"
+            )
+            if sessao.concluida:
+                abort(409, message='Upload already completed.', arquivo_id=sessao.arquivo_id)
+            if sessao.expira_em < datetime.utcnow():
+                abort(410, message='Upload session expired; start a new one.')
+            if args['offset'] != sessao.offset:
+                abort(409, message='Chunk offset does not match the bytes received.', offset=sessao.offset)
+
+            length = request.content_length
+            if length is None:
+                abort(411, message='Content-Length is required.')
+            fim = sessao.offset + length
+            if length == 0 or fim > sessao.tamanho_total:
+                abort(400, message='Chunk is empty or goes past the declared size.')
+            if fim < sessao.tamanho_total and length % DROPBOX_BLOCK_SIZE:
+                abort(400, message=f'Chunks other than the last must be a multiple of {DROPBOX_BLOCK_SIZE} bytes.')
+            if fim == sessao.tamanho_total:
+                # The last chunk is refused before its bytes are read if the quota is gone
+                ensure_storage_quota(current_tenant_id, sessao.tamanho_total)
+
+            storage = get_storage_backend()
+            hasher = DropboxContentHasher(sessao.hashes_blocos, sessao.offset)
+            piece_size = upload_chunk_size()
+            try:
+                while hasher.size < fim:
+                    piece = read_chunk(request.stream, min(piece_size, fim - hasher.size))
+                    if hasher.size + len(piece) < fim and (not piece or len(piece) % DROPBOX_BLOCK_SIZE):
+                        # Body cut short: keep what is block-aligned, client resumes at sessao.offset
+                        break
+                    if hasher.size + len(piece) == sessao.tamanho_total:
+                        if sessao.storage_session_id is None:
+                            sessao.storage_session_id = storage.start_upload_session(current_tenant_id)
+                        storage.finish_upload_session(
+                            current_tenant_id, sessao.storage_session_id, hasher.size, piece, sessao.caminho
+                        )
+                    elif sessao.storage_session_id is None:
+                        sessao.storage_session_id = storage.start_upload_session(current_tenant_id, piece)
+                    else:
+                        storage.append_upload_session(current_tenant_id, sessao.storage_session_id, hasher.size, piece)
+                    hasher.update(piece)
+                    sessao.offset = hasher.size
+                    sessao.hashes_blocos = list(hasher.block_hashes)
+            except Exception:
+                # Keep the progress that already reached storage before failing
+                db.session.commit()
+                raise
+
+            if sessao.offset < sessao.tamanho_total:
+                db.session.commit()
+                if sessao.offset < fim:
+                    abort(400, message='Incomplete chunk received; resume from offset.', offset=sessao.offset)
+                return _sessao_response(sessao), 200
+
+            if not StorageUsageService().charge(current_tenant_id, sessao.tamanho_total):
+                # Another upload took the rest of the quota meanwhile: the
+                # finished file cannot be kept, and neither can its session
+                sessao_id, caminho = sessao.id, sessao.caminho
+                db.session.rollback()
+                SessaoUpload.query.filter_by(id=sessao_id).delete()
+                db.session.commit()
+                discard_stored_copy(storage, current_tenant_id, caminho)
+                abort(413, message='Upload exceeds the storage limit of your plan.')
+
+            content_hash = hasher.hexdigest()
+            objeto_id, caminho_objeto, duplicate_path = store_object(
+                current_tenant_id, sessao.caminho, sessao.tamanho_total, content_hash
+            )
+            arquivo = _new_arquivo(
+                current_tenant_id, sessao.categoria, caminho_objeto, sessao.nome_original, sessao.mime_type,
+                sessao.tamanho_total, content_hash, sessao.descricao, sessao.animal_id, objeto_id,
+            )
+            db.session.flush()
+            sessao.arquivo_id = arquivo.id
+            db.session.commit()
+            discard_stored_copy(storage, current_tenant_id, duplicate_path)
+            _schedule_variants(arquivo)
+            return media_ns.marshal(arquivo, arquivo_model), 201
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Database error during chunk upload for session {token}: {e}")
+            abort(500, message='Database error occurred.')
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"An unexpected error occurred during chunk upload for session {token}: {e}")
+            abort(500, message='An error occurred during chunk upload.')
+
+    @media_ns.doc('cancel_upload_session')
+    @media_ns.response(204, 'Upload session cancelled')
+    def delete(self, token):
+        """Cancel an unfinished upload and discard the partial data kept by storage"""
+        try:
+            current_tenant_id = get_current_tenant_id()
+            sessao = SessaoUpload.query.filter_by(token=token, tenant_id=current_tenant_id).first_or_404(
+                description=f"Upload session {token} not found for this tenant"
+            )
+            if sessao.concluida:
+                abort(409, message='Upload already completed; delete the file instead.')
+            if sessao.storage_session_id is not None:
+                get_storage_backend().abort_upload_session(current_tenant_id, sessao.storage_session_id)
+            db.session.delete(sessao)
+            db.session.commit()
+            return '', 204
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Database error cancelling upload session {token}: {e}")
+            abort(500, message='Database error occurred.')
+
+
+uso_armazenamento_model = media_ns.model('UsoArmazenamento', {
+    'bytes_usados': fields.Integer(description='Sum of the sizes of the tenant\'s files'),
+    'arquivos': fields.Integer,
+    'limite_bytes': fields.Integer(description='Storage limit of the plan (0: no limit; null: no active plan)'),
+    'disponivel_bytes': fields.Integer(description='Bytes left before the limit (null: no limit)'),
+})
+
+
+@media_ns.route('/uso')
+class UsoArmazenamentoResource(Resource):
+    @media_ns.doc('get_storage_usage')
+    @media_ns.marshal_with(uso_armazenamento_model)
+    def get(self):
+        """Media storage used by the tenant and what its plan allows"""
+        try:
+            current_tenant_id = get_current_tenant_id()
+            bytes_usados, arquivos = StorageUsageService().usage(current_tenant_id)
+            limite = storage_limit(current_tenant_id)
+            return {
+                'bytes_usados': bytes_usados,
+                'arquivos': arquivos,
+                'limite_bytes': limite,
+                'disponivel_bytes': 0 if limite is None else (max(limite - bytes_usados, 0) if limite else None),
+            }
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            current_app.logger.error(f"Database error reading storage usage: {e}")
+            abort(500, message='Database error occurred.')
+
+
+# --- Albums ---
+
+album_model = media_ns.model('Album', {
+    'id': fields.Integer(readOnly=True),
+    'nome': fields.String(required=True),
+    'descricao': fields.String,
+    'data_criacao': fields.Date(readOnly=True),
+    'publico': fields.Boolean,
+    'visualizacoes': fields.Integer(readOnly=True),
+    'animal_id': fields.Integer(required=True),
+    'capa': fields.Raw(readOnly=True, description='First photo of the album: {id, url, variantes}'),
+})
+
+album_imagem_model = media_ns.model('AlbumImagem', {
+    'id': fields.Integer,
+    'nome_original': fields.String,
+    'descricao': fields.String,
+    'ordem': fields.Integer,
+    'principal': fields.Boolean,
+    'status_variantes': fields.String,
+    'url': fields.String(description='Shareable link from storage, or the download endpoint'),
+    'variantes': fields.Raw(attribute=lambda imagem: variant_urls(imagem)),
+})
+
+album_detalhe_model = media_ns.clone('AlbumDetalhe', album_model, {
+    'imagens': fields.List(fields.Nested(album_imagem_model)),
+})
+
+album_page_model = media_ns.model('AlbumPage', {
+    'items': fields.List(fields.Nested(album_model)),
+    '_meta': fields.Raw(description='Pagination metadata: limit, has_next, next_cursor')
+})
+
+album_upload_parser = reqparse.RequestParser()
+album_upload_parser.add_argument('files', type=FileStorage, location='files', action='append', required=True,
+                                 help='Photos to add (repeat the field for each file)')
+album_upload_parser.add_argument('descricao', type=str, location='form', help='Description for every photo')
+
+DEFAULT_BULK_UPLOAD_MAX_FILES = 50
+
+album_list_parser = reqparse.RequestParser()
+album_list_parser.add_argument('animal_id', type=int, location='args', help='Filter by animal')
+album_list_parser.add_argument('limit', type=int, location='args', help='Page size (default 50, max 200)')
+album_list_parser.add_argument('cursor', type=str, location='args', help='next_cursor from the previous page')
+
+
+@media_ns.route('/albuns')
+class AlbumList(Resource):
+    @media_ns.doc('list_albuns')
+    @media_ns.expect(album_list_parser)
+    @media_ns.marshal_with(album_page_model)
+    def get(self):
+        """List albums, newest first, each with its cover photo's variant URLs"""
+        try:
+            current_tenant_id = get_current_tenant_id()
+            args = album_list_parser.parse_args()
+
+            query = AlbumAnimal.query.filter(AlbumAnimal.tenant_id == current_tenant_id)
+            if args['animal_id']:
+                query = query.filter(AlbumAnimal.animal_id == args['animal_id'])
+            try:
+                albuns, meta = keyset_paginate(query, [AlbumAnimal.id], limit=args['limit'], cursor=args['cursor'])
+            except ValueError as e:
+                abort(400, message=str(e))
+
+            capas = _first_images(current_tenant_id, ImagemAnimal.album_id, [album.id for album in albuns])
+            for album in albuns:
+                album.capa = capas.get(album.id)
+            return {'items': albuns, '_meta': meta}
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            current_app.logger.error(f"Database error during album listing: {e}")
+            abort(500, message='Database error occurred.')
+
+    @media_ns.doc('create_album')
+    @media_ns.expect(album_model)
+    @media_ns.marshal_with(album_model, code=201)
+    def post(self):
+        """Create an album for an animal; add photos with PUT /media/arquivos/<id> (album_id)"""
+        try:
+            current_tenant_id = get_current_tenant_id()
+            data = media_ns.payload or {}
+
+            if not data.get('nome'):
+                abort(400, message='Missing or empty required field: nome')
+            animal_id = data.get('animal_id')
+            if not animal_id or not Animal.query.filter_by(id=animal_id, tenant_id=current_tenant_id).first():
+                abort(404, message=f"Animal with ID {animal_id} not found for this tenant.")
+
+            album = AlbumAnimal(
+                nome=data['nome'],
+                descricao=data.get('descricao'),
+                publico=bool(data.get('publico', False)),
+                visualizacoes=0,
+                animal_id=animal_id,
+                tenant_id=current_tenant_id,
+            )
+            db.session.add(album)
+            db.session.commit()
+            return album, 201
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Database error creating album: {e}")
+            abort(500, message='Database error occurred.')
+
+
+@media_ns.route('/albuns/<int:id>')
+@media_ns.param('id', 'The album identifier')
+class AlbumResource(Resource):
+    @media_ns.doc('get_album')
+    @media_ns.marshal_with(album_detalhe_model)
+    def get(self, id):
+        """Album with its photos in display order, each with variant URLs"""
+        try:
+            current_tenant_id = get_current_tenant_id()
+            album = AlbumAnimal.query.filter_by(id=id, tenant_id=current_tenant_id).first_or_404(
+                description=f"Album with ID {id} not found for this tenant"
+            )
+            album.imagens = ImagemAnimal.query.filter(
+                ImagemAnimal.tenant_id == current_tenant_id,
+                ImagemAnimal.album_id == album.id,
+            ).order_by(ImagemAnimal.ordem.asc().nullslast(), ImagemAnimal.id).all()
+            urls = share_urls(album.imagens)
+            for imagem in album.imagens:
+                imagem.url = urls[imagem.id]
+            album.capa = _first_images(current_tenant_id, ImagemAnimal.album_id, [album.id]).get(album.id)
+            return album
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            current_app.logger.error(f"Database error retrieving album {id}: {e}")
+            abort(500, message='Database error occurred.')
+
+    @media_ns.doc('delete_album')
+    @media_ns.response(204, 'Album deleted; its files are kept')
+    def delete(self, id):
+        """Delete an album; its files stay, outside any album"""
+        try:
+            current_tenant_id = get_current_tenant_id()
+            album = AlbumAnimal.query.filter_by(id=id, tenant_id=current_tenant_id).first_or_404(
+                description=f"Album with ID {id} not found for this tenant"
+            )
+            Arquivo.query.filter_by(album_id=album.id, tenant_id=current_tenant_id).update(
+                {'album_id': None}, synchronize_session=False
+            )
+            db.session.delete(album)
+            db.session.commit()
+            return '', 204
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Database error deleting album {id}: {e}")
+            abort(500, message='Database error occurred.')
+
+
+@media_ns.route('/albuns/<int:id>/arquivos')
+@media_ns.param('id', 'The album identifier')
+class AlbumUpload(Resource):
+    @media_ns.doc('upload_album_photos')
+    @media_ns.expect(album_upload_parser)
+    @media_ns.marshal_list_with(arquivo_model, code=201)
+    def post(self, id):
+        """
+        Add several photos to an album in one request. Files go to storage
+        in parallel (MEDIA_TRANSFER_CONCURRENCY at a time) and are appended
+        after the album's current photos; if any upload fails, none is kept.
+        """
+        storage, uploaded = None, []
+        try:
+            current_tenant_id = get_current_tenant_id()
+            album = AlbumAnimal.query.filter_by(id=id, tenant_id=current_tenant_id).first_or_404(
+                description=f"Album with ID {id} not found for this tenant"
+            )
+            ensure_storage_quota(current_tenant_id, request.content_length)
+            args = album_upload_parser.parse_args()
+            files = [f for f in args['files'] or [] if f and f.filename]
+            max_files = current_app.config.get('MEDIA_BULK_UPLOAD_MAX_FILES', DEFAULT_BULK_UPLOAD_MAX_FILES)
+            if not files:
+                abort(400, message='No file provided')
+            if len(files) > max_files:
+                abort(400, message=f'At most {max_files} files per request.')
+
+            storage = get_storage_backend()
+            caminhos = [destination_path_for(album.animal_id, f.filename) for f in files]
+            stored = upload_concurrently(storage, current_tenant_id, list(zip((f.stream for f in files), caminhos)))
+            uploaded = caminhos  # Deleted again if the files cannot be recorded
+            charge_storage(storage, current_tenant_id, sum(tamanho for tamanho, _ in stored), uploaded, len(stored))
+
+            ultima_ordem = db.session.query(func.max(ImagemAnimal.ordem)).filter(
+                ImagemAnimal.tenant_id == current_tenant_id,
+                ImagemAnimal.album_id == album.id,
+            ).scalar() or 0
+            arquivos, duplicate_paths = [], []
+            for posicao, (f, caminho, (tamanho, content_hash)) in enumerate(zip(files, caminhos, stored), start=1):
+                objeto_id, caminho_objeto, duplicate_path = store_object(current_tenant_id, caminho, tamanho, content_hash)
+                arquivo = _new_arquivo(
+                    current_tenant_id, 'photo', caminho_objeto, f.filename, f.mimetype,
+                    tamanho, content_hash, args['descricao'], album.animal_id, objeto_id,
+                )
+                arquivo.album_id = album.id
+                arquivo.ordem = ultima_ordem + posicao
+                arquivos.append(arquivo)
+                duplicate_paths.append(duplicate_path)
+            db.session.commit()
+            uploaded = []
+
+            for duplicate_path in duplicate_paths:
+                discard_stored_copy(storage, current_tenant_id, duplicate_path)
+            for arquivo in arquivos:
+                _schedule_variants(arquivo)
+            return arquivos, 201
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            for caminho in uploaded:
+                discard_stored_copy(storage, current_tenant_id, caminho)
+            current_app.logger.error(f"Database error during bulk upload to album {id}: {e}")
+            abort(500, message='Database error occurred during file upload.')
+        except Exception as e:
+            db.session.rollback()
+            for caminho in uploaded:
+                discard_stored_copy(storage, current_tenant_id, caminho)
+            current_app.logger.error(f"An unexpected error occurred during bulk upload to album {id}: {e}")
+            abort(500, message='An error occurred during file upload.')
+
+
+@media_ns.route('/albuns/<int:id>/zip')
+@media_ns.param('id', 'The album identifier')
+class AlbumExport(Resource):
+    @media_ns.doc('export_album', responses={200: 'ZIP archive of the album\'s files'})
+    @media_ns.produces(['application/zip'])
+    def get(self, id):
+        """
+        Download the album as a ZIP. The archive is streamed while it is
+        built, with the next files fetched from storage in parallel; nothing
+        is staged in memory or on disk beyond those few files.
+        """
+        try:
+            current_tenant_id = get_current_tenant_id()
+            album = AlbumAnimal.query.filter_by(id=id, tenant_id=current_tenant_id).first_or_404(
+                description=f"Album with ID {id} not found for this tenant"
+            )
+            arquivos = Arquivo.query.filter(
+                Arquivo.tenant_id == current_tenant_id,
+                Arquivo.album_id == album.id,
+            ).order_by(Arquivo.id).all()
+
+            response = Response(
+                stream_with_context(iter_zip(get_storage_backend(), current_tenant_id, arquivos)),
+                mimetype='application/zip',
+                direct_passthrough=True,
+            )
+            response.headers.set('Content-Disposition', 'attachment', **_content_disposition(f'{album.nome}.zip'))
+            return response
+
+        except HTTPException:
+            raise
+        except SQLAlchemyError as e:
+            current_app.logger.error(f"Database error exporting album {id}: {e}")
+            abort(500, message='Database error occurred.')
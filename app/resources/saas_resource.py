@@ -1,10 +1,13 @@
 from flask import request
 from flask_restx import Namespace, Resource, fields, abort
+from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from werkzeug.exceptions import HTTPException
 
 from app import db
 from app.models.saas import PlanoAssinatura, Assinatura, Pagamento
 from app.models.tenant import Tenant
+from app.services.tenant_service import TenantService
 # Remover: from app.services.payment_service import PaymentService
 from datetime import date
 
@@ -18,6 +21,34 @@ def get_current_tenant():
         id = 1
     return MockTenant()
 
+# Subscription statuses that grant the plan's entitlements to the tenant
+ACTIVE_SUBSCRIPTION_STATUSES = {'ativa', 'em teste'}
+
+
+def apply_subscription_entitlements(assinatura):
+    """
+    Applies the plan of an active subscription to its tenant. When the
+    subscription is not active, the tenant keeps the plan of another active
+    subscription if it has one, else its entitlements are revoked. Either
+    way pending changes are committed with the tenant's new entitlements,
+    so the subscription write and the plan change land together.
+    """
+    # A new subscription needs its id before the query below excludes it
+    db.session.flush()
+    if (assinatura.status or '').lower() in ACTIVE_SUBSCRIPTION_STATUSES:
+        TenantService().assign_subscription_plan(assinatura.tenant_id, assinatura.plano_id)
+        return
+    outra_ativa = Assinatura.query.join(Assinatura.plano).filter(
+        Assinatura.tenant_id == assinatura.tenant_id,
+        Assinatura.id != assinatura.id,
+        func.lower(Assinatura.status).in_(ACTIVE_SUBSCRIPTION_STATUSES),
+        PlanoAssinatura.ativo.isnot(False),
+    ).order_by(Assinatura.data_inicio.desc()).first()
+    if outra_ativa is not None:
+        TenantService().assign_subscription_plan(assinatura.tenant_id, outra_ativa.plano_id)
+    else:
+        TenantService().revoke_subscription_plan(assinatura.tenant_id)
+
 # Define models for API representation
 plano_assinatura_model = saas_ns.model('PlanoAssinatura', {
     'id': fields.Integer(readOnly=True),
@@ -26,6 +57,7 @@ plano_assinatura_model = saas_ns.model('PlanoAssinatura', {
     'valor': fields.Float(required=True),
     'limite_funcionarios': fields.Integer(default=0),
     'limite_animais': fields.Integer,
+    'limite_armazenamento_mb': fields.Integer(description='Media storage limit in MiB (0 or empty: no limit)'),
     'backup_automatico': fields.Boolean,
     'suporte_premium': fields.Boolean,
     'recursos': fields.String,  # Or fields.Raw for JSON
@@ -146,6 +178,8 @@ class PlanoAssinaturaList(Resource):
                  saas_ns.abort(400, message='Limite de funcionários must be a non-negative integer.')
             if data.get('limite_animais') is not None and data['limite_animais'] < 0:
                  saas_ns.abort(400, message='Limite de animais must be a non-negative integer.')
+            if data.get('limite_armazenamento_mb') is not None and data['limite_armazenamento_mb'] < 0:
+                 saas_ns.abort(400, message='Limite de armazenamento must be a non-negative integer.')
 
             new_plano = PlanoAssinatura(**data)
             db.session.add(new_plano)
@@ -194,10 +228,16 @@ class PlanoAssinaturaResource(Resource):
                  saas_ns.abort(400, message='Limite de funcionários must be a non-negative integer.')
             if data.get('limite_animais') is not None and data['limite_animais'] < 0:
                  saas_ns.abort(400, message='Limite de animais must be a non-negative integer.')
+            if data.get('limite_armazenamento_mb') is not None and data['limite_armazenamento_mb'] < 0:
+                 saas_ns.abort(400, message='Limite de armazenamento must be a non-negative integer.')
 
             for key, value in data.items():
                 setattr(plano, key, value)
             db.session.commit()
+
+            # Tenants on this plan get the new limits and feature flags
+            TenantService().sync_plan_to_tenants(plano)
+            return plano
         except SQLAlchemyError as e:
             db.session.rollback()
             saas_ns.abort(500, message=f'Database error occurred: {e}')
@@ -272,11 +312,18 @@ class AssinaturaList(Resource):
             plano = PlanoAssinatura.query.get(plano_id)
             if not plano:
                 saas_ns.abort(404, message=f'PlanoAssinatura with ID {plano_id} not found.')
+            if plano.ativo is False:
+                saas_ns.abort(400, message=f'PlanoAssinatura with ID {plano_id} is not active.')
 
             new_assinatura = Assinatura(tenant_id=tenant_id, **data)
             db.session.add(new_assinatura)
-            db.session.commit()
+
+            # Commits the subscription together with the tenant's entitlements
+            apply_subscription_entitlements(new_assinatura)
             return new_assinatura, 201
+        except HTTPException:
+            db.session.rollback()
+            raise
         except (SQLAlchemyError, IntegrityError) as e:
             db.session.rollback()
             saas_ns.abort(500, message=f'Database error occurred: {e}')
@@ -329,14 +376,29 @@ class AssinaturaResource(Resource):
                  if data['status'] not in allowed_statuses:
                       saas_ns.abort(400, message=f"Invalid status. Allowed values are: {', '.join(allowed_statuses)}")
 
+            # The plan cannot change here, so only a new status moves entitlements
+            status_changed = data.get('status') is not None and \
+                data['status'].lower() != (assinatura.status or '').lower()
+            if status_changed and data['status'].lower() in ACTIVE_SUBSCRIPTION_STATUSES \
+                    and assinatura.plano is not None and assinatura.plano.ativo is False:
+                saas_ns.abort(400, message=f'PlanoAssinatura with ID {assinatura.plano_id} is not active.')
+
             for key, value in data.items():
                  if hasattr(assinatura, key): # Only update if the attribute exists
                     setattr(assinatura, key, value)
                 # else: ignore unknown fields or raise error
 
-            db.session.commit()
+            if status_changed:
+                # Commits the update together with the tenant's entitlements
+                apply_subscription_entitlements(assinatura)
+            else:
+                db.session.commit()
             return assinatura
+        except HTTPException:
+            db.session.rollback()
+            raise
         except (SQLAlchemyError, IntegrityError) as e:
+            db.session.rollback()
             saas_ns.abort(500, message=f'Database error occurred: {e}')
         except Exception as e:
             db.session.rollback()
@@ -605,12 +667,15 @@ class CreateSubscriptionWithPaymentResource(Resource):
                       saas_ns.abort(400, message=f"Invalid status. Allowed values are: {', '.join(allowed_statuses)}")
 
              plano = PlanoAssinatura.query.get(plano_id)
+             tenant = db.session.get(Tenant, tenant_id)
              if not plano or not tenant:
                  saas_ns.abort(404, message='PlanoAssinatura or Tenant not found') # Needs tenant check for Tenant
+             if plano.ativo is False:
+                 saas_ns.abort(400, message=f'PlanoAssinatura with ID {plano_id} is not active.')
 
 
              # Create the local subscription record first (status could be 'pendente', 'ativo', etc.)
-             new_assinatura = Assinatura(**subscription_data)
+             new_assinatura = Assinatura(tenant_id=tenant_id, **subscription_data)
              new_assinatura.status = 'pendente' # Initial status before payment
              db.session.add(new_assinatura)
              db.session.commit() # Commit to get the subscription ID
@@ -651,10 +716,13 @@ class CreateSubscriptionWithPaymentResource(Resource):
                  db.session.add(new_pagamento)
 
 
-             db.session.commit() # Commit payment and subscription status update
-
+             # Commits payment and subscription status with the tenant's entitlements
+             apply_subscription_entitlements(new_assinatura)
              return new_assinatura, 201
 
+         except HTTPException:
+             db.session.rollback()
+             raise
          except (SQLAlchemyError, IntegrityError) as e:
              db.session.rollback()
              saas_ns.abort(500, message=f'Database error occurred: {e}')
@@ -685,10 +753,14 @@ class CancelSubscriptionResource(Resource):
             assinatura.status = 'cancelada'
             # TODO: Update data_vencimento if necessary
 
-            db.session.commit()
+            # Commits the new status together with the tenant's reduced entitlements
+            apply_subscription_entitlements(assinatura)
 
             return {'message': 'Subscription cancelled successfully'}, 200
 
+        except HTTPException:
+            db.session.rollback()
+            raise
         except (SQLAlchemyError, IntegrityError) as e:
             db.session.rollback()
             saas_ns.abort(500, message=f'Database error occurred: {e}')
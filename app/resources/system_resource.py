@@ -151,8 +151,13 @@ class UsuarioResource(Resource):
         # Prevent updating sensitive fields or require separate endpoints
         data.pop('senha', None)
 
+        data.pop('permissoes_versao', None)
+        permissoes = data.pop('permissoes', None)
+
         for key, value in data.items():
             setattr(usuario, key, value)
+        if permissoes is not None:
+            usuario.definir_permissoes(permissoes)
 
         db.session.commit()
         return usuario
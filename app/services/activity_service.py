@@ -0,0 +1,122 @@
+import atexit
+import os
+import threading
+from datetime import datetime
+
+from sqlalchemy import text
+
+# Commutative update: concurrent flushes from different gunicorn workers can
+# apply in any order and still converge to the latest access / total count.
+_FLUSH_SQL = text(
+    "UPDATE usuarios "
+    "SET ultimo_acesso = GREATEST(COALESCE(ultimo_acesso, :ultimo_acesso), :ultimo_acesso), "
+    "total_requisicoes = COALESCE(total_requisicoes, 0) + :requisicoes "
+    "WHERE id = :id"
+)
+
+
+class ActivityBuffer:
+    """
+    Write-behind buffer for Usuario.ultimo_acesso and Usuario.total_requisicoes.
+
+    Requests only touch an in-memory dict (user id -> [last access, count]).
+    A daemon thread flushes it every ACTIVITY_FLUSH_INTERVAL seconds with one
+    batched UPDATE, or earlier once ACTIVITY_FLUSH_MAX_PENDING users are
+    pending. Staleness is therefore bounded by the flush interval (plus the
+    duration of one flush); activity recorded since the last flush is lost
+    only if the worker is killed without running its atexit hook.
+
+    Each process keeps its own buffer and flush thread (re-created after a
+    fork), so it is safe under gunicorn's pre-fork workers.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._pid = None
+        self._wakeup = threading.Event()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if self.app is None:
+            atexit.register(self.flush)
+        self.app = app
+        self.interval = app.config.get('ACTIVITY_FLUSH_INTERVAL', 10)
+        self.max_pending = app.config.get('ACTIVITY_FLUSH_MAX_PENDING', 1000)
+
+    def record(self, user_id: int, when: datetime = None):
+        """Records one request for the user. Never touches the database."""
+        when = when or datetime.utcnow()
+        self._ensure_flusher()
+        with self._lock:
+            entry = self._pending.get(user_id)
+            if entry is None:
+                self._pending[user_id] = [when, 1]
+            else:
+                if when > entry[0]:
+                    entry[0] = when
+                entry[1] += 1
+            if len(self._pending) >= self.max_pending:
+                self._wakeup.set()
+
+    def flush(self) -> int:
+        """Writes all pending activity in one batched UPDATE. Returns the number of users flushed."""
+        with self._lock:
+            if not self._pending or self._pid != os.getpid():
+                return 0
+            pending, self._pending = self._pending, {}
+
+        # Sorted ids give every worker the same row lock order (no deadlocks)
+        params = [
+            {'id': user_id, 'ultimo_acesso': when, 'requisicoes': count}
+            for user_id, (when, count) in sorted(pending.items())
+        ]
+        try:
+            with self.app.app_context():
+                from app import db
+                with db.engine.begin() as connection:
+                    connection.execute(_FLUSH_SQL, params)
+        except Exception as e:
+            self._restore(pending)
+            if self.app is not None:
+                self.app.logger.error(f"Error flushing user activity ({len(params)} users): {e}")
+            return 0
+        return len(params)
+
+    def _restore(self, pending):
+        """Merges entries of a failed flush back so they are retried next time."""
+        with self._lock:
+            for user_id, (when, count) in pending.items():
+                entry = self._pending.get(user_id)
+                if entry is None:
+                    self._pending[user_id] = [when, count]
+                else:
+                    entry[0] = max(entry[0], when)
+                    entry[1] += count
+
+    def _ensure_flusher(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == pid and self._thread is not None:
+                return
+            if self._pid != pid:
+                # Forked child: the parent's pending entries are the parent's to flush
+                self._pending = {}
+                self._wakeup = threading.Event()
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name='activity-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+activity_buffer = ActivityBuffer()
@@ -0,0 +1,131 @@
+"""
+Whole-album transfers: bulk upload pushes several files to storage at once
+on a bounded thread pool, and export streams a ZIP of the album's files
+while it is being built. Storage calls are network-bound, so a few threads
+overlap them; database work stays on the request thread.
+"""
+
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import current_app
+
+DEFAULT_MEDIA_TRANSFER_CONCURRENCY = 4
+# Members up to this size are fetched ahead by the pool; larger ones are
+# streamed in turn, so the export never holds a big video in memory
+ZIP_PREFETCH_MAX_SIZE = 32 * 1024 * 1024
+# Earliest timestamp a ZIP entry can hold
+ZIP_EPOCH = datetime(1980, 1, 1)
+
+
+def transfer_concurrency() -> int:
+    return max(1, int(current_app.config.get('MEDIA_TRANSFER_CONCURRENCY', DEFAULT_MEDIA_TRANSFER_CONCURRENCY)))
+
+
+def _in_app_context(app, func):
+    """Runs `func` on a pool thread with the app context storage backends expect."""
+    def run(*args):
+        with app.app_context():
+            return func(*args)
+    return run
+
+
+def upload_concurrently(storage, tenant_id: int, uploads):
+    """
+    Uploads (stream, destination_path) pairs to storage in parallel. Returns
+    one (size, hash) per upload, in order. If any upload fails, the ones
+    that succeeded are deleted again and the first error is raised.
+    """
+    app = current_app._get_current_object()
+    upload = _in_app_context(app, lambda stream, path: storage.upload_stream(tenant_id, stream, path)[1:])
+    with ThreadPoolExecutor(max_workers=transfer_concurrency(), thread_name_prefix='media-upload') as pool:
+        futures = [pool.submit(upload, stream, path) for stream, path in uploads]
+    errors = [future.exception() for future in futures if future.exception() is not None]
+    if errors:
+        for future, (_, path) in zip(futures, uploads):
+            if future.exception() is None:
+                try:
+                    storage.delete_file(tenant_id, path)
+                except Exception as e:
+                    current_app.logger.error(f"Could not delete {path} of tenant {tenant_id} after a failed bulk upload: {e}")
+        raise errors[0]
+    return [future.result() for future in futures]
+
+
+class _ZipSink:
+    """Write-only file object for ZipFile; the generator drains what was written."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+
+def zip_member_names(arquivos) -> list:
+    """Names inside the archive: original names, made unique ('foto.jpg', 'foto (2).jpg')."""
+    names, seen = [], set()
+    for arquivo in arquivos:
+        base = (arquivo.nome_original or arquivo.nome).replace('/', '_').replace('\\', '_')
+        stem, ext = os.path.splitext(base)
+        name, n = base, 1
+        while name.lower() in seen:
+            n += 1
+            name = f'{stem} ({n}){ext}'
+        seen.add(name.lower())
+        names.append(name)
+    return names
+
+
+def iter_zip(storage, tenant_id: int, arquivos):
+    """
+    Yields a ZIP of the files as it is built. Small members are fetched by
+    the pool a few files ahead of the one being written; members are stored
+    uncompressed (photos and videos are compressed already). Needs an app
+    context for its whole run (wrap it in stream_with_context).
+    """
+    app = current_app._get_current_object()
+    fetch = _in_app_context(app, lambda caminho: storage.download_file(tenant_id, caminho))
+    sink = _ZipSink()
+    window = transfer_concurrency()
+
+    with ThreadPoolExecutor(max_workers=window, thread_name_prefix='media-zip') as pool:
+        def prefetch(arquivo):
+            if arquivo.tamanho is not None and arquivo.tamanho <= ZIP_PREFETCH_MAX_SIZE:
+                return pool.submit(fetch, arquivo.caminho)
+            return None
+
+        members = list(zip(arquivos, zip_member_names(arquivos)))
+        pending = [prefetch(arquivo) for arquivo, _ in members[:window]]
+        try:
+            # The sink has no tell(), so ZipFile writes sizes after each member
+            with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as archive:
+                for index, (arquivo, name) in enumerate(members):
+                    future = pending.pop(0)
+                    if index + window < len(members):
+                        pending.append(prefetch(members[index + window][0]))
+
+                    info = zipfile.ZipInfo(name, date_time=max(arquivo.data_upload or ZIP_EPOCH, ZIP_EPOCH).timetuple()[:6])
+                    info.file_size = int(arquivo.tamanho or 0)
+                    with archive.open(info, 'w', force_zip64=arquivo.tamanho is None) as member:
+                        chunks = [future.result()] if future is not None \
+                            else storage.open_stream(tenant_id, arquivo.caminho)
+                        for chunk in chunks:
+                            member.write(chunk)
+                            yield sink.drain()
+            yield sink.drain()
+        finally:
+            for future in pending:
+                if future is not None:
+                    future.cancel()
+
@@ -0,0 +1,316 @@
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import bindparam, delete, func, insert, update
+
+from app import db
+from app.models.animal import INTERVALO_CIO_PADRAO_DIAS
+
+# Observations (heats or matings) this close together belong to the same heat
+MESMO_CIO_DIAS = 30
+# Intervals outside this range are split heats or gaps in the records
+INTERVALO_MIN_DIAS = 90
+INTERVALO_MAX_DIAS = 400
+# Only the latest intervals count, each one weighing DECAIMENTO times the next
+HISTORICO_MAX = 6
+DECAIMENTO = 0.7
+# Weight (in intervals) of the kennel-wide median when shrinking a dam's mean
+PESO_PRIOR = 1.0
+# Kennel-wide intervals needed before their median replaces the default
+AMOSTRA_MIN_PRIOR = 5
+
+GESTACAO_DIAS = 63
+# Earliest heat after whelping
+POS_PARTO_MIN_DIAS = 120
+
+DURACAO_CIO_DIAS = 21
+JANELA_FERTIL = (9, 14)  # Days after the heat starts
+DESCANSO_REPRODUTOR_DIAS = 2
+# Births expected this long ago still show up until the litter is recorded
+PARTO_ATRASADO_DIAS = 14
+
+
+class HeatPredictions(NamedTuple):
+    matriz_id: np.ndarray
+    proximo_cio: np.ndarray   # Day ordinals (date.toordinal)
+    intervalo: np.ndarray     # Estimated interval in days
+
+
+def predict_next_heats(matriz_ids, obs_matriz, obs_dia, bloqueio_matriz, bloqueio_dia, bloqueio_ate, hoje) -> HeatPredictions:
+    """
+    Predicts the next heat of every dam at once. All dates are day ordinals.
+
+    obs_*: heat observations (recorded heat starts and matings).
+    bloqueio_*: pregnancies (confirmed matings, births) on bloqueio_dia that
+        push the next heat to at least bloqueio_ate.
+
+    Each dam's interval is a recency-weighted mean of her last HISTORICO_MAX
+    plausible intervals, shrunk towards the kennel median (or the default
+    interval) so dams with little history fall back to the kennel's norm.
+    Dams without observations get no prediction.
+    """
+    matriz_ids = np.unique(np.asarray(matriz_ids, dtype=np.int64))
+    obs_matriz = np.asarray(obs_matriz, dtype=np.int64)
+    obs_dia = np.asarray(obs_dia, dtype=np.int64)
+    empty = HeatPredictions(np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0, np.int64))
+    if not len(matriz_ids) or not len(obs_dia):
+        return empty
+
+    # Dam index of each observation; drop observations of other animals
+    idx = np.searchsorted(matriz_ids, obs_matriz)
+    known = (idx < len(matriz_ids)) & (matriz_ids[np.minimum(idx, len(matriz_ids) - 1)] == obs_matriz)
+    idx, dia = idx[known], obs_dia[known]
+    if not len(dia):
+        return empty
+    order = np.lexsort((dia, idx))
+    idx, dia = idx[order], dia[order]
+
+    # Merge observations of the same heat (e.g. heat start and its matings)
+    nova_mae = np.ones(len(idx), dtype=bool)
+    nova_mae[1:] = idx[1:] != idx[:-1]
+    keep = nova_mae.copy()
+    keep[1:] |= (dia[1:] - dia[:-1]) > MESMO_CIO_DIAS
+    idx, dia, nova_mae = idx[keep], dia[keep], nova_mae[keep]
+
+    n = len(matriz_ids)
+    ultimo = np.full(n, -1, dtype=np.int64)
+    np.maximum.at(ultimo, idx, dia)
+
+    # Consecutive intervals of each dam
+    mesma = ~nova_mae[1:]
+    intervalos = (dia[1:] - dia[:-1])[mesma]
+    dono = idx[1:][mesma]
+    validos = (intervalos >= INTERVALO_MIN_DIAS) & (intervalos <= INTERVALO_MAX_DIAS)
+    intervalos, dono = intervalos[validos], dono[validos]
+
+    if len(intervalos) >= AMOSTRA_MIN_PRIOR:
+        prior = float(np.median(intervalos))
+    else:
+        prior = float(INTERVALO_CIO_PADRAO_DIAS)
+
+    # Recency rank: 0 for a dam's latest interval, 1 for the one before, ...
+    por_mae = np.bincount(dono, minlength=n)
+    inicio = np.concatenate(([0], np.cumsum(por_mae)[:-1]))
+    recencia = por_mae[dono] - 1 - (np.arange(len(dono)) - inicio[dono])
+    pesos = np.where(recencia < HISTORICO_MAX, DECAIMENTO ** recencia, 0.0)
+
+    soma_pesos = np.bincount(dono, weights=pesos, minlength=n)
+    media = np.divide(np.bincount(dono, weights=pesos * intervalos, minlength=n), soma_pesos,
+                      out=np.zeros(n), where=soma_pesos > 0)
+    amostras = np.minimum(por_mae, HISTORICO_MAX)
+    intervalo = np.rint((amostras * media + PESO_PRIOR * prior) / (amostras + PESO_PRIOR)).astype(np.int64)
+
+    proximo = ultimo + intervalo
+
+    # A pregnancy from the latest heat delays the next one
+    bloqueio_matriz = np.asarray(bloqueio_matriz, dtype=np.int64)
+    if len(bloqueio_matriz):
+        b_idx = np.searchsorted(matriz_ids, bloqueio_matriz)
+        b_known = (b_idx < n) & (matriz_ids[np.minimum(b_idx, n - 1)] == bloqueio_matriz)
+        b_idx = b_idx[b_known]
+        b_dia = np.asarray(bloqueio_dia, dtype=np.int64)[b_known]
+        b_ate = np.asarray(bloqueio_ate, dtype=np.int64)[b_known]
+        atual = (ultimo[b_idx] >= 0) & (b_dia >= ultimo[b_idx] - MESMO_CIO_DIAS)
+        np.maximum.at(proximo, b_idx[atual], b_ate[atual])
+
+    # Heats missed in the records: roll forward to the first one not yet past
+    atrasados = np.maximum(0, -(-(hoje - proximo) // intervalo))
+    proximo = proximo + atrasados * intervalo
+
+    com_historico = ultimo >= 0
+    return HeatPredictions(matriz_ids[com_historico], proximo[com_historico], intervalo[com_historico])
+
+
+class HeatPredictionService:
+    """
+    Recomputes Matriz.proximo_cio for all dams of a tenant in one batch:
+    three queries load the tenant's heats, matings and births, the
+    predictions are computed with NumPy and written with one executemany.
+    """
+
+    def _active_matrizes(self, tenant_id):
+        from app.models.animal import Animal, Matriz
+
+        matrizes = Matriz.__table__
+        return db.session.query(Animal.id).join(
+            matrizes, matrizes.c.id == Animal.id
+        ).filter(
+            Animal.tenant_id == tenant_id,
+            Animal.ativo.is_(True),
+            matrizes.c.aposentada.isnot(True),
+        ).all()
+
+    def load_history(self, tenant_id):
+        """Returns (observations, pregnancies) as lists of tuples of day ordinals."""
+        from app.models.animal import Matriz
+        from app.models.breeding import Cruzamento, Ninhada, RegistroCio, cruzamento_animal_association as ca
+
+        matrizes = Matriz.__table__
+        cios = db.session.query(RegistroCio.matriz_id, RegistroCio.data_inicio).filter(
+            RegistroCio.tenant_id == tenant_id
+        ).all()
+        cruzamentos = db.session.query(ca.c.animal_id, Cruzamento.data_acasalamento, Cruzamento.confirmado).join(
+            Cruzamento, Cruzamento.id == ca.c.cruzamento_id
+        ).join(
+            matrizes, matrizes.c.id == ca.c.animal_id
+        ).filter(Cruzamento.tenant_id == tenant_id).all()
+        partos = db.session.query(Ninhada.matriz_id, Ninhada.data_parto).filter(
+            Ninhada.tenant_id == tenant_id,
+            Ninhada.data_parto.isnot(None),
+        ).all()
+
+        observacoes = [(m, d.toordinal()) for m, d in cios]
+        observacoes += [(m, d.toordinal()) for m, d, _ in cruzamentos if d is not None]
+        gestacoes = [
+            (m, d.toordinal(), d.toordinal() + GESTACAO_DIAS + POS_PARTO_MIN_DIAS)
+            for m, d, confirmado in cruzamentos if confirmado and d is not None
+        ]
+        gestacoes += [(m, d.toordinal(), d.toordinal() + POS_PARTO_MIN_DIAS) for m, d in partos]
+        return observacoes, gestacoes
+
+    def predict(self, tenant_id, hoje: date = None) -> HeatPredictions:
+        hoje = hoje or date.today()
+        matrizes = self._active_matrizes(tenant_id)
+        observacoes, gestacoes = self.load_history(tenant_id)
+        obs = np.array(observacoes, dtype=np.int64).reshape(-1, 2)
+        gest = np.array(gestacoes, dtype=np.int64).reshape(-1, 3)
+        return predict_next_heats(
+            [m.id for m in matrizes], obs[:, 0], obs[:, 1],
+            gest[:, 0], gest[:, 1], gest[:, 2], hoje.toordinal(),
+        )
+
+    def refresh(self, tenant_id, hoje: date = None) -> HeatPredictions:
+        """Stores the predictions on the Matriz rows (flushed, not committed)."""
+        from app.models.animal import Matriz
+
+        predictions = self.predict(tenant_id, hoje)
+        if len(predictions.matriz_id):
+            matrizes = Matriz.__table__
+            stmt = update(matrizes).where(matrizes.c.id == bindparam('b_id')).values(
+                proximo_cio=bindparam('b_proximo'),
+                intervalo_cio_dias=bindparam('b_intervalo'),
+            )
+            db.session.execute(stmt.execution_options(synchronize_session=False), [
+                {'b_id': int(m), 'b_proximo': date.fromordinal(int(p)), 'b_intervalo': int(i)}
+                for m, p, i in zip(*predictions)
+            ])
+        return predictions
+
+
+class BreedingCalendarService:
+    """
+    Rebuilds the tenant's precomputed breeding calendar (EventoCalendario):
+    predicted and ongoing heats, expected births and sire availability.
+    The calendar endpoint only reads this table.
+    """
+
+    def refresh(self, tenant_id, hoje: date = None) -> int:
+        """Recomputes heat predictions and replaces the tenant's calendar. The caller commits."""
+        from app.models.animal import Animal, Reprodutor
+        from app.models.breeding import (Cruzamento, EventoCalendario, Ninhada, RegistroCio,
+                                         cruzamento_animal_association as ca)
+
+        hoje = hoje or date.today()
+        predictions = HeatPredictionService().refresh(tenant_id, hoje)
+        gerado_em = datetime.utcnow()
+        eventos = []
+
+        nomes = dict(db.session.query(Animal.id, Animal.nome).filter(
+            Animal.tenant_id == tenant_id, Animal.ativo.is_(True)
+        ).all())
+
+        for matriz_id, proximo, intervalo in zip(*predictions):
+            inicio = date.fromordinal(int(proximo))
+            eventos.append({
+                'tipo': 'cio_previsto',
+                'data_inicio': inicio,
+                'data_fim': inicio + timedelta(days=DURACAO_CIO_DIAS - 1),
+                'animal_id': int(matriz_id),
+                'titulo': nomes.get(int(matriz_id)),
+                'referencia_id': None,
+                'detalhes': {
+                    'intervalo_dias': int(intervalo),
+                    'janela_fertil_inicio': (inicio + timedelta(days=JANELA_FERTIL[0])).isoformat(),
+                    'janela_fertil_fim': (inicio + timedelta(days=JANELA_FERTIL[1])).isoformat(),
+                },
+            })
+
+        cios = db.session.query(RegistroCio).filter(
+            RegistroCio.tenant_id == tenant_id,
+            RegistroCio.data_inicio >= hoje - timedelta(days=DURACAO_CIO_DIAS),
+        ).all()
+        for cio in cios:
+            eventos.append({
+                'tipo': 'cio',
+                'data_inicio': cio.data_inicio,
+                'data_fim': cio.data_fim or cio.data_inicio + timedelta(days=DURACAO_CIO_DIAS - 1),
+                'animal_id': cio.matriz_id,
+                'titulo': nomes.get(cio.matriz_id),
+                'referencia_id': cio.id,
+                'detalhes': None,
+            })
+
+        partos = db.session.query(Ninhada.id, Ninhada.matriz_id, Ninhada.data_previsao_parto).filter(
+            Ninhada.tenant_id == tenant_id,
+            Ninhada.data_parto.is_(None),
+            Ninhada.data_previsao_parto >= hoje - timedelta(days=PARTO_ATRASADO_DIAS),
+        ).all()
+        for ninhada_id, matriz_id, previsao in partos:
+            eventos.append({
+                'tipo': 'parto_previsto',
+                'data_inicio': previsao,
+                'data_fim': previsao,
+                'animal_id': matriz_id,
+                'titulo': nomes.get(matriz_id),
+                'referencia_id': ninhada_id,
+                'detalhes': None,
+            })
+
+        # Sire availability: last mating and matings in the last 30 days per active sire
+        ultimo_cruzamento = func.max(Cruzamento.data_acasalamento)
+        recentes = func.count(Cruzamento.id).filter(Cruzamento.data_acasalamento >= hoje - timedelta(days=30))
+        sires = Reprodutor.__table__
+        reprodutores = db.session.query(Animal.id, ultimo_cruzamento, recentes).join(
+            sires, sires.c.id == Animal.id
+        ).outerjoin(
+            ca, ca.c.animal_id == Animal.id
+        ).outerjoin(
+            Cruzamento, Cruzamento.id == ca.c.cruzamento_id
+        ).filter(
+            Animal.tenant_id == tenant_id,
+            Animal.ativo.is_(True),
+            sires.c.ativo_reprodutivo.isnot(False),
+        ).group_by(Animal.id).all()
+        for reprodutor_id, ultimo, qtd_recentes in reprodutores:
+            disponivel = hoje if ultimo is None else max(hoje, ultimo + timedelta(days=DESCANSO_REPRODUTOR_DIAS))
+            eventos.append({
+                'tipo': 'reprodutor_disponivel',
+                'data_inicio': disponivel,
+                'data_fim': None,
+                'animal_id': reprodutor_id,
+                'titulo': nomes.get(reprodutor_id),
+                'referencia_id': None,
+                'detalhes': {
+                    'ultimo_cruzamento': ultimo.isoformat() if ultimo else None,
+                    'cruzamentos_30_dias': int(qtd_recentes or 0),
+                },
+            })
+
+        db.session.execute(delete(EventoCalendario).where(EventoCalendario.tenant_id == tenant_id))
+        if eventos:
+            for evento in eventos:
+                evento.update(tenant_id=tenant_id, gerado_em=gerado_em)
+            db.session.execute(insert(EventoCalendario), eventos)
+        return len(eventos)
+
+
+def schedule_calendar_refresh(tenant_id):
+    """Queues a background rebuild of the tenant's calendar after breeding data changed."""
+    try:
+        from app.tasks import refresh_breeding_calendar
+        refresh_breeding_calendar.delay(tenant_id)
+    except Exception as e:
+        # The nightly rebuild still picks the change up
+        current_app.logger.error(f"Could not queue breeding calendar refresh for tenant {tenant_id}: {e}")
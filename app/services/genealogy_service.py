@@ -1,32 +1,129 @@
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import literal, or_, select
+
 from app import db
 from app.models.animal import Animal
-from app.models.breeding import ArvoreGenealogica
+from app.models.breeding import (
+    ArvoreGenealogica, Cruzamento, CONSANGUINIDADE_CALCULADA, CONSANGUINIDADE_INDISPONIVEL
+)
 from collections import deque # Import deque for breadth-first traversal example
 
+# Generations of ancestors considered for kinship; older ones count as unrelated founders
+PEDIGREE_MAX_GENERATIONS = 10
+
+
 class GenealogyService:
+    def load_pedigree(self, animal_ids, max_generations: int = PEDIGREE_MAX_GENERATIONS) -> dict:
+        """
+        Parents of the given animals and of their ancestors up to
+        `max_generations` back: animal id -> (mother_id, father_id).
+        Fetched with one recursive query instead of one query per ancestor.
+        """
+        animais = Animal.__table__
+        ids = [animal_id for animal_id in animal_ids if animal_id is not None]
+        if not ids:
+            return {}
+
+        pedigree = select(
+            animais.c.id, animais.c.mother_id, animais.c.father_id, literal(0).label('geracao')
+        ).where(animais.c.id.in_(ids)).cte('pedigree', recursive=True)
+        pedigree = pedigree.union(
+            select(
+                animais.c.id, animais.c.mother_id, animais.c.father_id, (pedigree.c.geracao + 1)
+            ).join(
+                pedigree, or_(animais.c.id == pedigree.c.mother_id, animais.c.id == pedigree.c.father_id)
+            ).where(pedigree.c.geracao < max_generations)
+        )
+
+        rows = db.session.execute(select(pedigree.c.id, pedigree.c.mother_id, pedigree.c.father_id)).all()
+        return {row.id: (row.mother_id, row.father_id) for row in rows}
+
+    def kinship(self, pedigree: dict, animal1_id, animal2_id) -> float:
+        """
+        Coefficient of kinship (coancestry) of two animals: the probability
+        that alleles drawn at random from each are identical by descent. It
+        equals the inbreeding coefficient of their offspring.
+
+        Uses the recursive (tabular) method on `pedigree` as returned by
+        load_pedigree; ancestors beyond it are treated as unrelated founders.
+        """
+        generation = {}
+
+        def depth(animal_id):
+            # Orders animals so that every parent comes before its offspring
+            if animal_id not in generation:
+                generation[animal_id] = 0
+                parents = [p for p in pedigree.get(animal_id, ()) if p in pedigree]
+                generation[animal_id] = 1 + max((depth(p) for p in parents), default=-1)
+            return generation[animal_id]
+
+        def parents(animal_id):
+            mother_id, father_id = pedigree.get(animal_id, (None, None))
+            return (mother_id if mother_id in pedigree else None,
+                    father_id if father_id in pedigree else None)
+
+        memo = {}
+
+        def coancestry(a, b):
+            if a is None or b is None:
+                return 0.0
+            key = (a, b) if a <= b else (b, a)
+            if key in memo:
+                return memo[key]
+            if a == b:
+                value = 0.5 * (1.0 + coancestry(*parents(a)))
+            else:
+                # Expand the younger animal, which cannot be an ancestor of the other
+                if depth(a) < depth(b):
+                    a, b = b, a
+                mother_id, father_id = parents(a)
+                value = 0.5 * (coancestry(mother_id, b) + coancestry(father_id, b))
+            memo[key] = value
+            return value
+
+        if animal1_id not in pedigree or animal2_id not in pedigree:
+            return 0.0
+        return coancestry(animal1_id, animal2_id)
+
+    def offspring_inbreeding_coefficient(self, mother_id: int, father_id: int) -> float:
+        """Expected inbreeding coefficient of a litter of the given dam and sire."""
+        pedigree = self.load_pedigree([mother_id, father_id])
+        return self.kinship(pedigree, mother_id, father_id)
+
     def calculate_inbreeding_coefficient(self, animal_id: int) -> float:
         """
-        Calculates the inbreeding coefficient for a given animal.
-        This requires traversing the animal's pedigree tree to identify common ancestors
-        and applying Wright's coefficient of inbreeding formula or a similar algorithm.
-        Will need to interact with Animal model relationships (mother, father).
-        Returns the inbreeding coefficient as a float.
+        Calculates the inbreeding coefficient for a given animal (Wright's F),
+        i.e. the kinship of its parents. Returns 0.0 when the animal is not
+        found or a parent is unknown.
         """
         animal = Animal.query.get(animal_id)
-        if not animal:
-            # Handle case where animal is not found
-            print(f"Animal with ID {animal_id} not found.")
-            return 0.0 # Or raise an error
+        if not animal or not animal.mother_id or not animal.father_id:
+            return 0.0
+        return self.offspring_inbreeding_coefficient(animal.mother_id, animal.father_id)
 
-        # TODO: Implement a proper inbreeding calculation algorithm (e.g., Wright's)
-        # This basic implementation is just a placeholder and does not calculate correctly.
-        print(f"Calculating (placeholder) inbreeding coefficient for Animal ID: {animal_id}")
-        # A proper implementation involves finding all paths to common ancestors and applying a formula.
-        # Example of a highly simplified check (not accurate):
-        # if animal.mother and animal.father and animal.mother.id == animal.father.id: # This checks if parents are the same animal, which is biologically impossible for different sexes
-        #    return 0.25 # Example value - incorrect logic
+    def calculate_cruzamento_inbreeding(self, cruzamento_id: int):
+        """
+        Stores the expected offspring inbreeding coefficient on a crossing.
+        The row is locked while computing, so overlapping runs after quick
+        successive edits apply in order. Does not commit.
+        """
+        cruzamento = Cruzamento.query.filter_by(id=cruzamento_id).with_for_update().first()
+        if cruzamento is None:
+            return None
 
-        return 0.0 # Placeholder return value
+        matriz, reprodutor = cruzamento.matriz_e_reprodutor()
+        if matriz is None or reprodutor is None:
+            cruzamento.coeficiente_consanguinidade = None
+            cruzamento.status_consanguinidade = CONSANGUINIDADE_INDISPONIVEL
+        else:
+            cruzamento.coeficiente_consanguinidade = round(
+                self.offspring_inbreeding_coefficient(matriz.id, reprodutor.id), 6
+            )
+            cruzamento.status_consanguinidade = CONSANGUINIDADE_CALCULADA
+        cruzamento.consanguinidade_calculada_em = datetime.utcnow()
+        return cruzamento
 
     def generate_pedigree_tree(self, animal_id: int, depth: int = 3) -> dict:
         """
@@ -142,6 +239,17 @@ class GenealogyService:
         # Return a list of dictionaries with id and name for common ancestors
         return [{"id": ancestor.id, "nome": ancestor.nome} for ancestor in common_ancestors]
 
+
+def schedule_inbreeding_calculation(cruzamento_id):
+    """Queues the background inbreeding calculation of a crossing."""
+    try:
+        from app.tasks import calculate_cruzamento_inbreeding
+        calculate_cruzamento_inbreeding.delay(cruzamento_id)
+    except Exception as e:
+        # The crossing stays 'pendente' and the periodic sweep picks it up
+        current_app.logger.error(f"Could not queue inbreeding calculation for cruzamento {cruzamento_id}: {e}")
+
+
 # Helper functions for genealogical traversal might be needed internally or in utils
 # def get_all_ancestors(animal, ancestors=None):
 #     if ancestors is None:
@@ -150,4 +258,5 @@ class GenealogyService:
 #         ancestors.add(animal) # Add the current animal
 #         get_all_ancestors(animal.mother, ancestors)
 #         get_all_ancestors(animal.father, ancestors)
-#     return ancestors
\ No newline at end of file
+#     return ancestors
+
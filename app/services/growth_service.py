@@ -0,0 +1,282 @@
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from app import db
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Groups with fewer measurements than this get no percentile (too noisy)
+MIN_GROUP_SIZE = 5
+
+# A puppy is flagged when below this breed percentile for its age...
+UNDERWEIGHT_PERCENTILE = 10.0
+# ...or below this fraction of its litter mates' median weight
+UNDERWEIGHT_LITTER_RATIO = 0.85
+
+NO_GROUP = -1
+
+
+class GrowthSeries(NamedTuple):
+    """Column arrays of RegistroEvolucao measurements, one entry per record."""
+    animal_id: np.ndarray
+    raca_id: np.ndarray      # NO_GROUP when the animal has no breed
+    ninhada_id: np.ndarray   # NO_GROUP when the animal is not a puppy of a litter
+    semana: np.ndarray       # Age in whole weeks on the record date
+    data: np.ndarray         # datetime64[D]
+    peso: np.ndarray         # float, NaN when not measured
+    altura: np.ndarray
+
+    def __len__(self):
+        return len(self.animal_id)
+
+    def take(self, mask) -> 'GrowthSeries':
+        return GrowthSeries(*(column[mask] for column in self))
+
+
+class GroupStats(NamedTuple):
+    """Per-measurement statistics relative to the measurement's group."""
+    group: np.ndarray        # Group index of each measurement
+    counts: np.ndarray       # Measurements per group
+    bands: np.ndarray        # (groups, len(PERCENTILES)) percentile values
+    rank: np.ndarray         # Percentile rank (0-100) of each measurement in its group
+
+
+def group_percentiles(group_keys: np.ndarray, values: np.ndarray, percentiles=PERCENTILES) -> GroupStats:
+    """
+    Percentile bands and per-value percentile ranks for every group at once.
+
+    `group_keys` is an (n,) or (n, k) integer array; `values` must not hold NaN.
+    One lexsort orders all values by group; band positions are then
+    interpolated from each group's start offset and size, so the cost is
+    O(n log n) regardless of the number of groups.
+    """
+    n = len(values)
+    if n == 0:
+        return GroupStats(np.zeros(0, int), np.zeros(0, int), np.zeros((0, len(percentiles))), np.zeros(0))
+    keys = group_keys.reshape(n, -1)
+    _, group = np.unique(keys, axis=0, return_inverse=True)
+    group = group.reshape(-1)
+
+    order = np.lexsort((values, group))
+    sorted_group, sorted_values = group[order], values[order]
+    counts = np.bincount(group)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    # Linear interpolation between closest ranks (numpy's default method)
+    q = np.asarray(percentiles, dtype=float) / 100.0
+    position = starts[:, None] + q[None, :] * (counts[:, None] - 1)
+    lower = np.floor(position).astype(int)
+    upper = np.ceil(position).astype(int)
+    bands = sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+    # Mid-rank of ties: equal values in a group share one percentile rank
+    index = np.arange(n)
+    run_start = np.ones(n, dtype=bool)
+    run_start[1:] = (sorted_group[1:] != sorted_group[:-1]) | (sorted_values[1:] != sorted_values[:-1])
+    run_id = np.cumsum(run_start) - 1
+    first = index[run_start][run_id]
+    mid = first - starts[sorted_group] + (np.bincount(run_id)[run_id] - 1) / 2.0
+    size = counts[sorted_group]
+    sorted_rank = np.where(size > 1, mid / np.maximum(size - 1, 1) * 100.0, 50.0)
+
+    rank = np.empty(n)
+    rank[order] = sorted_rank
+    return GroupStats(group, counts, bands, rank)
+
+
+class GrowthAnalyticsService:
+    """
+    Growth curves from RegistroEvolucao: percentile bands per breed and age
+    (in weeks), litter comparisons and underweight detection. Measurements of
+    the whole tenant (or breed) are loaded with a single query and analysed
+    as NumPy arrays, so the cost does not depend on the number of animals.
+    """
+
+    def load_series(self, tenant_id: int, raca_id: Optional[int] = None) -> GrowthSeries:
+        from app.models.animal import Animal, Filhote
+        from app.models.media import RegistroEvolucao
+
+        filhotes = Filhote.__table__
+        query = db.session.query(
+            RegistroEvolucao.animal_id,
+            Animal.raca_id,
+            filhotes.c.ninhada_id,
+            Animal.data_nascimento,
+            RegistroEvolucao.data_registro,
+            RegistroEvolucao.peso,
+            RegistroEvolucao.altura,
+        ).join(
+            Animal, Animal.id == RegistroEvolucao.animal_id
+        ).outerjoin(
+            filhotes, filhotes.c.id == Animal.id
+        ).filter(
+            RegistroEvolucao.tenant_id == tenant_id,
+            Animal.tenant_id == tenant_id,
+            Animal.ativo.is_(True),
+            (RegistroEvolucao.peso.isnot(None)) | (RegistroEvolucao.altura.isnot(None)),
+        )
+        if raca_id is not None:
+            query = query.filter(Animal.raca_id == raca_id)
+
+        rows = query.all()
+        if not rows:
+            empty = np.zeros(0)
+            return GrowthSeries(empty.astype(int), empty.astype(int), empty.astype(int),
+                                empty.astype(int), empty.astype('datetime64[D]'), empty, empty)
+
+        animal_id, raca, ninhada, nascimento, data, peso, altura = zip(*rows)
+        data = np.array(data, dtype='datetime64[D]')
+        idade_dias = (data - np.array(nascimento, dtype='datetime64[D]')).astype(int)
+        series = GrowthSeries(
+            animal_id=np.array(animal_id, dtype=int),
+            raca_id=np.array([NO_GROUP if r is None else r for r in raca], dtype=int),
+            ninhada_id=np.array([NO_GROUP if n is None else n for n in ninhada], dtype=int),
+            semana=idade_dias // 7,
+            data=data,
+            peso=np.array(peso, dtype=float),
+            altura=np.array(altura, dtype=float),
+        )
+        # Records dated before birth are data-entry errors
+        return series.take(idade_dias >= 0)
+
+    def breed_stats(self, series: GrowthSeries, metrica: str = 'peso'):
+        """
+        Percentile stats of `metrica` grouped by (breed, age week), for the
+        measurements that have the metric. Returns (mask, GroupStats).
+        """
+        values = getattr(series, metrica)
+        mask = ~np.isnan(values)
+        keys = np.column_stack((series.raca_id[mask], series.semana[mask]))
+        return mask, group_percentiles(keys, values[mask])
+
+    def litter_ratio(self, series: GrowthSeries, metrica: str = 'peso') -> np.ndarray:
+        """
+        Each measurement divided by the median of its litter at the same age
+        week. NaN for animals without a litter or without litter mates measured.
+        """
+        values = getattr(series, metrica)
+        ratio = np.full(len(series), np.nan)
+        mask = ~np.isnan(values) & (series.ninhada_id != NO_GROUP)
+        if not mask.any():
+            return ratio
+
+        keys = np.column_stack((series.ninhada_id[mask], series.semana[mask]))
+        stats = group_percentiles(keys, values[mask], percentiles=(50,))
+        median = stats.bands[stats.group, 0]
+        has_mates = stats.counts[stats.group] > 1
+        ratio[np.flatnonzero(mask)] = np.where(has_mates & (median > 0), values[mask] / median, np.nan)
+        return ratio
+
+    def growth_curves(self, tenant_id: int, raca_id: Optional[int] = None, metrica: str = 'peso') -> list:
+        """
+        Percentile bands per breed and age week, with the number of Tukey
+        outliers (beyond 1.5 IQR from the quartiles) in each band.
+        """
+        series = self.load_series(tenant_id, raca_id)
+        mask, stats = self.breed_stats(series, metrica)
+        if not len(stats.counts):
+            return []
+
+        values = getattr(series, metrica)[mask]
+        p25, p75 = stats.bands[:, 1], stats.bands[:, 3]
+        iqr = p75 - p25
+        outlier = (values < (p25 - 1.5 * iqr)[stats.group]) | (values > (p75 + 1.5 * iqr)[stats.group])
+        outliers = np.bincount(stats.group, weights=outlier, minlength=len(stats.counts)).astype(int)
+
+        # First member of each group gives the group's (breed, week)
+        first = np.full(len(stats.counts), -1)
+        first[stats.group[::-1]] = np.arange(len(stats.group))[::-1]
+        raca = series.raca_id[mask][first]
+        semana = series.semana[mask][first]
+
+        curves = []
+        for g in np.lexsort((semana, raca)):
+            band = {f'p{p}': round(float(v), 2) for p, v in zip(PERCENTILES, stats.bands[g])}
+            curves.append({
+                'raca_id': None if raca[g] == NO_GROUP else int(raca[g]),
+                'semana': int(semana[g]),
+                'amostras': int(stats.counts[g]),
+                'outliers': int(outliers[g]),
+                **(band if stats.counts[g] >= MIN_GROUP_SIZE else {f'p{p}': None for p in PERCENTILES}),
+            })
+        return curves
+
+    def animal_growth(self, tenant_id: int, animal_id: int, raca_id: Optional[int]) -> list:
+        """
+        The animal's measurements, each with its percentile among animals of
+        the same breed and age week and its ratio to the litter median.
+        """
+        series = self.load_series(tenant_id, raca_id)
+        if raca_id is None:
+            series = series.take(series.raca_id == NO_GROUP)
+
+        ranks = {}
+        for metrica in ('peso', 'altura'):
+            mask, stats = self.breed_stats(series, metrica)
+            rank = np.full(len(series), np.nan)
+            rank[np.flatnonzero(mask)] = np.where(stats.counts[stats.group] >= MIN_GROUP_SIZE, stats.rank, np.nan)
+            ranks[metrica] = rank
+        ratio = self.litter_ratio(series)
+
+        own = np.flatnonzero(series.animal_id == animal_id)
+        own = own[np.argsort(series.data[own], kind='stable')]
+        return [
+            {
+                'data': str(series.data[i]),
+                'semana': int(series.semana[i]),
+                'peso': _number(series.peso[i]),
+                'altura': _number(series.altura[i]),
+                'percentil_peso': _number(ranks['peso'][i], 1),
+                'percentil_altura': _number(ranks['altura'][i], 1),
+                'razao_ninhada': _number(ratio[i], 3),
+            }
+            for i in own
+        ]
+
+    def underweight_puppies(self, tenant_id: int, raca_id: Optional[int] = None,
+                            percentil: float = UNDERWEIGHT_PERCENTILE,
+                            razao_ninhada: float = UNDERWEIGHT_LITTER_RATIO) -> list:
+        """
+        Puppies whose latest weighing is below `percentil` for their breed and
+        age, or below `razao_ninhada` times their litter mates' median weight.
+        Percentiles use every weighing of the tenant's animals as reference.
+        """
+        series = self.load_series(tenant_id, raca_id)
+        mask, stats = self.breed_stats(series, 'peso')
+        rank = np.full(len(series), np.nan)
+        rank[np.flatnonzero(mask)] = np.where(stats.counts[stats.group] >= MIN_GROUP_SIZE, stats.rank, np.nan)
+        ratio = self.litter_ratio(series)
+
+        # Latest weighing of each puppy (last index per animal after sorting by date)
+        candidates = np.flatnonzero(mask & (series.ninhada_id != NO_GROUP))
+        if not len(candidates):
+            return []
+        candidates = candidates[np.lexsort((series.data[candidates], series.animal_id[candidates]))]
+        animal_ids = series.animal_id[candidates]
+        is_last = np.ones(len(candidates), dtype=bool)
+        is_last[:-1] = animal_ids[1:] != animal_ids[:-1]
+        latest = candidates[is_last]
+
+        below_breed = rank[latest] < percentil
+        below_litter = ratio[latest] < razao_ninhada
+        flagged = latest[below_breed | below_litter]
+        flagged = flagged[np.lexsort((ratio[flagged], rank[flagged]))]
+
+        return [
+            {
+                'animal_id': int(series.animal_id[i]),
+                'ninhada_id': int(series.ninhada_id[i]),
+                'raca_id': None if series.raca_id[i] == NO_GROUP else int(series.raca_id[i]),
+                'data': str(series.data[i]),
+                'semana': int(series.semana[i]),
+                'peso': _number(series.peso[i]),
+                'percentil_peso': _number(rank[i], 1),
+                'razao_ninhada': _number(ratio[i], 3),
+            }
+            for i in flagged
+        ]
+
+
+def _number(value, digits=2):
+    return None if np.isnan(value) else round(float(value), digits)
@@ -0,0 +1,151 @@
+"""
+Resized, re-encoded copies ("variants") of animal photos, so list and
+gallery screens fetch a few kilobytes instead of the original. Variants are
+generated in the background after upload (app.tasks.generate_image_variants)
+and stored next to the original; ImagemAnimal.variantes records them.
+"""
+
+import io
+import os
+
+from flask import current_app
+
+from app import db
+from app.models.media import (
+    ImagemAnimal, VARIANTES_INDISPONIVEL, VARIANTES_PENDENTE, VARIANTES_PRONTAS
+)
+from app.services.storage_service import get_storage_backend
+
+# Variant name -> longest side (pixels) and JPEG quality
+IMAGE_VARIANTS = {
+    'thumb': {'lado': 256, 'qualidade': 70},
+    'medium': {'lado': 1024, 'qualidade': 80},
+    'web': {'lado': 2048, 'qualidade': 85},
+}
+VARIANT_MIME_TYPE = 'image/jpeg'
+
+# Originals above this size are not processed (the worker holds them in memory)
+DEFAULT_VARIANT_MAX_SOURCE_SIZE = 50 * 1024 * 1024
+
+
+def variant_path(caminho: str, nome: str) -> str:
+    """Path of a variant next to its original: /animals/1/abc_foto.png -> /animals/1/abc_foto.thumb.jpg"""
+    base, _ = os.path.splitext(caminho)
+    return f'{base}.{nome}.jpg'
+
+
+def render_variants(content: bytes, variants=IMAGE_VARIANTS) -> dict:
+    """
+    Decodes the image once and returns variant name -> (JPEG bytes, width,
+    height). Variants are produced largest first, each downscaled from the
+    previous one; EXIF orientation is applied and metadata dropped. Raises
+    ValueError when the content is not a readable image.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError  # Only workers need Pillow
+
+    largest = max(spec['lado'] for spec in variants.values())
+    try:
+        image = Image.open(io.BytesIO(content))
+        # JPEGs are decoded directly at a reduced scale (1/2 to 1/8) when large
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise ValueError(f'Not a readable image: {e}') from e
+
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        rgba = image.convert('RGBA')
+        flattened = Image.new('RGB', rgba.size, (255, 255, 255))
+        flattened.paste(rgba, mask=rgba.getchannel('A'))
+        image = flattened
+    elif image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    rendered = {}
+    for nome, spec in sorted(variants.items(), key=lambda item: -item[1]['lado']):
+        image.thumbnail((spec['lado'], spec['lado']), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, 'JPEG', quality=spec['qualidade'], optimize=True, progressive=True)
+        rendered[nome] = (out.getvalue(), image.width, image.height)
+    return rendered
+
+
+class ImageVariantService:
+
+    def generate(self, arquivo_id: int):
+        """
+        Creates the variants of one photo and records them on it. Photos of
+        deduplicated content reuse the variants of another photo with the
+        same stored object. Returns the ImagemAnimal, or None if it is gone.
+        """
+        imagem = db.session.get(ImagemAnimal, arquivo_id)
+        if imagem is None:
+            return None
+
+        if imagem.objeto_id is not None:
+            pronta = ImagemAnimal.query.filter(
+                ImagemAnimal.objeto_id == imagem.objeto_id,
+                ImagemAnimal.id != imagem.id,
+                ImagemAnimal.status_variantes == VARIANTES_PRONTAS,
+            ).first()
+            if pronta is not None:
+                imagem.variantes = pronta.variantes
+                imagem.status_variantes = VARIANTES_PRONTAS
+                return imagem
+
+        max_size = current_app.config.get('MEDIA_VARIANT_MAX_SOURCE_SIZE', DEFAULT_VARIANT_MAX_SOURCE_SIZE)
+        if imagem.tamanho and imagem.tamanho > max_size:
+            imagem.status_variantes = VARIANTES_INDISPONIVEL
+            return imagem
+
+        storage = get_storage_backend()
+        try:
+            rendered = render_variants(storage.download_file(imagem.tenant_id, imagem.caminho))
+        except ValueError as e:
+            current_app.logger.info(f"No variants for file {imagem.id}: {e}")
+            imagem.status_variantes = VARIANTES_INDISPONIVEL
+            return imagem
+
+        variantes = {}
+        for nome, (content, largura, altura) in rendered.items():
+            caminho = variant_path(imagem.caminho, nome)
+            _, tamanho, content_hash = storage.upload_stream(imagem.tenant_id, io.BytesIO(content), caminho)
+            variantes[nome] = {
+                'caminho': caminho,
+                'largura': largura,
+                'altura': altura,
+                'tamanho': tamanho,
+                'hash': content_hash,
+                'mime_type': VARIANT_MIME_TYPE,
+            }
+        imagem.variantes = variantes
+        imagem.status_variantes = VARIANTES_PRONTAS
+        return imagem
+
+    def pending_ids(self, limit: int, older_than):
+        """Photos uploaded before `older_than` still waiting for variants (queueing may have failed)."""
+        return [
+            row.id for row in db.session.query(ImagemAnimal.id).filter(
+                ImagemAnimal.status_variantes == VARIANTES_PENDENTE,
+                ImagemAnimal.data_upload < older_than,
+            ).order_by(ImagemAnimal.id).limit(limit)
+        ]
+
+
+def variant_paths(caminho: str) -> list:
+    """
+    Paths every variant of a stored original may have (to delete them with
+    it). Derived from the path rather than from one row's `variantes`, since
+    deduplicated photos share the original and so its variants.
+    """
+    return [variant_path(caminho, nome) for nome in IMAGE_VARIANTS]
+
+
+def schedule_variant_generation(arquivo_id):
+    """Queues the background variant generation of a photo."""
+    try:
+        from app.tasks import generate_image_variants
+        generate_image_variants.delay(arquivo_id)
+    except Exception as e:
+        # The photo stays 'pendente' and the periodic sweep picks it up
+        current_app.logger.error(f"Could not queue image variants for file {arquivo_id}: {e}")
@@ -0,0 +1,76 @@
+"""
+Content-addressed media storage: each tenant stores a given content once
+(ObjetoArmazenado, keyed by content hash) and every Arquivo with that
+content points at it. Reference counts are changed with single UPDATE/INSERT
+statements, so concurrent uploads and deletes of the same content cannot
+create two objects or delete one still in use.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app import db
+from app.models.media import ObjetoArmazenado
+
+
+class MediaObjectService:
+
+    def attach(self, tenant_id: int, content_hash: str, tamanho: int, caminho: str):
+        """
+        Registers content just written to storage at `caminho` and takes a
+        reference to it. Returns (objeto_id, caminho_objeto, duplicado): when
+        the tenant already had the content, the existing object is used and
+        the caller deletes its own copy once the transaction commits.
+        """
+        stmt = insert(ObjetoArmazenado).values(
+            tenant_id=tenant_id,
+            hash=content_hash,
+            tamanho=tamanho,
+            caminho=caminho,
+            referencias=1,
+            criado_em=datetime.utcnow(),
+        ).on_conflict_do_update(
+            constraint='uq_objetos_armazenados_tenant_hash',
+            set_={'referencias': ObjetoArmazenado.referencias + 1},
+        ).returning(ObjetoArmazenado.id, ObjetoArmazenado.caminho)
+        row = db.session.execute(stmt).one()
+        return row.id, row.caminho, row.caminho != caminho
+
+    def reference(self, tenant_id: int, content_hash: str, tamanho: int):
+        """
+        Takes a reference to stored content the tenant already has, so a
+        duplicate does not need to be uploaded at all. The size must match
+        too. Returns (objeto_id, caminho) or None when the content is new.
+        """
+        row = db.session.execute(
+            update(ObjetoArmazenado).where(
+                ObjetoArmazenado.tenant_id == tenant_id,
+                ObjetoArmazenado.hash == content_hash,
+                ObjetoArmazenado.tamanho == tamanho,
+                ObjetoArmazenado.referencias > 0,
+            ).values(referencias=ObjetoArmazenado.referencias + 1)
+            .returning(ObjetoArmazenado.id, ObjetoArmazenado.caminho)
+        ).first()
+        return None if row is None else (row.id, row.caminho)
+
+    def release(self, objeto_id: int):
+        """
+        Drops one reference. Returns the path of the stored file when this was
+        the last one (the object row is deleted; the caller deletes the file
+        after committing), otherwise None. Arquivos pointing at the object
+        must be flushed away before the last release.
+        """
+        row = db.session.execute(
+            update(ObjetoArmazenado).where(ObjetoArmazenado.id == objeto_id)
+            .values(referencias=ObjetoArmazenado.referencias - 1)
+            .returning(ObjetoArmazenado.referencias)
+        ).first()
+        if row is None or row.referencias > 0:
+            return None
+        deleted = db.session.execute(
+            delete(ObjetoArmazenado).where(ObjetoArmazenado.id == objeto_id, ObjetoArmazenado.referencias <= 0)
+            .returning(ObjetoArmazenado.caminho)
+        ).first()
+        return None if deleted is None else deleted.caminho
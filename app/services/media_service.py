@@ -1,15 +1,74 @@
 import dropbox
 import os
+import threading
+
 import requests
 from flask import current_app
 
+from app.services.storage_service import (  # noqa: F401 (re-exported)
+    DEFAULT_UPLOAD_CHUNK_SIZE, DOWNLOAD_CHUNK_SIZE, DROPBOX_BLOCK_SIZE, DropboxContentHasher, StorageBackend,
+    read_chunk, upload_chunk_size
+)
+
 # Assuming Dropbox API credentials are in Flask app config
 
-class DropboxService:
+DEFAULT_DROPBOX_TIMEOUT = 60
+DEFAULT_DROPBOX_MAX_CONNECTIONS = 8
+
+# Process-wide SDK clients, one per (token, timeout, pool size): every
+# request reuses the same pooled HTTP session instead of opening new
+# connections. Created lazily, so forked workers build their own.
+_dropbox_clients = {}
+_dropbox_clients_lock = threading.Lock()
+
+
+def get_dropbox_client(config=None) -> dropbox.Dropbox:
+    """Shared Dropbox client for the access token in `config` (default: the current app's)."""
+    config = config if config is not None else current_app.config
+    key = (
+        config.get('DROPBOX_ACCESS_TOKEN'),
+        config.get('DROPBOX_TIMEOUT', DEFAULT_DROPBOX_TIMEOUT),
+        config.get('DROPBOX_MAX_CONNECTIONS', DEFAULT_DROPBOX_MAX_CONNECTIONS),
+    )
+    client = _dropbox_clients.get(key)
+    if client is None:
+        with _dropbox_clients_lock:
+            client = _dropbox_clients.get(key)
+            if client is None:
+                token, timeout, max_connections = key
+                client = dropbox.Dropbox(
+                    token,
+                    session=dropbox.create_session(max_connections=max_connections),
+                    timeout=timeout,
+                )
+                _dropbox_clients[key] = client
+    return client
+
+
+def _iter_response(res):
+    try:
+        yield from res.iter_content(DOWNLOAD_CHUNK_SIZE)
+    finally:
+        res.close()
+
+
+def _not_found(e: dropbox.exceptions.ApiError, full_path: str):
+    """
+    The FileNotFoundError a files_download path/not_found error stands for
+    (None for any other error), so a missing file is a 404 on every backend.
+    """
+    error = e.error
+    if isinstance(error, dropbox.files.DownloadError) and error.is_path() and error.get_path().is_not_found():
+        return FileNotFoundError(f'No such file in Dropbox: {full_path}')
+    return None
+
+
+class DropboxService(StorageBackend):
+    name = 'dropbox'
+
     def __init__(self):
-        # Initialize Dropbox client (will need to handle different auth flows later)
-        # For now, assuming a long-lived access token is available in config
-        self.dbx = dropbox.Dropbox(current_app.config.get('DROPBOX_ACCESS_TOKEN'))
+        # Long-lived access token from config; the client is shared process-wide
+        self.dbx = get_dropbox_client()
         self.root_path = current_app.config.get('DROPBOX_ROOT_PATH', '')
 
     def upload_file(self, tenant_id: int, file_content, destination_path):
@@ -36,6 +95,60 @@ class DropboxService:
             current_app.logger.error(f"An unexpected error occurred during Dropbox upload for tenant {tenant_id}: {e}")
             raise
 
+    def _full_path(self, tenant_id: int, file_path: str) -> str:
+        if not file_path.startswith('/'):
+            file_path = '/' + file_path
+        return self.root_path + f'/{tenant_id}' + file_path
+
+    def upload_stream(self, tenant_id: int, stream, destination_path, chunk_size: int = None):
+        """
+        Uploads a file-like object chunk by chunk, so memory use is bounded by
+        the chunk size. Files that fit in one chunk take a single files_upload
+        call; larger ones go through an upload session. Size and Dropbox
+        content hash are computed on the way. Returns (metadata, size, hash).
+        """
+        chunk_size = chunk_size or upload_chunk_size()
+        full_path = self._full_path(tenant_id, destination_path)
+        hasher = DropboxContentHasher()
+        try:
+            chunk = read_chunk(stream, chunk_size)
+            hasher.update(chunk)
+            if len(chunk) < chunk_size:
+                metadata = self.dbx.files_upload(chunk, full_path, mode=dropbox.files.WriteMode('overwrite'))
+                return metadata, hasher.size, hasher.hexdigest()
+
+            session_id = self.start_upload_session(tenant_id, chunk)
+            while True:
+                chunk = read_chunk(stream, chunk_size)
+                if len(chunk) < chunk_size:
+                    break
+                self.append_upload_session(tenant_id, session_id, hasher.size, chunk)
+                hasher.update(chunk)
+            offset = hasher.size
+            hasher.update(chunk)
+            metadata = self.finish_upload_session(tenant_id, session_id, offset, chunk, destination_path)
+            return metadata, hasher.size, hasher.hexdigest()
+        except dropbox.exceptions.ApiError as e:
+            current_app.logger.error(f"Error streaming upload to Dropbox for tenant {tenant_id}: {e}")
+            raise
+
+    def start_upload_session(self, tenant_id: int, data=b'') -> str:
+        """Opens a Dropbox upload session with its first bytes; returns the session id."""
+        return self.dbx.files_upload_session_start(data, close=False).session_id
+
+    def append_upload_session(self, tenant_id: int, session_id: str, offset: int, data):
+        """Appends `data` at `offset` (bytes already in the session)."""
+        cursor = dropbox.files.UploadSessionCursor(session_id=session_id, offset=offset)
+        self.dbx.files_upload_session_append_v2(data, cursor, close=False)
+
+    def finish_upload_session(self, tenant_id: int, session_id: str, offset: int, data, destination_path):
+        """Appends the last bytes and commits the session to the tenant's destination path."""
+        cursor = dropbox.files.UploadSessionCursor(session_id=session_id, offset=offset)
+        commit = dropbox.files.CommitInfo(
+            path=self._full_path(tenant_id, destination_path), mode=dropbox.files.WriteMode('overwrite')
+        )
+        return self.dbx.files_upload_session_finish(data, cursor, commit)
+
     def download_file(self, tenant_id: int, file_path):
         """Download a file from Dropbox for a specific tenant. file_path should be the full path within the tenant's folder."""
         # Prepend tenant_id to the path
@@ -45,6 +158,9 @@ class DropboxService:
             metadata, res = self.dbx.files_download(full_path)
             return res.content # Return the raw byte content of the file
         except dropbox.exceptions.ApiError as e:
+            missing = _not_found(e, full_path)
+            if missing is not None:
+                raise missing from e
             current_app.logger.error(f"Error downloading file from Dropbox for tenant {tenant_id}: {e}")
             # Re-raise the exception after logging
             raise
@@ -52,6 +168,27 @@ class DropboxService:
             current_app.logger.error(f"An unexpected error occurred during Dropbox download for tenant {tenant_id}: {e}")
             raise
 
+    def open_stream(self, tenant_id: int, file_path, start: int = 0, stop: int = None):
+        """
+        Streams the file from files_download without buffering it. Partial
+        reads send an HTTP Range header through a clone of the shared client
+        (same connection pool).
+        """
+        dbx = self.dbx
+        if start or stop is not None:
+            byte_range = f"bytes={start}-{'' if stop is None else stop - 1}"
+            dbx = self.dbx.clone(headers={'Range': byte_range})
+        full_path = self._full_path(tenant_id, file_path)
+        try:
+            metadata, res = dbx.files_download(full_path)
+        except dropbox.exceptions.ApiError as e:
+            missing = _not_found(e, full_path)
+            if missing is not None:
+                raise missing from e
+            current_app.logger.error(f"Error opening Dropbox download for tenant {tenant_id}: {e}")
+            raise
+        return _iter_response(res)
+
     def delete_file(self, tenant_id: int, file_path):
         """Delete a file from Dropbox for a specific tenant. file_path should be the full path within the tenant's folder."""
         # Prepend tenant_id to the path
@@ -61,6 +198,11 @@ class DropboxService:
             res = self.dbx.files_delete_v2(full_path)
             return res # Returns metadata of the deleted file
         except dropbox.exceptions.ApiError as e:
+            error = e.error
+            if isinstance(error, dropbox.files.DeleteError) and error.is_path_lookup() \
+                    and error.get_path_lookup().is_not_found():
+                current_app.logger.warning(f"File {file_path} of tenant {tenant_id} was already gone from Dropbox")
+                return None
             current_app.logger.error(f"Error deleting file from Dropbox for tenant {tenant_id}: {e}")
             # Re-raise the exception after logging
             raise
@@ -68,30 +210,30 @@ class DropboxService:
             current_app.logger.error(f"An unexpected error occurred during Dropbox deletion for tenant {tenant_id}: {e}")
             raise
 
+    def get_temporary_link(self, tenant_id: int, file_path):
+        """Direct download link valid for four hours (files_get_temporary_link)."""
+        try:
+            return self.dbx.files_get_temporary_link(self._full_path(tenant_id, file_path)).link
+        except dropbox.exceptions.ApiError as e:
+            current_app.logger.error(f"Error getting temporary link from Dropbox for tenant {tenant_id}: {e}")
+            raise
+
     def get_shareable_link(self, tenant_id: int, file_path):
         """Get a shareable link for a file from Dropbox for a specific tenant. file_path should be the full path within the tenant's folder."""
-        # Prepend tenant_id to the path
-        tenant_file_path = f'/{tenant_id}' + file_path
-        full_path = self.root_path + tenant_file_path
+        full_path = self._full_path(tenant_id, file_path)
         try:
             # Check if a shared link already exists for this path
             try:
                 links = self.dbx.sharing_list_shared_links(path=full_path, direct_only=True).links
                 if links:
-                    # If link exists, return it. Adjust for direct download if needed.
-                    shareable_url = links[0].url
-                    # shareable_url = shareable_url.replace('www.dropbox.com', 'dl.dropboxusercontent.com').replace('?dl=0', '?dl=1') # Example adjustment
-                    return shareable_url
+                    return links[0].url
             except dropbox.exceptions.ApiError as e:
                 # If list_shared_links raises an error other than 'path_not_found', handle it
                 if not e.error.is_path() or not e.error.get_path().is_not_found():
                      raise # Re-raise unexpected API errors
 
             # If no link exists, create one
-            link = self.dbx.sharing_create_shared_link_with_settings(full_path)
-            shareable_url = link.url
-            # shareable_url = shareable_url.replace('www.dropbox.com', 'dl.dropboxusercontent.com').replace('?dl=0', '?dl=1') # Example adjustment
-            return shareable_url
+            return self._create_shared_link(full_path)
         except dropbox.exceptions.ApiError as e:
             current_app.logger.error(f"Error getting shareable link from Dropbox for tenant {tenant_id}: {e}")
             raise
@@ -99,6 +241,34 @@ class DropboxService:
             current_app.logger.error(f"An unexpected error occurred while getting Dropbox shareable link for tenant {tenant_id}: {e}")
             raise
 
+    def get_shareable_links(self, tenant_id: int, file_paths) -> dict:
+        """
+        Shareable links of several files (the ones whose cached link is
+        missing or stale). Each file costs a single create call: when the
+        file was shared before, Dropbox answers shared_link_already_exists
+        with the existing link, so nothing needs to be listed first.
+        """
+        links = {}
+        try:
+            for file_path in dict.fromkeys(file_paths):
+                links[file_path] = self._create_shared_link(self._full_path(tenant_id, file_path))
+            return links
+        except dropbox.exceptions.ApiError as e:
+            current_app.logger.error(f"Error getting shareable links from Dropbox for tenant {tenant_id}: {e}")
+            raise
+
+    def _create_shared_link(self, full_path):
+        try:
+            return self.dbx.sharing_create_shared_link_with_settings(full_path).url
+        except dropbox.exceptions.ApiError as e:
+            # Shared before: Dropbox returns the existing link with the error
+            error = e.error
+            if error.is_shared_link_already_exists():
+                existing = error.get_shared_link_already_exists()
+                if existing is not None and existing.is_metadata():
+                    return existing.get_metadata().url
+            raise
+
 # You would instantiate this service and use its methods in your resource or other service layers.
 # Example:\
 # dropbox_service = DropboxService()
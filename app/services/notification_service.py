@@ -1,9 +1,7 @@
 # app/services/notification_service.py
 
 # You might need to import necessary libraries for sending emails, SMS, etc.
-# Example for email:
-# from flask_mail import Mail, Message
-# from flask import current_app
+from flask import current_app
 
 # Example for Celery (if sending asynchronously):
 # from app.celery_worker import celery # Assuming your Celery instance is in app/celery_worker.py
@@ -15,11 +13,16 @@ class NotificationService:
         The actual sending mechanism (email, SMS, in-app, etc.) needs to be implemented here.
         
         Args:
-            recipient (str): The recipient's address (e.g., email address, phone number).
+            recipient (str | list): The recipient's address (e.g., email address, phone number),
+                or a list of email addresses sharing one message.
             subject (str): The subject of the notification (e.g., email subject).
             message (str): The body of the notification.
             notification_type (str, optional): The type of notification (e.g., 'email', 'sms', 'in-app'). Defaults to None.
         """
+        if notification_type == 'email' and current_app.config.get('MAIL_SERVER'):
+            self._send_email(recipient, subject, message)
+            return
+
         # Placeholder for notification sending logic
         # In a real application, this method would contain the actual code
         # to interface with email servers, SMS gateways, or in-app notification systems.
@@ -99,6 +102,21 @@ class NotificationService:
         # notification_type matches or if simulation is intended.
         pass
 
+    def _send_email(self, recipients, subject, message):
+        """Sends through Flask-Mail; errors propagate so Celery tasks can retry."""
+        from flask_mail import Mail, Message
+
+        mail = current_app.extensions.get('mail')
+        if mail is None:
+            mail = Mail(current_app)
+        if isinstance(recipients, str):
+            recipients = [recipients]
+        msg = Message(subject,
+                      sender=current_app.config.get('MAIL_DEFAULT_SENDER'),
+                      recipients=list(recipients))
+        msg.body = message
+        mail.send(msg)
+
 # Helper functions (might be needed depending on implementation)
 # def get_user_id_from_recipient(recipient):
 #     # Logic to find user ID based on recipient (e.g., email)
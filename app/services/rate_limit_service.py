@@ -0,0 +1,244 @@
+import math
+import time
+from threading import Lock
+from typing import List, NamedTuple, Optional, Tuple
+
+from flask import current_app
+
+
+class RateLimit(NamedTuple):
+    """Token bucket: refills `rate` tokens per second up to `burst` tokens."""
+    rate: float
+    burst: int
+
+
+class TenantLimits(NamedTuple):
+    tenant: RateLimit
+    route: RateLimit
+    max_concurrent: int
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    retry_after: float = 0.0
+
+
+def _parse_limits(config: dict) -> TenantLimits:
+    return TenantLimits(
+        tenant=RateLimit(float(config['rate']), int(config['burst'])),
+        route=RateLimit(float(config.get('route_rate', config['rate'])), int(config.get('route_burst', config['burst']))),
+        max_concurrent=int(config.get('max_concurrent', 0)),
+    )
+
+
+class MemoryRateLimitBackend:
+    """
+    In-process token buckets and concurrency counters.
+    Limits apply per worker process; use the Redis backend to share them.
+
+    A bucket that has refilled to its burst is the same as a missing one,
+    so buckets idle that long are swept out every `sweep_interval` seconds
+    (the Redis backend expires its keys the same way).
+    """
+
+    def __init__(self, sweep_interval: float = 60.0):
+        # key -> (tokens, updated, full_at)
+        self._buckets = {}
+        self._slots = {}
+        self._lock = Lock()
+        self._sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+
+    def _sweep(self, now: float):
+        self._buckets = {key: state for key, state in self._buckets.items() if state[2] > now}
+        self._next_sweep = now + self._sweep_interval
+
+    def consume(self, buckets: List[Tuple[str, RateLimit]], now: float = None) -> Decision:
+        now = time.time() if now is None else now
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            states = []
+            retry_after = 0.0
+            for key, limit in buckets:
+                tokens, updated, _ = self._buckets.get(key, (limit.burst, now, now))
+                tokens = min(limit.burst, tokens + max(0.0, now - updated) * limit.rate)
+                if tokens < 1:
+                    retry_after = max(retry_after, (1 - tokens) / limit.rate)
+                states.append((key, limit, tokens))
+            # All-or-nothing: a rejected request does not spend any bucket
+            spent = 0 if retry_after else 1
+            for key, limit, tokens in states:
+                tokens -= spent
+                self._buckets[key] = (tokens, now, now + (limit.burst - tokens) / limit.rate)
+            return Decision(not retry_after, retry_after)
+
+    def acquire(self, key: str, limit: int, ttl: int) -> bool:
+        with self._lock:
+            in_flight = self._slots.get(key, 0)
+            if in_flight >= limit:
+                return False
+            self._slots[key] = in_flight + 1
+            return True
+
+    def release(self, key: str):
+        with self._lock:
+            in_flight = self._slots.get(key, 0) - 1
+            if in_flight > 0:
+                self._slots[key] = in_flight
+            else:
+                self._slots.pop(key, None)
+
+
+# KEYS: bucket keys; ARGV: now, then (rate, burst) per key.
+# Buckets are checked and spent atomically, all-or-nothing.
+_CONSUME_SCRIPT = """
+local now = tonumber(ARGV[1])
+local tokens = {}
+local retry = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local current = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    current = math.min(burst, current + math.max(0, now - updated) * rate)
+    if current < 1 then
+        retry = math.max(retry, (1 - current) / rate)
+    end
+    tokens[i] = current
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    local remaining = tokens[i]
+    if retry == 0 then
+        remaining = remaining - 1
+    end
+    redis.call('HSET', key, 'tokens', tostring(remaining), 'ts', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000) + 1000)
+end
+return tostring(retry)
+"""
+
+_ACQUIRE_SCRIPT = """
+local in_flight = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+if in_flight > tonumber(ARGV[1]) then
+    redis.call('DECR', KEYS[1])
+    return 0
+end
+return 1
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('DECR', KEYS[1]) <= 0 then
+    redis.call('DEL', KEYS[1])
+end
+return 1
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Shared token buckets and concurrency counters kept in Redis (or any
+    server speaking the Redis protocol with Lua EVAL, e.g. a local KeyDB or
+    Dragonfly). Any client exposing `eval(script, numkeys, *args)` works.
+    """
+
+    key_prefix = 'ratelimit:'
+
+    def __init__(self, client):
+        self._client = client
+
+    @classmethod
+    def from_url(cls, url: str):
+        import redis
+        return cls(redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5))
+
+    def consume(self, buckets: List[Tuple[str, RateLimit]], now: float = None) -> Decision:
+        now = time.time() if now is None else now
+        keys = [self.key_prefix + key for key, _ in buckets]
+        args = [now]
+        for _, limit in buckets:
+            args.extend([limit.rate, limit.burst])
+        retry_after = float(self._client.eval(_CONSUME_SCRIPT, len(keys), *keys, *args))
+        return Decision(retry_after == 0, retry_after)
+
+    def acquire(self, key: str, limit: int, ttl: int) -> bool:
+        # The TTL frees slots leaked by a worker that died mid-request
+        return bool(self._client.eval(_ACQUIRE_SCRIPT, 1, self.key_prefix + key, limit, ttl))
+
+    def release(self, key: str):
+        self._client.eval(_RELEASE_SCRIPT, 1, self.key_prefix + key)
+
+
+class RateLimiter:
+    """
+    Per-tenant and per-route token buckets plus a per-tenant cap on
+    concurrent in-flight requests. Limits are looked up by the tenant's plan
+    name in RATE_LIMIT_PLANS; unauthenticated clients are limited per IP
+    with RATE_LIMIT_ANONYMOUS.
+    """
+
+    def __init__(self, backend, plans: dict, default_plan: str, anonymous: dict,
+                 route_overrides: Optional[dict] = None, slot_ttl: int = 300):
+        self.backend = backend
+        self.plans = {name.lower(): _parse_limits(limits) for name, limits in plans.items()}
+        self.default_limits = self.plans[default_plan.lower()]
+        self.anonymous_limits = _parse_limits(anonymous)
+        self.route_overrides = {
+            endpoint: RateLimit(float(limit['rate']), int(limit['burst']))
+            for endpoint, limit in (route_overrides or {}).items()
+        }
+        self.slot_ttl = slot_ttl
+
+    def limits_for_plan(self, plano: Optional[str]) -> TenantLimits:
+        return self.plans.get((plano or '').lower(), self.default_limits)
+
+    def check(self, subject: str, endpoint: str, limits: TenantLimits) -> Decision:
+        """Spends one token from the subject's bucket and from its bucket for this route."""
+        route_limit = self.route_overrides.get(endpoint, limits.route)
+        return self.backend.consume([
+            (f'{subject}', limits.tenant),
+            (f'{subject}:{endpoint}', route_limit),
+        ])
+
+    def acquire_slot(self, subject: str, limits: TenantLimits) -> bool:
+        if not limits.max_concurrent:
+            return True
+        return self.backend.acquire(f'{subject}:inflight', limits.max_concurrent, self.slot_ttl)
+
+    def release_slot(self, subject: str):
+        self.backend.release(f'{subject}:inflight')
+
+
+def create_rate_limiter(app, client=None) -> RateLimiter:
+    """
+    Builds the limiter from the app config. RATE_LIMIT_BACKEND selects
+    'memory' (per process) or 'redis' (shared, RATE_LIMIT_REDIS_URL); a
+    ready-made Redis-compatible client can be passed instead.
+    """
+    if client is not None:
+        backend = RedisRateLimitBackend(client)
+    elif app.config.get('RATE_LIMIT_BACKEND', 'memory') == 'redis':
+        backend = RedisRateLimitBackend.from_url(app.config.get('RATE_LIMIT_REDIS_URL') or app.config['REDIS_URL'])
+    else:
+        backend = MemoryRateLimitBackend()
+
+    return RateLimiter(
+        backend,
+        plans=app.config['RATE_LIMIT_PLANS'],
+        default_plan=app.config.get('RATE_LIMIT_DEFAULT_PLAN', 'basico'),
+        anonymous=app.config['RATE_LIMIT_ANONYMOUS'],
+        route_overrides=app.config.get('RATE_LIMIT_ROUTES'),
+        slot_ttl=app.config.get('RATE_LIMIT_SLOT_TTL', 300),
+    )
+
+
+def get_rate_limiter() -> RateLimiter:
+    return current_app.extensions['rate_limiter']
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
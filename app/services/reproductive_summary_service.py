@@ -0,0 +1,177 @@
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import text
+
+from app import db
+
+DIMENSOES = ('matriz', 'reprodutor', 'raca')
+
+# Litter facts (birth year) and mating facts (mating year) of one tenant,
+# aggregated to one row per (dimension, key, year) from :desde on. The litter
+# interval is taken over the dam's whole history before that cut.
+_REFRESH_SQL = text("""
+WITH partos AS (
+    SELECT n.id,
+           n.matriz_id,
+           macho.animal_id AS reprodutor_id,
+           COALESCE(m.raca_id, 0) AS raca_id,
+           CAST(EXTRACT(YEAR FROM n.data_parto) AS INTEGER) AS ano,
+           COALESCE(n.qtd_vivos, 0) AS vivos,
+           COALESCE(n.qtd_mortos, 0) AS mortos,
+           n.data_parto - LAG(n.data_parto) OVER (
+               PARTITION BY n.matriz_id ORDER BY n.data_parto, n.id
+           ) AS intervalo
+    FROM ninhadas n
+    JOIN animais m ON m.id = n.matriz_id
+    LEFT JOIN LATERAL (
+        SELECT MIN(ca.animal_id) AS animal_id
+        FROM cruzamento_animal ca
+        JOIN animais a ON a.id = ca.animal_id
+        WHERE ca.cruzamento_id = n.cruzamento_id AND a.sexo = 'M'
+    ) macho ON TRUE
+    WHERE n.tenant_id = :tenant_id AND n.data_parto IS NOT NULL
+),
+acasalamentos AS (
+    SELECT CAST(EXTRACT(YEAR FROM c.data_acasalamento) AS INTEGER) AS ano,
+           femea.animal_id AS matriz_id,
+           macho.animal_id AS reprodutor_id,
+           COALESCE(femea.raca_id, 0) AS raca_id,
+           CAST(EXISTS (
+               SELECT 1 FROM ninhadas n
+               WHERE n.cruzamento_id = c.id AND n.data_parto IS NOT NULL AND COALESCE(n.qtd_vivos, 0) > 0
+           ) AS INTEGER) AS produtivo
+    FROM cruzamentos c
+    LEFT JOIN LATERAL (
+        SELECT a.id AS animal_id, a.raca_id
+        FROM cruzamento_animal ca
+        JOIN animais a ON a.id = ca.animal_id
+        WHERE ca.cruzamento_id = c.id AND a.sexo = 'F'
+        ORDER BY a.id
+        LIMIT 1
+    ) femea ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT MIN(ca.animal_id) AS animal_id
+        FROM cruzamento_animal ca
+        JOIN animais a ON a.id = ca.animal_id
+        WHERE ca.cruzamento_id = c.id AND a.sexo = 'M'
+    ) macho ON TRUE
+    WHERE c.tenant_id = :tenant_id
+      AND (CAST(:desde AS INTEGER) IS NULL
+           OR c.data_acasalamento >= MAKE_DATE(CAST(:desde AS INTEGER), 1, 1))
+),
+fatos AS (
+    SELECT 'matriz' AS dimensao, matriz_id AS chave_id, ano, 1 AS ninhadas, vivos, mortos,
+           intervalo, 0 AS cruzamentos, 0 AS produtivos FROM partos
+    UNION ALL
+    SELECT 'reprodutor', reprodutor_id, ano, 1, vivos, mortos, intervalo, 0, 0
+    FROM partos WHERE reprodutor_id IS NOT NULL
+    UNION ALL
+    SELECT 'raca', raca_id, ano, 1, vivos, mortos, intervalo, 0, 0 FROM partos
+    UNION ALL
+    SELECT 'matriz', matriz_id, ano, 0, 0, 0, NULL, 1, produtivo
+    FROM acasalamentos WHERE matriz_id IS NOT NULL
+    UNION ALL
+    SELECT 'reprodutor', reprodutor_id, ano, 0, 0, 0, NULL, 1, produtivo
+    FROM acasalamentos WHERE reprodutor_id IS NOT NULL
+    UNION ALL
+    SELECT 'raca', raca_id, ano, 0, 0, 0, NULL, 1, produtivo
+    FROM acasalamentos WHERE matriz_id IS NOT NULL
+)
+INSERT INTO resumos_reprodutivos (
+    tenant_id, dimensao, chave_id, ano, ninhadas, nascidos_vivos, nascidos_mortos,
+    cruzamentos, cruzamentos_produtivos, soma_intervalos_dias, qtd_intervalos, atualizado_em
+)
+SELECT :tenant_id, dimensao, chave_id, ano,
+       SUM(ninhadas), SUM(vivos), SUM(mortos), SUM(cruzamentos), SUM(produtivos),
+       COALESCE(SUM(intervalo), 0), COUNT(intervalo), :atualizado_em
+FROM fatos
+WHERE CAST(:desde AS INTEGER) IS NULL OR ano >= :desde
+GROUP BY dimensao, chave_id, ano
+""")
+
+_DELETE_SQL = text("""
+DELETE FROM resumos_reprodutivos
+WHERE tenant_id = :tenant_id AND (CAST(:desde AS INTEGER) IS NULL OR ano >= :desde)
+""")
+
+
+class ReproductiveSummaryService:
+    """
+    Maintains ResumoReprodutivo and serves the reproductive report. Totals are
+    aggregated in the database with set-based SQL; a litter or mating change
+    only rebuilds the years it touches.
+    """
+
+    def refresh(self, tenant_id, anos=None) -> int:
+        """
+        Rebuilds the tenant's rollup rows from the earliest year in `anos`
+        onwards (all years when None): a change to one litter also moves the
+        interval of the dam's next litter, which may fall in a later year.
+        Returns the number of rows written. The caller commits.
+        """
+        if anos is not None and not anos:
+            return 0
+        params = {'tenant_id': tenant_id, 'desde': min(anos) if anos is not None else None}
+        # Serialises concurrent rebuilds of one tenant until the caller commits
+        db.session.execute(text('SELECT pg_advisory_xact_lock(hashtext(:key))'),
+                           {'key': f'resumo-reprodutivo:{tenant_id}'})
+        db.session.execute(_DELETE_SQL, params)
+        result = db.session.execute(_REFRESH_SQL, {**params, 'atualizado_em': datetime.utcnow()})
+        return result.rowcount
+
+    def report(self, tenant_id, ano, dimensao='matriz', chave_id=None) -> list:
+        """Rows of one year and dimension with the derived rates, largest producers first."""
+        from app.models.animal import Animal
+        from app.models.breeding import ResumoReprodutivo
+        from app.models.identity import Raca
+
+        query = ResumoReprodutivo.query.filter_by(tenant_id=tenant_id, ano=ano, dimensao=dimensao)
+        if chave_id is not None:
+            query = query.filter_by(chave_id=chave_id)
+        rows = query.order_by(ResumoReprodutivo.nascidos_vivos.desc(), ResumoReprodutivo.chave_id).all()
+
+        ids = [row.chave_id for row in rows]
+        if dimensao == 'raca':
+            nomes = dict(db.session.query(Raca.id, Raca.nome).filter(Raca.id.in_(ids)).all()) if ids else {}
+        else:
+            nomes = dict(db.session.query(Animal.id, Animal.nome).filter(Animal.id.in_(ids)).all()) if ids else {}
+
+        return [self._report_item(row, nomes.get(row.chave_id)) for row in rows]
+
+    @staticmethod
+    def _report_item(row, nome):
+        nascidos = row.nascidos_vivos + row.nascidos_mortos
+        return {
+            'dimensao': row.dimensao,
+            'chave_id': row.chave_id or None,
+            'nome': nome,
+            'ano': row.ano,
+            'ninhadas': row.ninhadas,
+            'nascidos_vivos': row.nascidos_vivos,
+            'nascidos_mortos': row.nascidos_mortos,
+            'cruzamentos': row.cruzamentos,
+            'cruzamentos_produtivos': row.cruzamentos_produtivos,
+            # Share of the year's matings that produced a live litter
+            'taxa_fertilidade': round(100.0 * row.cruzamentos_produtivos / row.cruzamentos, 1) if row.cruzamentos else None,
+            'taxa_nascidos_vivos': round(100.0 * row.nascidos_vivos / nascidos, 1) if nascidos else None,
+            'media_filhotes_ninhada': round(nascidos / row.ninhadas, 2) if row.ninhadas else None,
+            'intervalo_medio_ninhadas_dias': round(row.soma_intervalos_dias / row.qtd_intervalos, 1) if row.qtd_intervalos else None,
+            'atualizado_em': row.atualizado_em,
+        }
+
+
+def summary_years(*datas):
+    """Years touched by a litter or mating change, from its (old and new) dates."""
+    return sorted({d.year for d in datas if d is not None})
+
+
+def schedule_summary_refresh(tenant_id, anos):
+    """Queues a background rebuild of the tenant's rollup for the given years."""
+    if not anos:
+        return
+    try:
+        from app.tasks import refresh_reproductive_summary
+        refresh_reproductive_summary.delay(tenant_id, list(anos))
+    except Exception as e:
+        current_app.logger.error(f"Could not queue reproductive summary refresh for tenant {tenant_id}: {e}")
@@ -0,0 +1,75 @@
+"""
+Shareable storage links of media files, cached on the Arquivo row
+(url_compartilhada, valid until url_expira_em) so showing a file does not
+cost remote calls. Links missing or expired are resolved for a whole page of
+files at once through StorageBackend.get_shareable_links.
+"""
+
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import db
+from app.models.media import Arquivo
+from app.services.storage_service import get_storage_backend
+
+DEFAULT_SHARE_LINK_TTL = 7 * 24 * 3600
+
+
+class ShareLinkService:
+
+    def resolve(self, arquivos) -> dict:
+        """
+        Shareable link of each file: arquivo id -> URL, or None when the
+        backend has no links (local storage) or storage could not be reached;
+        callers then fall back to the download endpoint. Cached links cost
+        nothing; the others take one batched lookup per tenant.
+        """
+        now = datetime.utcnow()
+        links, stale = {}, {}
+        for arquivo in arquivos:
+            if arquivo.url_compartilhada and arquivo.url_expira_em and arquivo.url_expira_em > now:
+                links[arquivo.id] = arquivo.url_compartilhada
+            else:
+                links[arquivo.id] = None
+                stale.setdefault(arquivo.tenant_id, []).append(arquivo)
+        if not stale:
+            return links
+
+        storage = get_storage_backend()
+        expira_em = now + timedelta(seconds=current_app.config.get('MEDIA_SHARE_LINK_TTL', DEFAULT_SHARE_LINK_TTL))
+        cached = []
+        for tenant_id, pendentes in stale.items():
+            try:
+                by_path = storage.get_shareable_links(tenant_id, sorted({arquivo.caminho for arquivo in pendentes}))
+            except Exception as e:
+                current_app.logger.error(f"Could not resolve shareable links for tenant {tenant_id}: {e}")
+                continue
+            for arquivo in pendentes:
+                url = by_path.get(arquivo.caminho)
+                if url:
+                    links[arquivo.id] = url
+                    cached.append({'arquivo_id': arquivo.id, 'url': url, 'expira_em': expira_em})
+                    # Keeps the row clean in the request's session: the cache is written below
+                    set_committed_value(arquivo, 'url_compartilhada', url)
+                    set_committed_value(arquivo, 'url_expira_em', expira_em)
+
+        if cached:
+            self._store(cached)
+        return links
+
+    def _store(self, cached):
+        """Writes the links in their own transaction, so read-only requests need not commit."""
+        arquivos = Arquivo.__table__
+        stmt = update(arquivos).where(arquivos.c.id == bindparam('arquivo_id')).values(
+            url_compartilhada=bindparam('url'),
+            url_expira_em=bindparam('expira_em'),
+        )
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(stmt, cached)
+        except Exception as e:
+            # Only costs the lookup again next time
+            current_app.logger.error(f"Could not cache {len(cached)} shareable links: {e}")
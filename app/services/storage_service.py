@@ -0,0 +1,273 @@
+"""
+Storage backends for media files. Resources get the configured backend with
+get_storage_backend() (MEDIA_STORAGE_BACKEND: 'dropbox' or 'local') and only
+use the StorageBackend methods, so media flows run the same against Dropbox
+or a local directory (development, tests, offline installs).
+
+Paths are always relative to the tenant's folder; backends add the tenant
+prefix. Content hashes use the Dropbox content_hash algorithm on every
+backend, so hashes stay comparable when files move between backends.
+"""
+
+import hashlib
+import os
+import tempfile
+import uuid
+
+from flask import current_app
+
+# Dropbox hashes content in 4 MiB blocks; upload chunks are multiples of it
+DROPBOX_BLOCK_SIZE = 4 * 1024 * 1024
+DEFAULT_UPLOAD_CHUNK_SIZE = 2 * DROPBOX_BLOCK_SIZE
+# Bytes handed to the WSGI server per iteration when streaming a download
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+STORAGE_BACKENDS = ('dropbox', 'local')
+
+
+def upload_chunk_size() -> int:
+    """MEDIA_UPLOAD_CHUNK_SIZE rounded down to whole Dropbox blocks (at least one)."""
+    configured = current_app.config.get('MEDIA_UPLOAD_CHUNK_SIZE', DEFAULT_UPLOAD_CHUNK_SIZE)
+    return max(1, int(configured) // DROPBOX_BLOCK_SIZE) * DROPBOX_BLOCK_SIZE
+
+
+def read_chunk(stream, size: int) -> bytes:
+    """Reads up to `size` bytes, looping over short reads; shorter only at end of stream."""
+    parts, remaining = [], size
+    while remaining:
+        data = stream.read(remaining)
+        if not data:
+            break
+        parts.append(data)
+        remaining -= len(data)
+    return b''.join(parts)
+
+
+class DropboxContentHasher:
+    """
+    Incremental Dropbox content_hash: SHA-256 over the concatenated SHA-256
+    digests of each 4 MiB block. Completed block digests (`block_hashes`) are
+    enough to resume hashing in a later request, as long as every earlier
+    chunk ended on a block boundary.
+    """
+
+    def __init__(self, block_hashes=None, size=0):
+        self.block_hashes = list(block_hashes or [])
+        self.size = size
+        self._block = hashlib.sha256()
+        self._block_size = 0
+
+    def update(self, data):
+        view = memoryview(data)
+        while view:
+            take = min(len(view), DROPBOX_BLOCK_SIZE - self._block_size)
+            self._block.update(view[:take])
+            self._block_size += take
+            self.size += take
+            view = view[take:]
+            if self._block_size == DROPBOX_BLOCK_SIZE:
+                self.block_hashes.append(self._block.hexdigest())
+                self._block = hashlib.sha256()
+                self._block_size = 0
+
+    @property
+    def aligned(self) -> bool:
+        return self._block_size == 0
+
+    def hexdigest(self) -> str:
+        digests = [bytes.fromhex(h) for h in self.block_hashes]
+        if self._block_size:
+            digests.append(self._block.digest())
+        return hashlib.sha256(b''.join(digests)).hexdigest()
+
+
+class StorageBackend:
+    """
+    Interface of a media storage backend. Upload sessions let a file arrive
+    over several requests: start, append at increasing offsets, then finish
+    with the last bytes, which commits the file to its destination path.
+    """
+
+    name = None
+
+    def upload_stream(self, tenant_id: int, stream, destination_path, chunk_size: int = None):
+        """Stores a file-like object chunk by chunk. Returns (metadata, size, hash)."""
+        raise NotImplementedError
+
+    def start_upload_session(self, tenant_id: int, data=b'') -> str:
+        """Opens an upload session with its first bytes; returns the session id."""
+        raise NotImplementedError
+
+    def append_upload_session(self, tenant_id: int, session_id: str, offset: int, data):
+        """Appends `data` at `offset` (bytes already in the session)."""
+        raise NotImplementedError
+
+    def finish_upload_session(self, tenant_id: int, session_id: str, offset: int, data, destination_path):
+        """Appends the last bytes and commits the session to the destination path."""
+        raise NotImplementedError
+
+    def abort_upload_session(self, tenant_id: int, session_id: str):
+        """Discards an unfinished session; a no-op where sessions expire by themselves."""
+
+    def download_file(self, tenant_id: int, file_path) -> bytes:
+        raise NotImplementedError
+
+    def open_stream(self, tenant_id: int, file_path, start: int = 0, stop: int = None):
+        """
+        Iterator over the bytes in [start, stop) of the file (to the end when
+        `stop` is None), in pieces of about DOWNLOAD_CHUNK_SIZE. The file is
+        opened before returning, so a missing file raises here rather than
+        halfway through a response.
+        """
+        raise NotImplementedError
+
+    def delete_file(self, tenant_id: int, file_path):
+        raise NotImplementedError
+
+    def get_shareable_link(self, tenant_id: int, file_path):
+        """Public URL of the file, or None when the backend cannot publish one."""
+        return None
+
+    def get_shareable_links(self, tenant_id: int, file_paths) -> dict:
+        """
+        Shareable links of several files: path -> URL, leaving out files
+        without one. Backends override it to batch the remote calls.
+        """
+        links = {}
+        for file_path in file_paths:
+            url = self.get_shareable_link(tenant_id, file_path)
+            if url:
+                links[file_path] = url
+        return links
+
+    def get_temporary_link(self, tenant_id: int, file_path):
+        """Short-lived direct download URL, or None when the backend has none."""
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """
+    Files under MEDIA_LOCAL_ROOT/<tenant_id>/<path>. Files are written to a
+    temporary name and renamed into place, so a failed upload never leaves a
+    partial file at the destination. Upload sessions are part files in
+    MEDIA_LOCAL_ROOT/.uploads.
+    """
+
+    name = 'local'
+
+    def __init__(self, root=None):
+        self.root = os.path.abspath(root or current_app.config.get('MEDIA_LOCAL_ROOT')
+                                    or os.path.join(current_app.instance_path, 'media'))
+        self.sessions_dir = os.path.join(self.root, '.uploads')
+
+    def _full_path(self, tenant_id: int, file_path: str) -> str:
+        full_path = os.path.abspath(os.path.join(self.root, str(tenant_id), file_path.lstrip('/')))
+        tenant_root = os.path.join(self.root, str(tenant_id))
+        if os.path.commonpath([full_path, tenant_root]) != tenant_root:
+            raise ValueError(f'Path {file_path!r} is outside the tenant folder.')
+        return full_path
+
+    def _session_path(self, tenant_id: int, session_id: str) -> str:
+        if not session_id.isalnum():
+            raise ValueError('Invalid upload session id.')
+        return os.path.join(self.sessions_dir, f'{tenant_id}-{session_id}.part')
+
+    def _commit(self, temp_path: str, full_path: str):
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.replace(temp_path, full_path)
+
+    def upload_stream(self, tenant_id: int, stream, destination_path, chunk_size: int = None):
+        chunk_size = chunk_size or upload_chunk_size()
+        full_path = self._full_path(tenant_id, destination_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        hasher = DropboxContentHasher()
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = read_chunk(stream, chunk_size)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                    hasher.update(chunk)
+            self._commit(temp_path, full_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return full_path, hasher.size, hasher.hexdigest()
+
+    def start_upload_session(self, tenant_id: int, data=b'') -> str:
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        session_id = uuid.uuid4().hex
+        with open(self._session_path(tenant_id, session_id), 'xb') as out:
+            out.write(data)
+        return session_id
+
+    def append_upload_session(self, tenant_id: int, session_id: str, offset: int, data):
+        with open(self._session_path(tenant_id, session_id), 'r+b') as out:
+            size = out.seek(0, os.SEEK_END)
+            if size != offset:
+                raise ValueError(f'Upload session {session_id} holds {size} bytes, not {offset}.')
+            out.write(data)
+
+    def finish_upload_session(self, tenant_id: int, session_id: str, offset: int, data, destination_path):
+        self.append_upload_session(tenant_id, session_id, offset, data)
+        full_path = self._full_path(tenant_id, destination_path)
+        self._commit(self._session_path(tenant_id, session_id), full_path)
+        return full_path
+
+    def abort_upload_session(self, tenant_id: int, session_id: str):
+        try:
+            os.remove(self._session_path(tenant_id, session_id))
+        except FileNotFoundError:
+            pass
+
+    def download_file(self, tenant_id: int, file_path) -> bytes:
+        with open(self._full_path(tenant_id, file_path), 'rb') as f:
+            return f.read()
+
+    def open_stream(self, tenant_id: int, file_path, start: int = 0, stop: int = None):
+        f = open(self._full_path(tenant_id, file_path), 'rb')
+        f.seek(start)
+        return _iter_file(f, None if stop is None else stop - start)
+
+    def delete_file(self, tenant_id: int, file_path):
+        try:
+            os.remove(self._full_path(tenant_id, file_path))
+        except FileNotFoundError:
+            current_app.logger.warning(f"File {file_path} of tenant {tenant_id} was already gone from local storage")
+
+
+def _iter_file(f, remaining=None):
+    """Yields the file from its current position, `remaining` bytes or to the end, then closes it."""
+    try:
+        while remaining is None or remaining > 0:
+            data = f.read(DOWNLOAD_CHUNK_SIZE if remaining is None else min(DOWNLOAD_CHUNK_SIZE, remaining))
+            if not data:
+                break
+            if remaining is not None:
+                remaining -= len(data)
+            yield data
+    finally:
+        f.close()
+
+
+def create_storage_backend(app) -> StorageBackend:
+    """Builds the backend named by MEDIA_STORAGE_BACKEND for `app`."""
+    backend = app.config.get('MEDIA_STORAGE_BACKEND', 'dropbox')
+    with app.app_context():
+        if backend == 'local':
+            return LocalStorage()
+        if backend == 'dropbox':
+            from app.services.media_service import DropboxService
+            return DropboxService()
+    raise ValueError(f"Unknown MEDIA_STORAGE_BACKEND {backend!r}; expected one of {', '.join(STORAGE_BACKENDS)}.")
+
+
+def get_storage_backend() -> StorageBackend:
+    """The app's storage backend, built on first use and shared by every request."""
+    extensions = current_app.extensions
+    if 'storage_backend' not in extensions:
+        extensions['storage_backend'] = create_storage_backend(current_app._get_current_object())
+    return extensions['storage_backend']
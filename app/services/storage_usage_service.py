@@ -0,0 +1,125 @@
+"""
+Per-tenant media storage accounting. UsoArmazenamento holds each tenant's
+running total, changed in the same transaction as the files it counts, so
+plan quotas (Tenant.limite_armazenamento_mb) are checked against one row
+instead of SUM(arquivos.tamanho). A nightly reconciliation corrects any
+drift (files changed outside the API, or a counter update lost to a race
+with the reconciliation itself).
+"""
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, cast, exists, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app import db
+from app.models.media import Arquivo, UsoArmazenamento
+from app.services.tenant_service import get_tenant_entitlements
+
+
+def storage_limit(tenant_id: int):
+    """
+    The tenant's plan storage limit in bytes: 0 means unlimited, None that
+    the tenant has no plan (its subscription ended) and may store nothing more.
+    """
+    entitlements = get_tenant_entitlements(tenant_id)
+    if entitlements is None:
+        return 0
+    return entitlements.storage_limit_bytes if entitlements.has_plan else None
+
+
+class StorageUsageService:
+
+    def usage(self, tenant_id: int):
+        """(bytes used, number of files) of the tenant."""
+        uso = db.session.get(UsoArmazenamento, tenant_id)
+        return (uso.bytes_usados, uso.arquivos) if uso is not None else (0, 0)
+
+    def fits(self, tenant_id: int, tamanho: int) -> bool:
+        """Whether `tamanho` more bytes stay within the plan (checked before accepting an upload)."""
+        limite = storage_limit(tenant_id)
+        if limite is None:
+            return False
+        return not limite or self.usage(tenant_id)[0] + int(tamanho) <= limite
+
+    def charge(self, tenant_id: int, tamanho, arquivos: int = 1) -> bool:
+        """
+        Adds new files to the tenant's usage, unless that would exceed the
+        plan's limit: returns False and changes nothing then. The check and
+        the increment are one statement, so concurrent uploads cannot
+        overshoot the limit together.
+        """
+        tamanho = int(tamanho or 0)
+        limite = storage_limit(tenant_id)
+        if limite is None or (limite and tamanho > limite):
+            return False
+        stmt = insert(UsoArmazenamento).values(
+            tenant_id=tenant_id,
+            bytes_usados=tamanho,
+            arquivos=arquivos,
+            atualizado_em=datetime.utcnow(),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UsoArmazenamento.tenant_id],
+            set_={
+                'bytes_usados': UsoArmazenamento.bytes_usados + stmt.excluded.bytes_usados,
+                'arquivos': UsoArmazenamento.arquivos + stmt.excluded.arquivos,
+                'atualizado_em': stmt.excluded.atualizado_em,
+            },
+            where=(UsoArmazenamento.bytes_usados + tamanho <= limite) if limite else None,
+        ).returning(UsoArmazenamento.tenant_id)
+        return db.session.execute(stmt).first() is not None
+
+    def release(self, tenant_id: int, tamanho, arquivos: int = 1):
+        """Removes deleted files from the tenant's usage (never below zero)."""
+        db.session.execute(
+            update(UsoArmazenamento).where(UsoArmazenamento.tenant_id == tenant_id).values(
+                bytes_usados=func.greatest(UsoArmazenamento.bytes_usados - int(tamanho or 0), 0),
+                arquivos=func.greatest(UsoArmazenamento.arquivos - arquivos, 0),
+                atualizado_em=datetime.utcnow(),
+            )
+        )
+
+    def reconcile(self) -> list:
+        """
+        Recomputes every tenant's usage from the files table in two
+        statements, rewriting only the rows that drifted (the first run
+        also creates the missing rows). Returns the ids of the tenants
+        corrected. The caller commits.
+        """
+        agora = datetime.utcnow()
+        totais = select(
+            Arquivo.tenant_id,
+            cast(func.coalesce(func.sum(Arquivo.tamanho), 0), BigInteger).label('bytes_usados'),
+            func.count().label('arquivos'),
+            literal(agora, DateTime).label('atualizado_em'),
+            literal(agora, DateTime).label('reconciliado_em'),
+        ).group_by(Arquivo.tenant_id)
+
+        stmt = insert(UsoArmazenamento).from_select(
+            ['tenant_id', 'bytes_usados', 'arquivos', 'atualizado_em', 'reconciliado_em'], totais
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UsoArmazenamento.tenant_id],
+            set_={
+                'bytes_usados': stmt.excluded.bytes_usados,
+                'arquivos': stmt.excluded.arquivos,
+                'atualizado_em': stmt.excluded.atualizado_em,
+                'reconciliado_em': stmt.excluded.reconciliado_em,
+            },
+            where=or_(
+                UsoArmazenamento.bytes_usados != stmt.excluded.bytes_usados,
+                UsoArmazenamento.arquivos != stmt.excluded.arquivos,
+            ),
+        ).returning(UsoArmazenamento.tenant_id)
+        corrigidos = list(db.session.execute(stmt).scalars())
+
+        # Tenants whose last file is gone have no row in the totals above
+        sem_arquivos = db.session.execute(
+            update(UsoArmazenamento).where(
+                or_(UsoArmazenamento.bytes_usados != 0, UsoArmazenamento.arquivos != 0),
+                ~exists().where(Arquivo.tenant_id == UsoArmazenamento.tenant_id),
+            ).values(bytes_usados=0, arquivos=0, atualizado_em=agora, reconciliado_em=agora)
+            .returning(UsoArmazenamento.tenant_id)
+        ).scalars()
+        return corrigidos + list(sem_arquivos)
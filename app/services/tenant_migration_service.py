@@ -0,0 +1,176 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from alembic import command
+from alembic.script import ScriptDirectory
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.models.tenant import Tenant
+
+# Flask app handed to the forked migration workers (set right before forking)
+_worker_app = None
+
+
+def _get_alembic_config(directory: Optional[str] = None, tenant_schema: Optional[str] = None):
+    """Builds the Alembic config used by `flask db`, optionally targeting a tenant schema."""
+    migrate_ext = current_app.extensions['migrate']
+    x_arg = [f'tenant_schema={tenant_schema}'] if tenant_schema else None
+    return migrate_ext.migrate.get_config(directory or migrate_ext.directory, x_arg=x_arg)
+
+
+def get_head_revisions(directory: Optional[str] = None) -> tuple:
+    """Returns the head revision(s) of the migration scripts (empty if there are none)."""
+    try:
+        script = ScriptDirectory.from_config(_get_alembic_config(directory))
+        return tuple(sorted(script.get_heads()))
+    except Exception as e:
+        current_app.logger.warning(f"Could not read migration heads: {e}")
+        return ()
+
+
+def _init_migration_worker():
+    """Runs once in every forked worker: drop pooled connections inherited from the parent."""
+    with _worker_app.app_context():
+        db.engine.dispose(close=False)
+
+
+def _upgrade_schema(schema_name: str, revision: str, directory: Optional[str]) -> Dict:
+    """
+    Upgrades a single tenant schema. Executed inside a worker process.
+
+    A session-level advisory lock keyed by the schema name guarantees that two
+    runners (or two deploys) never migrate the same schema at the same time;
+    if the lock is taken the schema is reported as 'locked' and skipped.
+    """
+    started = time.perf_counter()
+    with _worker_app.app_context():
+        engine = db.engine
+        lock_key = f'alembic:{schema_name}'
+        with engine.connect() as lock_connection:
+            locked = lock_connection.execute(
+                text('SELECT pg_try_advisory_lock(hashtext(:key))'), {'key': lock_key}
+            ).scalar()
+            if not locked:
+                return {'schema': schema_name, 'status': 'locked', 'elapsed': time.perf_counter() - started}
+            try:
+                command.upgrade(_get_alembic_config(directory, tenant_schema=schema_name), revision)
+                status, error = 'upgraded', None
+            except Exception as e:
+                status, error = 'failed', str(e)
+            finally:
+                lock_connection.execute(text('SELECT pg_advisory_unlock(hashtext(:key))'), {'key': lock_key})
+                lock_connection.commit()
+
+    return {'schema': schema_name, 'status': status, 'error': error, 'elapsed': time.perf_counter() - started}
+
+
+class TenantMigrationService:
+    """
+    Applies pending Alembic revisions to every tenant schema with a bounded
+    pool of worker processes (Alembic's context is process-global, so threads
+    cannot run migrations side by side).
+
+    The run is resumable: each schema keeps its own alembic_version table, so
+    schemas already at the target revision are skipped and an interrupted run
+    simply continues with the remaining ones when started again.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_workers: Optional[int] = None):
+        self.directory = directory
+        self.max_workers = max_workers or current_app.config.get('TENANT_MIGRATION_WORKERS', 4)
+
+    def list_tenant_schemas(self) -> List[str]:
+        """Returns the schema name of every tenant registered in tenants.schema_name."""
+        rows = db.session.query(Tenant.schema_name).order_by(Tenant.id).all()
+        return [row.schema_name for row in rows]
+
+    def get_schema_revisions(self, schemas: List[str]) -> Dict[str, set]:
+        """
+        Returns the current revisions of each schema in a single round trip.
+        Schemas without an alembic_version table map to an empty set.
+        """
+        revisions = {schema: set() for schema in schemas}
+        if not schemas:
+            return revisions
+
+        versioned = [
+            row.table_schema for row in db.session.execute(
+                text(
+                    "SELECT table_schema FROM information_schema.tables "
+                    "WHERE table_name = 'alembic_version' AND table_schema = ANY(:schemas)"
+                ),
+                {'schemas': list(schemas)}
+            )
+        ]
+        if versioned:
+            union_query = ' UNION ALL '.join(
+                f'SELECT \'{schema}\' AS schema_name, version_num FROM "{schema}".alembic_version'
+                for schema in versioned
+            )
+            for row in db.session.execute(text(union_query)):
+                revisions[row.schema_name].add(row.version_num)
+        return revisions
+
+    def pending_schemas(self, schemas: List[str], revision: str = 'head') -> List[str]:
+        """Filters out schemas that are already at the target revision."""
+        if revision != 'head':
+            return list(schemas)
+        heads = set(get_head_revisions(self.directory))
+        current = self.get_schema_revisions(schemas)
+        return [schema for schema in schemas if current[schema] != heads]
+
+    def migrate_all(self, revision: str = 'head', schemas: Optional[List[str]] = None,
+                    progress: Optional[Callable[[int, int, Dict], None]] = None) -> Dict:
+        """
+        Upgrades all (or the given) tenant schemas concurrently.
+
+        `progress` is called as progress(done, total, result) after each schema.
+        Returns a summary grouped by status: upgraded, failed, locked, up_to_date.
+        """
+        global _worker_app
+
+        started = time.perf_counter()
+        try:
+            all_schemas = schemas or self.list_tenant_schemas()
+            pending = self.pending_schemas(all_schemas, revision)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error listing tenant schemas for migration: {e}")
+            raise
+        finally:
+            db.session.remove()
+
+        summary = {
+            'total': len(all_schemas),
+            'up_to_date': sorted(set(all_schemas) - set(pending)),
+            'upgraded': [],
+            'failed': [],
+            'locked': [],
+        }
+
+        if pending:
+            _worker_app = current_app._get_current_object()
+            mp_context = multiprocessing.get_context('fork')
+            workers = max(1, min(self.max_workers, len(pending)))
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                                     initializer=_init_migration_worker) as executor:
+                futures = [
+                    executor.submit(_upgrade_schema, schema, revision, self.directory)
+                    for schema in pending
+                ]
+                for done, future in enumerate(as_completed(futures), start=1):
+                    result = future.result()
+                    if result['status'] == 'failed':
+                        summary['failed'].append({'schema': result['schema'], 'error': result['error']})
+                    else:
+                        summary[result['status']].append(result['schema'])
+                    if progress:
+                        progress(done, len(pending), result)
+
+        summary['elapsed_seconds'] = time.perf_counter() - started
+        return summary
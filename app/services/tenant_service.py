@@ -1,29 +1,243 @@
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Lock
+
+from flask import current_app
 from app import db
-from app.models.tenant import Tenant
+from app.models.tenant import SEM_PLANO, Tenant
+from app.services.tenant_migration_service import get_head_revisions
+from sqlalchemy import func, text
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import text
-from typing import Dict
+from sqlalchemy.schema import CreateTable, CreateIndex
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Tables that live only in the public schema and are shared by every tenant.
+# All other tables are replicated into each tenant schema on provisioning.
+SHARED_TABLES = frozenset({
+    'tenants', 'usuarios', 'planos_assinatura', 'assinaturas', 'pagamentos',
+    'especies', 'racas', 'linhagens', 'checkpoints_tarefas',
+})
+
+_SCHEMA_NAME_RE = re.compile(r'^[a-z_][a-z0-9_]{0,62}$')
+
+# Per-process cache of the compiled tenant DDL (one script per SQL dialect)
+_ddl_snapshot_cache = {}
+_ddl_snapshot_lock = Lock()
+
+
+def _validate_schema_name(schema_name: str):
+    if not schema_name or not _SCHEMA_NAME_RE.match(schema_name):
+        raise ValueError(f"Invalid schema name: {schema_name!r}")
+
+
+def get_tenant_ddl_snapshot(engine) -> str:
+    """
+    Returns the DDL script that creates every tenant-scoped table and index.
+
+    The script is compiled once per process from the SQLAlchemy metadata with
+    unqualified table names, so it can be replayed into any schema by setting
+    the search_path first. References to shared tables (e.g. tenants.id) then
+    resolve to the public schema through the search_path fallback.
+    """
+    dialect = engine.dialect
+    snapshot = _ddl_snapshot_cache.get(dialect.name)
+    if snapshot is not None:
+        return snapshot
+
+    with _ddl_snapshot_lock:
+        snapshot = _ddl_snapshot_cache.get(dialect.name)
+        if snapshot is None:
+            statements = []
+            for table in db.metadata.sorted_tables:
+                if table.name in SHARED_TABLES:
+                    continue
+                statements.append(str(CreateTable(table).compile(dialect=dialect)).strip())
+                for index in sorted(table.indexes, key=lambda i: i.name or ''):
+                    statements.append(str(CreateIndex(index).compile(dialect=dialect)).strip())
+            snapshot = ';\n'.join(statements) + ';'
+            _ddl_snapshot_cache[dialect.name] = snapshot
+    return snapshot
+
+
+def _provision_schema(connection, schema_name: str, tenant_id: int, ddl_snapshot: str,
+                      default_configs: List[Dict], alembic_heads: Tuple[str, ...] = ()):
+    """
+    Creates the tenant schema, replays the DDL snapshot into it and seeds the
+    default configuration rows. Runs inside the caller's transaction.
+
+    The snapshot reflects the current models, so the schema is stamped with the
+    current migration heads; `flask migrate-tenants` then skips it.
+    """
+    from app.models.system import Configuracao
+
+    _validate_schema_name(schema_name)
+    connection.exec_driver_sql(f'CREATE SCHEMA IF NOT EXISTS "{schema_name}"')
+    # SET LOCAL is scoped to the current transaction, so the pooled connection
+    # goes back to the pool with its original search_path.
+    connection.exec_driver_sql(f'SET LOCAL search_path TO "{schema_name}", public')
+    connection.execution_options(no_parameters=True).exec_driver_sql(ddl_snapshot)
+
+    if alembic_heads:
+        connection.exec_driver_sql(
+            'CREATE TABLE IF NOT EXISTS alembic_version ('
+            'version_num VARCHAR(32) NOT NULL, '
+            'CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num))'
+        )
+        connection.execute(
+            text('INSERT INTO alembic_version (version_num) VALUES (:version_num)'),
+            [{'version_num': head} for head in alembic_heads]
+        )
+
+    if default_configs:
+        connection.execute(
+            Configuracao.__table__.insert(),
+            [dict(config, tenant_id=tenant_id) for config in default_configs]
+        )
+
+
+def _normalize_feature(name: str) -> str:
+    return re.sub(r'[\s\-]+', '_', name.strip().lstrip('-*• ').strip().lower())
+
+
+def parse_plan_features(recursos) -> frozenset:
+    """
+    Parses PlanoAssinatura.recursos into a set of feature names.
+
+    Accepts a JSON list (["relatorios", "galeria"]), a JSON object whose truthy
+    keys are enabled ({"relatorios": true}) or free text separated by commas,
+    semicolons or new lines ("Relatórios, Galeria de fotos").
+    """
+    if recursos is None:
+        return frozenset()
+    if isinstance(recursos, str):
+        stripped = recursos.strip()
+        if stripped[:1] in ('[', '{'):
+            try:
+                recursos = json.loads(stripped)
+            except ValueError:
+                pass
+
+    if isinstance(recursos, str):
+        items = re.split(r'[,;\n]+', recursos)
+    elif isinstance(recursos, dict):
+        items = [key for key, enabled in recursos.items() if enabled]
+    else:
+        items = list(recursos)
+
+    return frozenset(
+        feature for feature in (_normalize_feature(item) for item in items if isinstance(item, str)) if feature
+    )
+
+
+def compile_plan_features(plano) -> frozenset:
+    """Feature flags granted by a plan: its recursos plus the boolean plan options."""
+    features = set(parse_plan_features(plano.recursos))
+    if plano.backup_automatico:
+        features.add('backup_automatico')
+    if plano.suporte_premium:
+        features.add('suporte_premium')
+    return frozenset(features)
+
+
+class TenantEntitlements(NamedTuple):
+    tenant_id: int
+    plano_id: Optional[int]
+    plano: str
+    ativo: bool
+    limite_animais: int
+    limite_funcionarios: int
+    limite_armazenamento_mb: int
+    recursos: frozenset
+    loaded_at: float
+
+    @property
+    def has_plan(self) -> bool:
+        """False once a subscription ended without a fallback plan (see TenantService.revoke_subscription_plan)."""
+        return self.plano != SEM_PLANO
+
+    def has_feature(self, feature: str) -> bool:
+        return self.ativo and self.has_plan and feature in self.recursos
+
+    def limit(self, resource_type: str) -> int:
+        """Limit for 'animais' or 'funcionarios' (0 means unlimited)."""
+        if resource_type not in ('animais', 'funcionarios'):
+            raise ValueError(f"Unknown resource type: {resource_type}")
+        return getattr(self, f'limite_{resource_type}') or 0
+
+    @property
+    def storage_limit_bytes(self) -> int:
+        """Media storage limit in bytes (0 means unlimited)."""
+        return (self.limite_armazenamento_mb or 0) * 1024 * 1024
+
+
+def build_tenant_entitlements(tenant_id: int, row, loaded_at: float = 0.0) -> TenantEntitlements:
+    """Entitlements from a tenant row (a Tenant or a row with the same columns)."""
+    return TenantEntitlements(
+        tenant_id=tenant_id,
+        plano_id=row.plano_id,
+        plano=row.plano,
+        ativo=bool(row.ativo),
+        limite_animais=row.limite_animais or 0,
+        limite_funcionarios=row.limite_funcionarios or 0,
+        limite_armazenamento_mb=row.limite_armazenamento_mb or 0,
+        recursos=parse_plan_features(row.recursos),
+        loaded_at=loaded_at,
+    )
+
+
+# Per-process cache: tenant id -> TenantEntitlements
+_entitlements_cache = {}
+_entitlements_lock = Lock()
+
+
+def invalidate_tenant_entitlements(tenant_id: int = None):
+    """Drops the cached entitlements of a tenant (or of every tenant) in this process."""
+    with _entitlements_lock:
+        if tenant_id is None:
+            _entitlements_cache.clear()
+        else:
+            _entitlements_cache.pop(tenant_id, None)
+
+
+def get_tenant_entitlements(tenant_id: int) -> Optional[TenantEntitlements]:
+    """
+    Returns the tenant's effective limits and feature flags.
+
+    Entitlements are read from the denormalized tenant row (a primary key
+    lookup, no joins) and cached per process. Changes made in this process
+    invalidate the entry immediately; other processes pick them up after
+    TENANT_ENTITLEMENTS_CACHE_TTL seconds.
+    """
+    ttl = current_app.config.get('TENANT_ENTITLEMENTS_CACHE_TTL', 60)
+    now = time.monotonic()
+    cached = _entitlements_cache.get(tenant_id)
+    if cached is not None and now - cached.loaded_at < ttl:
+        return cached
+
+    row = db.session.query(
+        Tenant.plano_id, Tenant.plano, Tenant.ativo, Tenant.limite_animais,
+        Tenant.limite_funcionarios, Tenant.limite_armazenamento_mb, Tenant.recursos
+    ).filter(Tenant.id == tenant_id).first()
+    if row is None:
+        invalidate_tenant_entitlements(tenant_id)
+        return None
+
+    entitlements = build_tenant_entitlements(tenant_id, row, now)
+    with _entitlements_lock:
+        _entitlements_cache[tenant_id] = entitlements
+    return entitlements
+
 
 class TenantService:
     def create_new_tenant(self, tenant_data):
         """
-        Creates a new tenant record in the public schema and attempts to create the tenant's database schema.
+        Creates a new tenant record in the public schema and provisions the tenant's
+        database schema (tables and default configurations) in the same transaction.
         """
         try:
-            new_tenant = Tenant(**tenant_data)
-            db.session.add(new_tenant)
-            db.session.commit() # Commit to get the tenant ID and schema_name before schema creation
-
-            # Attempt to create the database schema for the new tenant
-            # Replace the placeholder with actual schema creation logic
-            db.engine.execute(text(f"CREATE SCHEMA IF NOT EXISTS {new_tenant.schema_name}"))
-
-            # Note: After creating the schema, you might need to apply migrations
-            # to the new schema to set up the tables for this tenant.
-            # This is a separate step, often handled by Alembic or a custom script
-            # after schema creation.
-
-            return new_tenant
+            return self.provision_tenant(tenant_data)
 
         except SQLAlchemyError as e:
             db.session.rollback()
@@ -34,6 +248,103 @@ class TenantService:
             print(f"An unexpected error occurred creating tenant: {e}") # Log the error
             raise # Re-raise the exception
 
+    def provision_tenant(self, tenant_data: Dict, engine=None) -> Tenant:
+        """
+        Provisions a single tenant: inserts the tenant row, creates its schema,
+        replays the cached DDL snapshot and seeds default Configuracao rows.
+
+        Everything runs in one transaction, so a failure leaves neither a
+        tenant row nor a half-built schema behind.
+        """
+        engine = engine or db.engine
+        tenant_id = self._provision_tenant_row_and_schema(
+            engine,
+            tenant_data,
+            get_tenant_ddl_snapshot(engine),
+            current_app.config.get('TENANT_DEFAULT_CONFIGURACOES', []),
+            get_head_revisions(),
+        )
+        return db.session.get(Tenant, tenant_id)
+
+    def provision_schema(self, tenant: Tenant) -> bool:
+        """
+        Provisions the schema of an already existing tenant row.
+        """
+        engine = db.engine
+        try:
+            with engine.begin() as connection:
+                _provision_schema(
+                    connection,
+                    tenant.schema_name,
+                    tenant.id,
+                    get_tenant_ddl_snapshot(engine),
+                    current_app.config.get('TENANT_DEFAULT_CONFIGURACOES', []),
+                    get_head_revisions(),
+                )
+            return True
+        except SQLAlchemyError as e:
+            print(f"Database error provisioning schema {tenant.schema_name}: {e}")
+            return False
+
+    def provision_tenants(self, tenants_data: List[Dict], max_workers: int = None) -> Dict:
+        """
+        Provisions many tenants concurrently with a bounded thread pool.
+
+        Each tenant is provisioned in its own transaction on its own pooled
+        connection, so the worker count is capped by the engine pool size.
+        Returns a summary with the created tenant IDs, failures and timing.
+        """
+        engine = db.engine
+        ddl_snapshot = get_tenant_ddl_snapshot(engine)
+        default_configs = current_app.config.get('TENANT_DEFAULT_CONFIGURACOES', [])
+        alembic_heads = get_head_revisions()
+
+        if max_workers is None:
+            max_workers = current_app.config.get('TENANT_PROVISIONING_WORKERS', 4)
+        pool_size = getattr(engine.pool, 'size', lambda: max_workers)()
+        max_workers = max(1, min(max_workers, pool_size))
+
+        created, failed = [], []
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    self._provision_tenant_row_and_schema,
+                    engine, tenant_data, ddl_snapshot, default_configs, alembic_heads
+                ): tenant_data
+                for tenant_data in tenants_data
+            }
+            for future in as_completed(futures):
+                tenant_data = futures[future]
+                try:
+                    created.append(future.result())
+                except Exception as e:
+                    print(f"Error provisioning tenant {tenant_data.get('schema_name')}: {e}")
+                    failed.append({'schema_name': tenant_data.get('schema_name'), 'error': str(e)})
+
+        return {
+            'created': sorted(created),
+            'failed': failed,
+            'workers': max_workers,
+            'elapsed_seconds': time.perf_counter() - started,
+        }
+
+    @staticmethod
+    def _provision_tenant_row_and_schema(engine, tenant_data: Dict, ddl_snapshot: str, default_configs: List[Dict],
+                                         alembic_heads: Tuple[str, ...] = ()) -> int:
+        _validate_schema_name(tenant_data.get('schema_name'))
+        with engine.begin() as connection:
+            result = connection.execute(
+                Tenant.__table__.insert().returning(Tenant.__table__.c.id),
+                tenant_data
+            )
+            tenant_id = result.scalar_one()
+            _provision_schema(
+                connection, tenant_data['schema_name'], tenant_id, ddl_snapshot, default_configs, alembic_heads
+            )
+        return tenant_id
+
     def get_tenant_info(self, tenant_id):
         """
         Retrieves tenant information by ID from the public schema.
@@ -49,58 +360,167 @@ class TenantService:
             print(f"An unexpected error occurred getting tenant info: {e}") # Log the error
             raise # Re-raise the exception
 
-    def assign_subscription_plan(self, tenant_id: int, plan_id: int):
+    def assign_subscription_plan(self, tenant_id: int, plan_id: int) -> Tenant:
         """
         Assigns a subscription plan to a tenant.
 
-        This method should link the Tenant to a Subscription/Plan model
-        and potentially update the tenant's resource limits based on the assigned plan.
-        """
-        # Placeholder for assigning a plan
-        print(f"Assigning plan {plan_id} to tenant {tenant_id}")
-        # Example: Fetch tenant and plan, link them, update limits
-        # tenant = self.get_tenant_info(tenant_id)
-        # plan = Plan.query.get(plan_id) # Assuming Plan model exists
-        # if tenant and plan:
-        #     tenant.plan_id = plan.id
-        #     tenant.update_limits_based_on_plan(plan) # Method on Tenant model or separate logic
-        #     db.session.commit()
-        pass
-
-    def update_tenant_limits(self, tenant_id: int, limits_data: Dict):
-        """
-        Updates resource limits for a specific tenant.
-
-        This method should update fields in the Tenant model or a related TenantLimits model.
-        """
-        # Placeholder for updating tenant limits
-        print(f"Updating limits for tenant {tenant_id} with data: {limits_data}")
-        # Example: Fetch tenant, update limit fields
-        # tenant = self.get_tenant_info(tenant_id)
-        # if tenant:
-        #     tenant.max_animals = limits_data.get('max_animals', tenant.max_animals)
-        #     tenant.max_users = limits_data.get('max_users', tenant.max_users)
-        #     # ... update other limits
-        #     db.session.commit()
-        pass
+        The plan's limits and compiled feature flags are copied onto the tenant
+        row, so entitlement checks never need to join assinaturas and
+        planos_assinatura. The tenant's cached entitlements are invalidated.
+        """
+        from app.models.saas import PlanoAssinatura
+
+        try:
+            tenant = db.session.get(Tenant, tenant_id)
+            plano = db.session.get(PlanoAssinatura, plan_id)
+            if not tenant:
+                raise ValueError(f"Tenant with ID {tenant_id} not found.")
+            if not plano or plano.ativo is False:
+                raise ValueError(f"Active subscription plan with ID {plan_id} not found.")
+
+            self._apply_plan(tenant, plano)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Database error assigning plan {plan_id} to tenant {tenant_id}: {e}")
+            raise
+
+        invalidate_tenant_entitlements(tenant_id)
+        return tenant
+
+    def revoke_subscription_plan(self, tenant_id: int) -> Tenant:
+        """
+        Takes the plan's entitlements away when the tenant's subscription
+        ends (cancelled or otherwise inactive). The tenant moves to the plan
+        TENANT_FALLBACK_PLAN_ID when configured, else to SEM_PLANO (no
+        features, no room for more animals, employees or media). Pending
+        changes, such as the subscription's new status, are committed in the
+        same transaction.
+        """
+        from app.models.saas import PlanoAssinatura
+
+        try:
+            tenant = db.session.get(Tenant, tenant_id)
+            if not tenant:
+                raise ValueError(f"Tenant with ID {tenant_id} not found.")
+
+            fallback_id = current_app.config.get('TENANT_FALLBACK_PLAN_ID')
+            plano = db.session.get(PlanoAssinatura, fallback_id) if fallback_id else None
+            if plano is not None and plano.ativo is not False:
+                self._apply_plan(tenant, plano)
+            else:
+                self._clear_plan(tenant)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Database error revoking the plan of tenant {tenant_id}: {e}")
+            raise
+
+        invalidate_tenant_entitlements(tenant_id)
+        return tenant
+
+    def sync_plan_to_tenants(self, plano) -> int:
+        """
+        Re-applies an updated plan to every tenant currently on it, in a single
+        UPDATE. Returns the number of tenants updated.
+        """
+        try:
+            result = db.session.execute(
+                Tenant.__table__.update()
+                .where(Tenant.__table__.c.plano_id == plano.id)
+                .values(**self._plan_values(plano))
+                .returning(Tenant.__table__.c.id)
+            )
+            tenant_ids = result.scalars().all()
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Database error syncing plan {plano.id} to tenants: {e}")
+            raise
+
+        for tenant_id in tenant_ids:
+            invalidate_tenant_entitlements(tenant_id)
+        return len(tenant_ids)
+
+    def update_tenant_limits(self, tenant_id: int, limits_data: Dict) -> Tenant:
+        """
+        Overrides resource limits and/or feature flags for a specific tenant
+        (e.g. a negotiated contract). Accepts limite_animais,
+        limite_funcionarios, limite_armazenamento_mb and recursos (same formats as PlanoAssinatura.recursos).
+        """
+        try:
+            tenant = db.session.get(Tenant, tenant_id)
+            if not tenant:
+                raise ValueError(f"Tenant with ID {tenant_id} not found.")
+
+            for key in ('limite_animais', 'limite_funcionarios', 'limite_armazenamento_mb'):
+                if limits_data.get(key) is not None:
+                    value = int(limits_data[key])
+                    if value < 0:
+                        raise ValueError(f"{key} must be a non-negative integer.")
+                    setattr(tenant, key, value)
+            if 'recursos' in limits_data:
+                tenant.recursos = sorted(parse_plan_features(limits_data['recursos']))
+
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Database error updating limits for tenant {tenant_id}: {e}")
+            raise
+
+        invalidate_tenant_entitlements(tenant_id)
+        return tenant
 
     def check_tenant_resource_limit(self, tenant_id: int, resource_type: str) -> bool:
         """
-        Checks if a tenant has exceeded a specific resource limit.
+        Checks if a tenant has reached a specific resource limit
+        ('animais' or 'funcionarios'), i.e. cannot add one more.
 
-        This method should query the Tenant model or a TenantLimits model
-        and compare current usage of the resource against the defined limit.
-        Returns True if the limit is exceeded, False otherwise.
+        The limit comes from the cached entitlements; only the usage count
+        touches the database. Returns True if the limit is reached, False
+        otherwise (or when the plan sets no limit).
         """
-        # Placeholder for checking resource limit
-        print(f"Checking limit for resource '{resource_type}' for tenant {tenant_id}")
-        # Example: Fetch tenant, get limit for resource_type, get current usage, compare
-        # tenant = self.get_tenant_info(tenant_id)
-        # if tenant:
-        #     limit = getattr(tenant, f'max_{resource_type}', None) # Get limit based on resource_type string
-        #     current_usage = self.get_current_resource_usage(tenant_id, resource_type) # Helper method needed
-        #     if limit is not None and current_usage > limit:
-        #         return True # Limit exceeded
-        # return False # Limit not exceeded (or no limit defined)
+        entitlements = get_tenant_entitlements(tenant_id)
+        if entitlements is None:
+            raise ValueError(f"Tenant with ID {tenant_id} not found.")
+        if not entitlements.has_plan:
+            return True
+        limit = entitlements.limit(resource_type)
+        if not limit:
+            return False
+        return self.get_current_resource_usage(tenant_id, resource_type) >= limit
+
+    def get_current_resource_usage(self, tenant_id: int, resource_type: str) -> int:
+        """Counts the tenant's current usage of a limited resource."""
+        from app.models.animal import Animal
+        from app.models.person import Funcionario
+
+        models = {'animais': Animal, 'funcionarios': Funcionario}
+        model = models.get(resource_type)
+        if model is None:
+            raise ValueError(f"Unknown resource type: {resource_type}")
+        return db.session.query(func.count(model.id)).filter(model.tenant_id == tenant_id).scalar()
+
+    @staticmethod
+    def _plan_values(plano) -> Dict:
+        return {
+            'plano': plano.nome,
+            'plano_id': plano.id,
+            'limite_animais': plano.limite_animais or 0,
+            'limite_funcionarios': plano.limite_funcionarios or 0,
+            'limite_armazenamento_mb': plano.limite_armazenamento_mb or 0,
+            'recursos': sorted(compile_plan_features(plano)),
+        }
+
+    def _apply_plan(self, tenant: Tenant, plano):
+        for key, value in self._plan_values(plano).items():
+            setattr(tenant, key, value)
 
-        return False # Placeholder return: Assume limit is not exceeded for now
+    @staticmethod
+    def _clear_plan(tenant: Tenant):
+        tenant.plano = SEM_PLANO
+        tenant.plano_id = None
+        tenant.limite_animais = 0
+        tenant.limite_funcionarios = 0
+        tenant.limite_armazenamento_mb = 0
+        tenant.recursos = []
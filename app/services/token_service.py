@@ -0,0 +1,92 @@
+import time
+from threading import Lock
+
+from flask import current_app
+
+
+class MemoryTokenBlocklist:
+    """
+    In-process revocation list (jti -> expiry timestamp).
+    Only suitable for tests and single-process development servers.
+    """
+
+    def __init__(self):
+        self._revoked = {}
+        self._lock = Lock()
+
+    def revoke(self, jti: str, expires_at: int) -> bool:
+        now = time.time()
+        with self._lock:
+            # Entries are only needed until the token would have expired anyway
+            self._revoked = {k: exp for k, exp in self._revoked.items() if exp > now}
+            if jti in self._revoked:
+                return False
+            self._revoked[jti] = expires_at
+            return True
+
+    def is_revoked(self, jti: str) -> bool:
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+
+class RedisTokenBlocklist:
+    """
+    Revocation list shared by every worker. Each revoked jti is a Redis key
+    that expires together with the token, so the list never needs pruning
+    and a check is a single EXISTS.
+    """
+
+    key_prefix = 'jwt:revoked:'
+
+    def __init__(self, redis_url: str):
+        import redis
+        self._redis = redis.Redis.from_url(redis_url, socket_timeout=1, socket_connect_timeout=1)
+
+    def revoke(self, jti: str, expires_at: int) -> bool:
+        ttl = max(1, int(expires_at - time.time()))
+        # NX: of concurrent revocations of the same jti exactly one succeeds
+        return bool(self._redis.set(self.key_prefix + jti, 1, ex=ttl, nx=True))
+
+    def is_revoked(self, jti: str) -> bool:
+        return bool(self._redis.exists(self.key_prefix + jti))
+
+
+def get_token_blocklist():
+    """Returns the revocation list configured for the current app."""
+    return current_app.extensions['token_blocklist']
+
+
+def revoke_token(jwt_payload: dict) -> bool:
+    """
+    Revokes a decoded token until its own expiry. Returns False if it was
+    already revoked, so the caller that claimed the token is the only one
+    that gets True.
+    """
+    return get_token_blocklist().revoke(jwt_payload['jti'], jwt_payload['exp'])
+
+
+def register_token_blocklist(app, jwt):
+    """
+    Creates the revocation list from JWT_BLOCKLIST_STORE ('redis' or 'memory')
+    and wires it into flask-jwt-extended.
+
+    Only refresh tokens are looked up: access tokens are short lived and are
+    never revoked individually, so regular requests pay no extra round trip.
+    """
+    store = app.config.get('JWT_BLOCKLIST_STORE', 'redis')
+    if store == 'memory':
+        blocklist = MemoryTokenBlocklist()
+    else:
+        blocklist = RedisTokenBlocklist(app.config['REDIS_URL'])
+    app.extensions['token_blocklist'] = blocklist
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        if jwt_payload.get('type') != 'refresh':
+            return False
+        try:
+            return get_token_blocklist().is_revoked(jwt_payload['jti'])
+        except Exception as e:
+            # Fail closed: the client falls back to a regular login
+            current_app.logger.error(f"Error checking token revocation: {e}")
+            return True
@@ -0,0 +1,359 @@
+"""
+Celery tasks. Registered on the shared instance from app/celery_worker.py
+and run inside the Flask app context.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import text, tuple_
+
+from app import db
+from app.celery_worker import celery
+
+_STAFF_TYPES = ('funcionario', 'veterinario')
+
+
+def _health_sweep_sources():
+    """(kind, model, due-date column, label column); each sweep walks the (tenant_id, due date, id) index."""
+    from app.models.health import Vacinacao, Vermifugacao
+
+    return (
+        ('vacinacao', Vacinacao, Vacinacao.proxima_dose, Vacinacao.tipo_vacina),
+        ('vermifugacao', Vermifugacao, Vermifugacao.proxima_aplicacao, Vermifugacao.medicamento),
+    )
+
+
+def _load_checkpoint(chave):
+    from app.models.system import CheckpointTarefa
+
+    checkpoint = CheckpointTarefa.query.filter_by(chave=chave).first()
+    if checkpoint is None:
+        checkpoint = CheckpointTarefa(chave=chave, processados=0, concluida=False)
+        db.session.add(checkpoint)
+        db.session.commit()
+    return checkpoint
+
+
+def _owner_emails(animal_ids):
+    """Latest buyer of each animal: animal id -> (email, name)."""
+    from app.models.person import Pessoa
+    from app.models.transaction import Venda
+
+    rows = db.session.query(Venda.filhote_id, Pessoa.email, Pessoa.nome).join(
+        Pessoa, Pessoa.id == Venda.cliente_id
+    ).filter(
+        Venda.filhote_id.in_(animal_ids),
+        Pessoa.email.isnot(None),
+    ).order_by(Venda.filhote_id, Venda.data_venda.desc(), Venda.id.desc()).all()
+
+    owners = {}
+    for animal_id, email, nome in rows:
+        owners.setdefault(animal_id, (email, nome))
+    return owners
+
+
+def _staff_emails(tenant_ids):
+    """Active employees with an email, per tenant: tenant id -> [email, ...]."""
+    from app.models.person import Pessoa
+
+    rows = db.session.query(Pessoa.tenant_id, Pessoa.email).filter(
+        Pessoa.tenant_id.in_(tenant_ids),
+        Pessoa.tipo_pessoa.in_(_STAFF_TYPES),
+        Pessoa.ativo.is_(True),
+        Pessoa.email.isnot(None),
+    ).order_by(Pessoa.tenant_id, Pessoa.email).all()
+
+    staff = defaultdict(list)
+    for tenant_id, email in rows:
+        staff[tenant_id].append(email)
+    return staff
+
+
+def _enqueue_reminders(kind, rows):
+    """
+    Groups one batch of due records per recipient and enqueues one
+    send_health_reminders task per group. Sold animals go to their owner;
+    the rest go to the tenant's employees.
+    """
+    owners = _owner_emails({row.animal_id for row in rows})
+    staff = _staff_emails({row.tenant_id for row in rows if row.animal_id not in owners})
+
+    groups = defaultdict(list)
+    for row in rows:
+        item = {
+            'tipo': kind,
+            'item': row.item,
+            'animal': row.animal_nome,
+            'vencimento': row.vencimento.isoformat(),
+        }
+        owner = owners.get(row.animal_id)
+        if owner is not None:
+            groups[(row.tenant_id, (owner[0],))].append(item)
+        elif staff.get(row.tenant_id):
+            groups[(row.tenant_id, tuple(staff[row.tenant_id]))].append(item)
+
+    for (tenant_id, recipients), items in groups.items():
+        send_health_reminders.delay(tenant_id, list(recipients), items)
+    return len(groups)
+
+
+def _sweep(kind, model, due_column, label_column, due_dates, chave, batch_size):
+    """
+    Walks the records due on `due_dates` in (tenant_id, due date, id) order,
+    one batch at a time. The checkpoint is committed after each batch has been
+    enqueued, so a run that dies resumes after the last completed batch; that
+    batch may be enqueued twice (at-least-once delivery).
+    """
+    from app.models.animal import Animal
+
+    checkpoint = _load_checkpoint(chave)
+    if checkpoint.concluida:
+        return 0
+
+    cursor = tuple(checkpoint.cursor) if checkpoint.cursor else None
+    if cursor is not None:
+        cursor = (cursor[0], date.fromisoformat(cursor[1]), cursor[2])
+
+    sort_key = (model.tenant_id, due_column, model.id)
+    enqueued = 0
+    while True:
+        query = db.session.query(
+            model.id,
+            model.tenant_id,
+            model.animal_id,
+            due_column.label('vencimento'),
+            label_column.label('item'),
+            Animal.nome.label('animal_nome'),
+        ).join(Animal, Animal.id == model.animal_id).filter(due_column.in_(due_dates))
+        if cursor is not None:
+            query = query.filter(tuple_(*sort_key) > tuple_(*cursor))
+        rows = query.order_by(*sort_key).limit(batch_size).all()
+        if not rows:
+            break
+
+        enqueued += _enqueue_reminders(kind, rows)
+
+        last = rows[-1]
+        cursor = (last.tenant_id, last.vencimento, last.id)
+        checkpoint.cursor = [last.tenant_id, last.vencimento.isoformat(), last.id]
+        checkpoint.processados += len(rows)
+        db.session.commit()
+
+        if len(rows) < batch_size:
+            break
+
+    checkpoint.concluida = True
+    db.session.commit()
+    return enqueued
+
+
+@celery.task(name='app.tasks.sweep_health_due_dates')
+def sweep_health_due_dates(run_date=None):
+    """
+    Daily sweep (see CELERY_BEAT_SCHEDULE) of vaccinations and dewormings due
+    HEALTH_REMINDER_DAYS days from `run_date` (ISO date, default today), for
+    all tenants. Progress is checkpointed per kind and run date, so re-running
+    the same day continues an interrupted sweep instead of starting over.
+    """
+    run_date = date.fromisoformat(run_date) if run_date else date.today()
+    due_dates = [run_date + timedelta(days=days) for days in current_app.config.get('HEALTH_REMINDER_DAYS', [7, 1, 0])]
+    batch_size = current_app.config.get('HEALTH_REMINDER_BATCH_SIZE', 5000)
+
+    # Session-level advisory lock held on its own connection: overlapping
+    # runs (e.g. a beat restart) skip instead of sending duplicates
+    lock_key = f'health-reminders:{run_date.isoformat()}'
+    with db.engine.connect() as lock_connection:
+        locked = lock_connection.execute(
+            text('SELECT pg_try_advisory_lock(hashtext(:key))'), {'key': lock_key}
+        ).scalar()
+        if not locked:
+            current_app.logger.info(f"Health reminder sweep for {run_date} already running; skipping.")
+            return {}
+        try:
+            summary = {}
+            for kind, model, due_column, label_column in _health_sweep_sources():
+                summary[kind] = _sweep(
+                    kind, model, due_column, label_column, due_dates,
+                    f'{lock_key}:{kind}', batch_size,
+                )
+            current_app.logger.info(f"Health reminder sweep for {run_date}: {summary} message(s) enqueued")
+            return summary
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            lock_connection.execute(text('SELECT pg_advisory_unlock(hashtext(:key))'), {'key': lock_key})
+
+
+def _format_reminder(items):
+    labels = {'vacinacao': 'Vacina', 'vermifugacao': 'Vermífugo'}
+    lines = ['Os seguintes cuidados estão próximos do vencimento:', '']
+    for item in sorted(items, key=lambda i: (i['vencimento'], i['animal'] or '')):
+        vencimento = date.fromisoformat(item['vencimento']).strftime('%d/%m/%Y')
+        lines.append(f"- {vencimento}: {labels.get(item['tipo'], item['tipo'])} {item['item']} ({item['animal']})")
+    return '\n'.join(lines)
+
+
+@celery.task(name='app.tasks.send_health_reminders', bind=True, max_retries=3, default_retry_delay=300)
+def send_health_reminders(self, tenant_id, recipients, items):
+    """Sends one reminder listing all due items to a recipient group."""
+    from app.services.notification_service import NotificationService
+
+    try:
+        NotificationService().send_notification(
+            recipients,
+            'Lembrete: vacinas e vermifugações a vencer',
+            _format_reminder(items),
+            notification_type='email',
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error sending health reminders for tenant {tenant_id}: {e}")
+        raise self.retry(exc=e)
+    return len(items)
+
+
+@celery.task(name='app.tasks.refresh_breeding_calendar')
+def refresh_breeding_calendar(tenant_id):
+    """Recomputes heat predictions and the breeding calendar of one tenant."""
+    from app.services.breeding_calendar_service import BreedingCalendarService
+
+    try:
+        total = BreedingCalendarService().refresh(tenant_id)
+        db.session.commit()
+        return total
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+@celery.task(name='app.tasks.refresh_breeding_calendars')
+def refresh_breeding_calendars():
+    """Nightly rebuild of every active tenant's breeding calendar, one transaction per tenant."""
+    from app.models.tenant import Tenant
+    from app.services.breeding_calendar_service import BreedingCalendarService
+
+    tenant_ids = [row.id for row in db.session.query(Tenant.id).filter(Tenant.ativo.is_(True)).order_by(Tenant.id)]
+    service = BreedingCalendarService()
+    failed = []
+    for tenant_id in tenant_ids:
+        try:
+            service.refresh(tenant_id)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            failed.append(tenant_id)
+            current_app.logger.error(f"Error refreshing breeding calendar for tenant {tenant_id}: {e}")
+    return {'tenants': len(tenant_ids), 'failed': failed}
+
+
+@celery.task(name='app.tasks.calculate_cruzamento_inbreeding', bind=True, max_retries=3, default_retry_delay=60)
+def calculate_cruzamento_inbreeding(self, cruzamento_id):
+    """Computes and stores the expected offspring inbreeding coefficient of one crossing."""
+    from app.models.breeding import Cruzamento, CONSANGUINIDADE_ERRO
+    from app.services.genealogy_service import GenealogyService
+
+    try:
+        cruzamento = GenealogyService().calculate_cruzamento_inbreeding(cruzamento_id)
+        db.session.commit()
+        return None if cruzamento is None else cruzamento.coeficiente_consanguinidade
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error calculating inbreeding for cruzamento {cruzamento_id}: {e}")
+        if self.request.retries >= self.max_retries:
+            Cruzamento.query.filter_by(id=cruzamento_id).update(
+                {'status_consanguinidade': CONSANGUINIDADE_ERRO}, synchronize_session=False
+            )
+            db.session.commit()
+            raise
+        raise self.retry(exc=e)
+
+
+@celery.task(name='app.tasks.calculate_pending_inbreeding')
+def calculate_pending_inbreeding():
+    """
+    Periodic catch-up (see CELERY_BEAT_SCHEDULE) for crossings still
+    'pendente', e.g. when queueing failed at creation time.
+    """
+    from app.models.breeding import Cruzamento, CONSANGUINIDADE_PENDENTE
+
+    batch_size = current_app.config.get('INBREEDING_SWEEP_BATCH_SIZE', 500)
+    cruzamento_ids = [
+        row.id for row in db.session.query(Cruzamento.id).filter(
+            Cruzamento.status_consanguinidade == CONSANGUINIDADE_PENDENTE
+        ).order_by(Cruzamento.id).limit(batch_size)
+    ]
+    for cruzamento_id in cruzamento_ids:
+        calculate_cruzamento_inbreeding.delay(cruzamento_id)
+    return len(cruzamento_ids)
+
+
+@celery.task(name='app.tasks.refresh_reproductive_summary')
+def refresh_reproductive_summary(tenant_id, anos=None):
+    """Rebuilds a tenant's reproductive rollup from the earliest of `anos` (all years when None)."""
+    from app.services.reproductive_summary_service import ReproductiveSummaryService
+
+    try:
+        total = ReproductiveSummaryService().refresh(tenant_id, anos)
+        db.session.commit()
+        return total
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+@celery.task(name='app.tasks.generate_image_variants', bind=True, max_retries=3, default_retry_delay=60)
+def generate_image_variants(self, arquivo_id):
+    """Creates the resized variants of one uploaded photo."""
+    from app.models.media import ImagemAnimal, VARIANTES_ERRO
+    from app.services.image_variant_service import ImageVariantService
+
+    try:
+        imagem = ImageVariantService().generate(arquivo_id)
+        db.session.commit()
+        return None if imagem is None else imagem.status_variantes
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error generating image variants for file {arquivo_id}: {e}")
+        if self.request.retries >= self.max_retries:
+            ImagemAnimal.query.filter_by(id=arquivo_id).update(
+                {'status_variantes': VARIANTES_ERRO}, synchronize_session=False
+            )
+            db.session.commit()
+            raise
+        raise self.retry(exc=e)
+
+
+@celery.task(name='app.tasks.generate_pending_image_variants')
+def generate_pending_image_variants():
+    """
+    Periodic catch-up (see CELERY_BEAT_SCHEDULE) for photos still
+    'pendente' some minutes after upload, e.g. when queueing failed.
+    """
+    from app.services.image_variant_service import ImageVariantService
+
+    batch_size = current_app.config.get('IMAGE_VARIANT_SWEEP_BATCH_SIZE', 500)
+    arquivo_ids = ImageVariantService().pending_ids(batch_size, datetime.utcnow() - timedelta(minutes=15))
+    for arquivo_id in arquivo_ids:
+        generate_image_variants.delay(arquivo_id)
+    return len(arquivo_ids)
+
+
+@celery.task(name='app.tasks.reconcile_storage_usage')
+def reconcile_storage_usage():
+    """
+    Nightly check of the per-tenant storage counters against the files
+    table (see CELERY_BEAT_SCHEDULE); drifted tenants are corrected and logged.
+    """
+    from app.services.storage_usage_service import StorageUsageService
+
+    try:
+        corrigidos = StorageUsageService().reconcile()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    if corrigidos:
+        current_app.logger.warning(f"Storage usage corrected for {len(corrigidos)} tenants: {corrigidos}")
+    return len(corrigidos)
@@ -1,33 +1,177 @@
+import time
 from functools import wraps
-from flask import jsonify, abort
-# Assuming get_jwt_identity is available from Flask-JWT-Extended
-from flask_jwt_extended import get_jwt_identity
-# Assuming Usuario model is defined in app.models.system
-# from app.models.system import Usuario
+from threading import Lock
+from typing import NamedTuple
+
+from flask import abort, current_app
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+
+from app import db
+
+# Profiles that implicitly hold every permission
+SUPERUSER_PROFILES = frozenset({'admin'})
+
+WILDCARD = '*'
+
+
+class CompiledPermissions(NamedTuple):
+    versao: int
+    ativo: bool
+    permissoes: frozenset
+    checked_at: float
+
+
+# Per-process cache: user id -> CompiledPermissions
+_permission_cache = {}
+_permission_cache_lock = Lock()
+
+
+def compile_permissions(permissoes, perfil: str = None) -> frozenset:
+    """
+    Flattens the Usuario.permissoes JSON into a frozenset of dotted names.
+
+    Accepted shapes (freely nested):
+        ["animais.ler", "saude.*"]
+        {"animais": ["ler", "escrever"], "saude": {"ler": true, "excluir": false}}
+        {"animais.ler": true}
+    Keys whose value is false/empty are dropped. '*' grants everything and
+    'modulo.*' grants everything under 'modulo'.
+    """
+    if perfil in SUPERUSER_PROFILES:
+        return frozenset({WILDCARD})
+
+    compiled = set()
+
+    def walk(prefix, value):
+        if isinstance(value, dict):
+            for key, child in value.items():
+                walk(f'{prefix}.{key}' if prefix else str(key), child)
+        elif isinstance(value, (list, tuple, set)):
+            for item in value:
+                if isinstance(item, (dict, list, tuple, set)):
+                    walk(prefix, item)
+                else:
+                    walk(f'{prefix}.{item}' if prefix else str(item), True)
+        elif isinstance(value, str) and prefix:
+            compiled.add(f'{prefix}.{value}')
+        elif value and prefix:
+            compiled.add(prefix)
+
+    walk('', permissoes or {})
+    return frozenset(compiled)
+
+
+def has_permission(compiled: frozenset, permission: str) -> bool:
+    """Checks a permission against a compiled set, honouring wildcards."""
+    if permission in compiled or WILDCARD in compiled:
+        return True
+    parts = permission.split('.')
+    for depth in range(1, len(parts)):
+        if '.'.join(parts[:depth]) + '.*' in compiled:
+            return True
+    return False
+
+
+def invalidate_user_permissions(user_id: int):
+    """Drops the cached permissions of a user in this process."""
+    with _permission_cache_lock:
+        _permission_cache.pop(user_id, None)
+
+
+def get_user_permissions(user_id: int):
+    """
+    Returns the user's CompiledPermissions (or None if the user does not exist).
+
+    Compiled sets are cached per process and keyed by Usuario.permissoes_versao.
+    Once PERMISSION_CACHE_TTL seconds pass, only the version number is re-read;
+    the JSON is loaded and compiled again only when the version changed.
+    """
+    from app.models.system import Usuario
+
+    ttl = current_app.config.get('PERMISSION_CACHE_TTL', 30)
+    now = time.monotonic()
+    cached = _permission_cache.get(user_id)
+    if cached is not None and now - cached.checked_at < ttl:
+        return cached
+
+    row = db.session.query(
+        Usuario.permissoes_versao, Usuario.ativo, Usuario.perfil
+    ).filter(Usuario.id == user_id).first()
+    if row is None:
+        invalidate_user_permissions(user_id)
+        return None
+
+    if cached is not None and cached.versao == row.permissoes_versao:
+        entry = cached._replace(ativo=bool(row.ativo), checked_at=now)
+    else:
+        permissoes = db.session.query(Usuario.permissoes).filter(Usuario.id == user_id).scalar()
+        entry = CompiledPermissions(
+            versao=row.permissoes_versao,
+            ativo=bool(row.ativo),
+            permissoes=compile_permissions(permissoes, row.perfil),
+            checked_at=now,
+        )
+
+    with _permission_cache_lock:
+        _permission_cache[user_id] = entry
+    return entry
+
 
 def permission_required(permission):
     """
     Decorator to check if the authenticated user has a specific permission.
-    (Placeholder logic for now - will need to fetch user and check permissions)
+    Requires a valid JWT; answers 403 when the permission is missing.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            verify_jwt_in_request()
+            current_user_id = get_jwt_identity()
+
+            try:
+                compiled = get_user_permissions(int(current_user_id))
+            except (TypeError, ValueError):
+                compiled = None
+
+            if compiled is None or not compiled.ativo:
+                abort(403, description='User not found or inactive.')
+            if not has_permission(compiled.permissoes, permission):
+                abort(403, description=f"Permission '{permission}' required.")
+
+            return fn(*args, **kwargs)
+
+        return decorator
+    return wrapper
+
+
+def get_jwt_tenant_id():
+    """Tenant of the authenticated user: read from the token claim, or looked up for older tokens."""
+    from app.models.system import Usuario
+
+    tenant_id = get_jwt().get('tenant_id')
+    if tenant_id is None:
+        tenant_id = db.session.query(Usuario.tenant_id).filter(
+            Usuario.id == int(get_jwt_identity())
+        ).scalar()
+    return tenant_id
+
+
+def feature_required(feature):
+    """
+    Decorator to check that the tenant's plan includes a feature flag.
+    Answers 403 when the tenant is inactive or the plan does not include it.
     """
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            # In a real application:
-            # 1. Get the current user identity from JWT (using get_jwt_identity())
-            # current_user_id = get_jwt_identity()
-            # 2. Fetch the user from the database using the ID
-            # user = Usuario.query.filter_by(login=current_user_id).first() # Assuming login is the identity
-            # 3. Check if the user has the required permission
-            # if user and user_has_permission(user, permission):
-
-            # Placeholder logic: Grant access if a 'permission' argument is provided (for testing decorator structure)
-            # In a real scenario, this logic would be based on the authenticated user's roles/permissions
-
-            # For now, just allow access to see the decorator structure works
-            # Implement actual permission check here later
-            # If permission check fails:
-            # abort(403, description=f"Permission '{permission}' required.")
+            from app.services.tenant_service import get_tenant_entitlements
+
+            verify_jwt_in_request()
+            tenant_id = get_jwt_tenant_id()
+            entitlements = get_tenant_entitlements(tenant_id) if tenant_id is not None else None
+
+            if entitlements is None or not entitlements.has_feature(feature):
+                abort(403, description=f"Your plan does not include '{feature}'.")
 
             return fn(*args, **kwargs)
 
@@ -39,4 +183,4 @@ def permission_required(permission):
 # class SomeResource(Resource):
 #     @permission_required('admin_access')
 #     def get(self):
-#         return {'message': 'This is an admin-only resource'}
\ No newline at end of file
+#         return {'message': 'This is an admin-only resource'}
@@ -0,0 +1,83 @@
+"""
+Keyset (cursor) pagination helpers shared by list endpoints.
+
+A cursor is an opaque, URL-safe token holding the sort key of the last item
+of the previous page. The next page is fetched with a row comparison on that
+key, so the cost of a page does not grow with its depth (unlike OFFSET).
+"""
+
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(values) -> str:
+    payload = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, converters) -> tuple:
+    """
+    Decodes a cursor produced by encode_cursor, converting each position with
+    the given callables (e.g. date.fromisoformat, int). Raises ValueError on
+    malformed cursors.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor.') from e
+    if not isinstance(values, list) or len(values) != len(converters):
+        raise ValueError('Invalid cursor.')
+    try:
+        return tuple(convert(value) for convert, value in zip(converters, values))
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor.') from e
+
+
+def converter_for(expression):
+    """Returns the callable that turns a cursor value back into the expression's Python type."""
+    python_type = expression.type.python_type
+    if python_type is date:
+        return date.fromisoformat
+    if python_type is datetime:
+        return datetime.fromisoformat
+    return python_type
+
+
+def clamp_page_size(limit) -> int:
+    if not limit:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def keyset_paginate(query, sort_keys, limit=None, cursor=None, key_of=None):
+    """
+    Paginates `query` in descending order of `sort_keys` (a list of column
+    expressions ending with a unique column, e.g. [Model.data, Model.id]).
+
+    `key_of(row)` extracts the sort key values from a result row; by default
+    the attributes named like the sort key columns are read from the row.
+    Returns (rows, meta) where meta holds 'limit', 'has_next' and 'next_cursor'.
+    """
+    limit = clamp_page_size(limit)
+    if cursor:
+        after = decode_cursor(cursor, [converter_for(key) for key in sort_keys])
+        query = query.filter(tuple_(*sort_keys) < tuple_(*after))
+
+    rows = query.order_by(*[key.desc() for key in sort_keys]).limit(limit + 1).all()
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+
+    if key_of is None:
+        names = [key.key for key in sort_keys]
+        key_of = lambda row: [getattr(row, name) for name in names]
+
+    next_cursor = encode_cursor(key_of(rows[-1])) if has_next and rows else None
+    return rows, {'limit': limit, 'has_next': has_next, 'next_cursor': next_cursor}
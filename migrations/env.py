@@ -2,6 +2,7 @@ import logging
 from logging.config import fileConfig
 
 from flask import current_app
+from sqlalchemy import text
 
 from alembic import context
 
@@ -51,6 +52,19 @@ def get_metadata():
     return target_db.metadata
 
 
+def get_tenant_schema():
+    """Return the tenant schema to migrate, if any.
+
+    Set with `flask db upgrade -x tenant_schema=<schema>` or through
+    config.attributes['tenant_schema'] by the tenant migration runner.
+    When unset, the default (public) schema is migrated as before.
+    """
+    return (
+        context.get_x_argument(as_dictionary=True).get('tenant_schema')
+        or config.attributes.get('tenant_schema')
+    )
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -64,11 +78,15 @@ def run_migrations_offline():
 
     """
     url = config.get_main_option("sqlalchemy.url")
+    tenant_schema = get_tenant_schema()
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        version_table_schema=tenant_schema
     )
 
     with context.begin_transaction():
+        if tenant_schema:
+            context.execute(f'SET search_path TO "{tenant_schema}", public')
         context.run_migrations()
 
 
@@ -95,16 +113,30 @@ def run_migrations_online():
         conf_args["process_revision_directives"] = process_revision_directives
 
     connectable = get_engine()
+    tenant_schema = get_tenant_schema()
 
     with connectable.connect() as connection:
-        context.configure(
-            connection=connection,
-            target_metadata=get_metadata(),
-            **conf_args
-        )
-
-        with context.begin_transaction():
-            context.run_migrations()
+        default_schema_name = connection.dialect.default_schema_name
+        if tenant_schema:
+            # Unqualified table names in the revisions resolve to the tenant
+            # schema; shared tables are still found in public.
+            # reference: https://alembic.sqlalchemy.org/en/latest/cookbook.html
+            connection.execute(text(f'SET search_path TO "{tenant_schema}", public'))
+            connection.commit()
+            connection.dialect.default_schema_name = tenant_schema
+            conf_args['version_table_schema'] = tenant_schema
+
+        try:
+            context.configure(
+                connection=connection,
+                target_metadata=get_metadata(),
+                **conf_args
+            )
+
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            connection.dialect.default_schema_name = default_schema_name
 
 
 if context.is_offline_mode():
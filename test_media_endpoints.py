@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Script de teste para endpoints de mídia
+Execute após iniciar o servidor com armazenamento local:
+    MEDIA_STORAGE_BACKEND=local python run_dev.py
+"""
+
+import hashlib
+import io
+import os
+import struct
+import time
+import zipfile
+import zlib
+
+import requests
+
+# Configuração
+BASE_URL = "http://localhost:5000/api/v1"
+LOGIN_URL = f"{BASE_URL}/auth/login"
+MEDIA_URL = f"{BASE_URL}/media"
+
+BLOCK_SIZE = 4 * 1024 * 1024  # Blocos do content hash (iguais ao Dropbox)
+
+
+def content_hash(data):
+    """Content hash no formato do Dropbox, calculado pelo servidor em qualquer backend."""
+    blocks = [hashlib.sha256(data[i:i + BLOCK_SIZE]).digest() for i in range(0, len(data), BLOCK_SIZE)]
+    return hashlib.sha256(b''.join(blocks)).hexdigest()
+
+
+def png_image(largura, altura):
+    """PNG RGB de uma cor só, gerado sem dependências."""
+    def chunk(tipo, dados):
+        return struct.pack(">I", len(dados)) + tipo + dados + struct.pack(">I", zlib.crc32(tipo + dados))
+    linhas = b"".join(b"\x00" + b"\x30\x90\xc0" * largura for _ in range(altura))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", largura, altura, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(linhas)) + chunk(b"IEND", b""))
+
+
+def get_auth_token():
+    """Obtém token de autenticação."""
+    login_data = {
+        "login": "admin@canil.com",
+        "senha": "admin123"
+    }
+
+    response = requests.post(LOGIN_URL, json=login_data)
+    if response.status_code == 200:
+        return response.json()["access_token"]
+    else:
+        print(f"❌ Erro no login: {response.text}")
+        return None
+
+
+def check_download(token, arquivo_id, data):
+    """Baixa o arquivo e compara com o conteúdo enviado."""
+    headers = {"Authorization": f"Bearer {token}"}
+    response = requests.get(f"{MEDIA_URL}/arquivos/{arquivo_id}/download", headers=headers)
+    print(f"GET /media/arquivos/{arquivo_id}/download - Status: {response.status_code}")
+    if response.status_code == 200:
+        print(f"   {'✅' if response.content == data else '❌'} Conteúdo {'confere' if response.content == data else 'diferente'}")
+        etag = response.headers.get("ETag")
+
+        # Intervalo de bytes
+        response = requests.get(f"{MEDIA_URL}/arquivos/{arquivo_id}/download",
+                                headers={**headers, "Range": "bytes=100-199"})
+        ok = response.status_code == 206 and response.content == data[100:200]
+        print(f"   {'✅' if ok else '❌'} Range bytes=100-199 - Status: {response.status_code} ({response.headers.get('Content-Range')})")
+
+        # Download condicional
+        response = requests.get(f"{MEDIA_URL}/arquivos/{arquivo_id}/download",
+                                headers={**headers, "If-None-Match": etag})
+        print(f"   {'✅' if response.status_code == 304 else '❌'} If-None-Match - Status: {response.status_code} (esperado 304)")
+
+
+def test_multipart_upload(token):
+    """Testa upload multipart."""
+    print("\n📤 Testando Upload Multipart...")
+
+    headers = {"Authorization": f"Bearer {token}"}
+    data = os.urandom(256 * 1024)
+    files = {"file": ("teste.bin", data, "application/octet-stream")}
+
+    response = requests.post(f"{MEDIA_URL}/arquivos", headers=headers, files=files, data={"descricao": "Teste"})
+    print(f"POST /media/arquivos - Status: {response.status_code}")
+
+    if response.status_code == 201:
+        arquivo = response.json()
+        print(f"   📁 {arquivo['nome_original']} ({arquivo['tamanho']:.0f} bytes) em {arquivo['caminho']}")
+        print(f"   {'✅' if arquivo['hash'] == content_hash(data) else '❌'} Hash {arquivo['hash']}")
+        check_download(token, arquivo['id'], data)
+        return arquivo['id']
+    print(f"   ❌ Erro: {response.text}")
+    return None
+
+
+def test_stream_upload(token):
+    """Testa upload pelo corpo da requisição (maior que um chunk)."""
+    print("\n🌊 Testando Upload em Stream...")
+
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "image/jpeg"}
+    data = os.urandom(BLOCK_SIZE * 2 + 1234)
+
+    response = requests.post(
+        f"{MEDIA_URL}/arquivos/stream", headers=headers, data=data,
+        params={"nome": "foto.jpg", "categoria": "photo"},
+    )
+    print(f"POST /media/arquivos/stream - Status: {response.status_code}")
+
+    if response.status_code == 201:
+        arquivo = response.json()
+        print(f"   📷 {arquivo['nome_original']} ({arquivo['mime_type']}, {arquivo['tamanho']:.0f} bytes)")
+        print(f"   {'✅' if arquivo['hash'] == content_hash(data) else '❌'} Hash {arquivo['hash']}")
+        check_download(token, arquivo['id'], data)
+        return arquivo['id']
+    print(f"   ❌ Erro: {response.text}")
+    return None
+
+
+def test_resumable_upload(token):
+    """Testa upload retomável em dois chunks, com offset errado no meio."""
+    print("\n🔁 Testando Upload Retomável...")
+
+    headers = {"Authorization": f"Bearer {token}"}
+    data = os.urandom(BLOCK_SIZE + 4321)
+
+    response = requests.post(f"{MEDIA_URL}/uploads", headers=headers, json={
+        "nome_original": "video.mp4",
+        "tamanho": len(data),
+        "mime_type": "video/mp4",
+        "categoria": "video",
+    })
+    print(f"POST /media/uploads - Status: {response.status_code}")
+    if response.status_code != 201:
+        print(f"   ❌ Erro: {response.text}")
+        return None
+    token_upload = response.json()["token"]
+    upload_url = f"{MEDIA_URL}/uploads/{token_upload}"
+
+    response = requests.put(upload_url, headers=headers, params={"offset": 0}, data=data[:BLOCK_SIZE])
+    print(f"PUT /media/uploads/<token>?offset=0 - Status: {response.status_code}")
+
+    response = requests.put(upload_url, headers=headers, params={"offset": 0}, data=data[BLOCK_SIZE:])
+    print(f"PUT /media/uploads/<token>?offset=0 (repetido) - Status: {response.status_code} (esperado 409)")
+
+    response = requests.get(upload_url, headers=headers)
+    offset = response.json()["offset"]
+    print(f"GET /media/uploads/<token> - Status: {response.status_code}, offset {offset}")
+
+    response = requests.put(upload_url, headers=headers, params={"offset": offset}, data=data[offset:])
+    print(f"PUT /media/uploads/<token>?offset={offset} - Status: {response.status_code}")
+
+    if response.status_code == 201:
+        arquivo = response.json()
+        print(f"   {'✅' if arquivo['hash'] == content_hash(data) else '❌'} Hash {arquivo['hash']}")
+        check_download(token, arquivo['id'], data)
+        return arquivo['id']
+    print(f"   ❌ Erro: {response.text}")
+    return None
+
+
+def test_cancel_upload(token):
+    """Testa cancelamento de upload retomável."""
+    print("\n🚫 Testando Cancelamento de Upload...")
+
+    headers = {"Authorization": f"Bearer {token}"}
+    response = requests.post(f"{MEDIA_URL}/uploads", headers=headers, json={"nome_original": "x.bin", "tamanho": 10})
+    if response.status_code != 201:
+        print(f"   ❌ Erro: {response.text}")
+        return
+    upload_url = f"{MEDIA_URL}/uploads/{response.json()['token']}"
+
+    requests.put(upload_url, headers=headers, params={"offset": 0}, data=b'12345')
+    response = requests.delete(upload_url, headers=headers)
+    print(f"DELETE /media/uploads/<token> - Status: {response.status_code}")
+
+    response = requests.get(upload_url, headers=headers)
+    print(f"GET /media/uploads/<token> - Status: {response.status_code} (esperado 404)")
+
+
+def test_deduplication(token):
+    """Testa deduplicação: o mesmo conteúdo enviado duas vezes é armazenado uma vez só."""
+    print("\n♻️ Testando Deduplicação...")
+
+    headers = {"Authorization": f"Bearer {token}"}
+    data = os.urandom(64 * 1024)
+    ids = []
+    for nome in ("pedigree.pdf", "pedigree-copia.pdf"):
+        files = {"file": (nome, data, "application/pdf")}
+        response = requests.post(f"{MEDIA_URL}/arquivos", headers=headers, files=files)
+        print(f"POST /media/arquivos ({nome}) - Status: {response.status_code}")
+        if response.status_code != 201:
+            print(f"   ❌ Erro: {response.text}")
+            return
+        ids.append(response.json())
+    iguais = ids[0]["caminho"] == ids[1]["caminho"]
+    print(f"   {'✅' if iguais else '❌'} Mesmo objeto armazenado: {ids[1]['caminho']}")
+
+    # Upload retomável com hash conhecido: concluído sem enviar bytes
+    response = requests.post(f"{MEDIA_URL}/uploads", headers=headers, json={
+        "nome_original": "pedigree-3.pdf", "tamanho": len(data), "hash": content_hash(data),
+    })
+    sessao = response.json()
+    print(f"POST /media/uploads (hash conhecido) - Status: {response.status_code}, concluída: {sessao.get('concluida')}")
+    if sessao.get("arquivo_id"):
+        ids.append({"id": sessao["arquivo_id"]})
+
+    # Excluir uma cópia não apaga o conteúdo das outras
+    requests.delete(f"{MEDIA_URL}/arquivos/{ids[0]['id']}", headers=headers)
+    check_download(token, ids[1]["id"], data)
+    for arquivo in ids[1:]:
+        requests.delete(f"{MEDIA_URL}/arquivos/{arquivo['id']}", headers=headers)
+
+
+def test_photo_variants(token):
+    """Testa geração das variantes de foto (requer o worker Celery rodando)."""
+    print("\n🖼️ Testando Variantes de Foto...")
+
+    headers = {"Authorization": f"Bearer {token}"}
+    data = png_image(1600, 1200)
+    response = requests.post(
+        f"{MEDIA_URL}/arquivos/stream", headers={**headers, "Content-Type": "image/png"}, data=data,
+        params={"nome": "foto-grande.png", "categoria": "photo"},
+    )
+    print(f"POST /media/arquivos/stream (foto) - Status: {response.status_code}")
+    if response.status_code != 201:
+        print(f"   ❌ Erro: {response.text}")
+        return None
+    arquivo = response.json()
+
+    for _ in range(20):
+        if arquivo.get("status_variantes") != "pendente":
+            break
+        time.sleep(0.5)
+        arquivo = requests.get(f"{MEDIA_URL}/arquivos/{arquivo['id']}", headers=headers).json()
+    print(f"   📐 status_variantes: {arquivo.get('status_variantes')}")
+
+    for nome, url in (arquivo.get("variantes") or {}).items():
+        response = requests.get(f"http://localhost:5000{url}", headers=headers)
+        print(f"   {'✅' if response.status_code == 200 else '❌'} {nome}: {len(response.content)} bytes "
+              f"({response.headers.get('Content-Type')}) de {len(data)} do original")
+    if arquivo.get("status_variantes") == "pendente":
+        print("   ⚠️ Variantes ainda pendentes. O worker está rodando? celery -A app.celery_worker:celery worker")
+    return arquivo["id"]
+
+
+def test_album_upload_and_export(token):
+    """Testa envio de várias fotos para um álbum e exportação em ZIP."""
+    print("\n📚 Testando Álbum (envio em lote e ZIP)...")
+
+    headers = {"Authorization": f"Bearer {token}"}
+    animais = requests.get(f"{BASE_URL}/animals/", headers=headers, params={"per_page": 1}).json().get("items") or []
+    if not animais:
+        print("   ⚠️ Nenhum animal cadastrado; teste de álbum ignorado.")
+        return
+
+    response = requests.post(f"{MEDIA_URL}/albuns", headers=headers,
+                             json={"nome": "Álbum de teste", "animal_id": animais[0]["id"]})
+    print(f"POST /media/albuns - Status: {response.status_code}")
+    if response.status_code != 201:
+        print(f"   ❌ Erro: {response.text}")
+        return
+    album_id = response.json()["id"]
+
+    fotos = {f"foto-{i}.png": png_image(64 * i, 48 * i) for i in range(1, 6)}
+    response = requests.post(
+        f"{MEDIA_URL}/albuns/{album_id}/arquivos", headers=headers,
+        files=[("files", (nome, data, "image/png")) for nome, data in fotos.items()],
+    )
+    print(f"POST /media/albuns/{album_id}/arquivos - Status: {response.status_code}")
+    arquivos = response.json() if response.status_code == 201 else []
+    print(f"   {'✅' if len(arquivos) == len(fotos) else '❌'} {len(arquivos)} fotos, "
+          f"ordem {[arquivo['ordem'] for arquivo in arquivos]}")
+
+    response = requests.get(f"{MEDIA_URL}/albuns/{album_id}/zip", headers=headers, stream=True)
+    print(f"GET /media/albuns/{album_id}/zip - Status: {response.status_code} "
+          f"(Transfer-Encoding: {response.headers.get('Transfer-Encoding')})")
+    if response.status_code == 200:
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+            iguais = all(archive.read(nome) == data for nome, data in fotos.items())
+            print(f"   {'✅' if iguais else '❌'} ZIP com {len(archive.namelist())} arquivos")
+
+    for arquivo in arquivos:
+        requests.delete(f"{MEDIA_URL}/arquivos/{arquivo['id']}", headers=headers)
+    response = requests.delete(f"{MEDIA_URL}/albuns/{album_id}", headers=headers)
+    print(f"DELETE /media/albuns/{album_id} - Status: {response.status_code}")
+
+
+def test_storage_usage(token):
+    """Testa o contador de uso de armazenamento do tenant."""
+    print("\n💾 Testando Uso de Armazenamento...")
+
+    headers = {"Authorization": f"Bearer {token}"}
+    antes = requests.get(f"{MEDIA_URL}/uso", headers=headers).json()
+    print(f"GET /media/uso - {antes.get('bytes_usados')} bytes em {antes.get('arquivos')} arquivos "
+          f"(limite: {antes.get('limite_bytes') or 'sem limite'})")
+
+    data = os.urandom(4096)
+    response = requests.post(f"{MEDIA_URL}/arquivos/stream", headers=headers, data=data, params={"nome": "uso.bin"})
+    if response.status_code != 201:
+        print(f"   ❌ Upload - Status: {response.status_code} {response.text}")
+        return
+    arquivo_id = response.json()["id"]
+    depois = requests.get(f"{MEDIA_URL}/uso", headers=headers).json()
+    print(f"   {'✅' if depois['bytes_usados'] - antes['bytes_usados'] == len(data) else '❌'} "
+          f"+{depois['bytes_usados'] - antes['bytes_usados']} bytes após o upload")
+
+    requests.delete(f"{MEDIA_URL}/arquivos/{arquivo_id}", headers=headers)
+    final = requests.get(f"{MEDIA_URL}/uso", headers=headers).json()
+    print(f"   {'✅' if final['bytes_usados'] == antes['bytes_usados'] else '❌'} uso restaurado após a exclusão")
+
+    if antes.get("disponivel_bytes") is not None:
+        response = requests.post(
+            f"{MEDIA_URL}/arquivos/stream", headers={**headers, "Content-Length": str(antes["disponivel_bytes"] + 1)},
+            data=b"", params={"nome": "grande.bin"},
+        )
+        print(f"   {'✅' if response.status_code == 413 else '❌'} acima da cota - Status: {response.status_code}")
+
+
+def test_get_and_delete(token, arquivo_id):
+    """Testa busca (com URL) e exclusão de arquivo."""
+    print(f"\n🗑️ Testando Busca e Exclusão do Arquivo {arquivo_id}...")
+
+    headers = {"Authorization": f"Bearer {token}"}
+    response = requests.get(f"{MEDIA_URL}/arquivos/{arquivo_id}", headers=headers)
+    print(f"GET /media/arquivos/{arquivo_id} - Status: {response.status_code}")
+    if response.status_code == 200:
+        print(f"   🔗 URL: {response.json()['url']}")
+
+    response = requests.delete(f"{MEDIA_URL}/arquivos/{arquivo_id}", headers=headers)
+    print(f"DELETE /media/arquivos/{arquivo_id} - Status: {response.status_code}")
+
+    response = requests.get(f"{MEDIA_URL}/arquivos/{arquivo_id}", headers=headers)
+    print(f"GET /media/arquivos/{arquivo_id} - Status: {response.status_code} (esperado 404)")
+
+
+def main():
+    """Executa todos os testes."""
+    print("🧪 Teste Completo dos Endpoints de Mídia")
+    print("=" * 50)
+
+    # 1. Autenticação
+    print("🔐 Fazendo login...")
+    token = get_auth_token()
+    if not token:
+        print("❌ Falha na autenticação. Verifique se o servidor está rodando.")
+        return
+
+    print("✅ Login realizado com sucesso!")
+
+    # 2. Uploads
+    arquivo_ids = [
+        test_multipart_upload(token),
+        test_stream_upload(token),
+        test_resumable_upload(token),
+        test_photo_variants(token),
+    ]
+    test_cancel_upload(token)
+    test_deduplication(token)
+    test_album_upload_and_export(token)
+    test_storage_usage(token)
+
+    # 3. Limpeza
+    for arquivo_id in arquivo_ids:
+        if arquivo_id:
+            test_get_and_delete(token, arquivo_id)
+
+    print("\n🎉 Testes concluídos!")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n👋 Testes interrompidos!")
+    except Exception as e:
+        print(f"\n❌ Erro durante os testes: {e}")